@@ -0,0 +1,26 @@
+import os
+from argparse import ArgumentParser
+
+from data.synthetic_network import save_synthetic_importance
+from definitions import DATA_PATH
+from utility.log_handling import setup_logger
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='Create synthetic nn_vis importance data')
+    parser.add_argument('layer', type=int, nargs='+',
+                        help='Node count of every layer, the last layer defines the number of classes.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the random generator, equal seeds create equal networks.')
+    parser.add_argument('--density', type=float, default=1.0,
+                        help='Fraction of existing edges between two layers, below 1.0 the edges are stored sparse.')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Path of the created importance file, defaults to the data directory.')
+    args = parser.parse_args()
+
+    setup_logger('synthetic_network')
+
+    output_path: str = args.output if args.output is not None else os.path.join(
+        DATA_PATH, f'synthetic_{"_".join([str(nodes) for nodes in args.layer])}_{args.seed}.imp.npz')
+    if os.path.dirname(output_path) != '' and not os.path.exists(os.path.dirname(output_path)):
+        os.makedirs(os.path.dirname(output_path))
+    save_synthetic_importance(output_path, args.layer, args.seed, args.density)
@@ -4,6 +4,8 @@ import numpy as np
 
 from definitions import (ADDITIONAL_EDGE_BUFFER_DATA,
                          ADDITIONAL_NODE_BUFFER_DATA)
+from models.edge import (SparseEdgeLayer, convert_legacy_edge_data,
+                         create_sparse_layer)
 from opengl_helper.buffer import get_buffer_object_size
 
 
@@ -18,6 +20,9 @@ class ImportanceDataHandler:
         self.layer_data: List[int] = []
         for layer_nodes in self.node_importance_data:
             self.layer_data.append(len(layer_nodes))
+        self.edge_layers: List[SparseEdgeLayer] = [
+            create_sparse_layer(layer_edges, self.layer_data[i], self.layer_data[i + 1]) for i, layer_edges in
+            enumerate(self.edge_importance_data)]
 
 
 class ProcessedNNHandler:
@@ -36,18 +41,25 @@ class ProcessedNNHandler:
                 raw_node_data[node_data_offset:(node_data_offset + nodes)])
             node_data_offset += nodes
 
-        self.edge_data: List[List[np.array]] = edge_data
-        for i, layer_edge_data in enumerate(self.edge_data):
-            for j, container_edge_data in enumerate(layer_edge_data):
-                self.edge_data[i][j] = container_edge_data.reshape(
-                    -1, get_buffer_object_size(num_classes * 2, ADDITIONAL_EDGE_BUFFER_DATA))
-
         self.sample_data: np.array = sample_data
         for i, layer_sample_data in enumerate(self.sample_data):
             for j, container_sample_data in enumerate(layer_sample_data):
                 self.sample_data[i][j] = container_sample_data.reshape(
                     -1, max_sample_points * 4)
 
+        legacy_edge_size: int = get_buffer_object_size(
+            num_classes * 2, ADDITIONAL_EDGE_BUFFER_DATA)
+        self.edge_data: List[List[np.array]] = edge_data
+        for i, layer_edge_data in enumerate(self.edge_data):
+            for j, container_edge_data in enumerate(layer_edge_data):
+                container_edges: int = self.sample_data[i][j].shape[0]
+                if container_edges > 0 and container_edge_data.size == container_edges * legacy_edge_size:
+                    self.edge_data[i][j] = convert_legacy_edge_data(
+                        container_edge_data.reshape(-1, legacy_edge_size), list(self.layer_data))
+                else:
+                    self.edge_data[i][j] = container_edge_data.reshape(
+                        -1, get_buffer_object_size(0, ADDITIONAL_EDGE_BUFFER_DATA))
+
     def get_all_samples(self) -> np.array:
         samples: np.array = np.array([])
         for layer_edges in self.sample_data:
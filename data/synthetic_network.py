@@ -0,0 +1,66 @@
+import logging
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from models.edge import create_sparse_layer_data
+from models.node import random_importance
+
+SYNTHETIC_ROW_CHUNK_SIZE: int = 1 << 22
+
+
+def create_synthetic_node_importance(layer: List[int], rng: np.random.Generator) -> List[np.array]:
+    num_classes: int = layer[len(layer) - 1]
+    node_importance_data: List[np.array] = [random_importance(node_count, num_classes, rng).astype(np.float32) for
+                                            node_count in layer[:-1]]
+    node_importance_data.append(np.eye(num_classes, dtype=np.float32))
+    return node_importance_data
+
+
+def create_synthetic_edge_importance(start_count: int, end_count: int, rng: np.random.Generator,
+                                     density: float = 1.0) -> Any:
+    if density >= 1.0:
+        return rng.random((start_count, end_count), dtype=np.float32)
+
+    # sparse layers are stored as indptr, indices and importance and drawn in row chunks to bound the mask size
+    chunk_rows: int = max(SYNTHETIC_ROW_CHUNK_SIZE // max(end_count, 1), 1)
+    row_counts: List[np.array] = []
+    indices: List[np.array] = []
+    for start in range(0, start_count, chunk_rows):
+        edge_mask: np.array = rng.random(
+            (min(chunk_rows, start_count - start), end_count)) < density
+        row_counts.append(np.count_nonzero(edge_mask, axis=1))
+        indices.append(np.nonzero(edge_mask)[1])
+    indptr: np.array = np.zeros(start_count + 1, dtype=np.int64)
+    if start_count > 0:
+        np.cumsum(np.concatenate(row_counts), out=indptr[1:])
+    edge_indices: np.array = np.concatenate(indices).astype(
+        np.int64) if len(indices) > 0 else np.zeros(0, np.int64)
+    return create_sparse_layer_data(indptr, edge_indices, rng.random(edge_indices.shape[0], dtype=np.float32))
+
+
+def create_synthetic_importance(layer: List[int], seed: Optional[int] = None, density: float = 1.0) \
+        -> Tuple[List[np.array], List[Any]]:
+    if len(layer) < 2:
+        raise Exception('A synthetic network needs at least two layers.')
+    if not 0.0 < density <= 1.0:
+        raise Exception(f'Edge density {density} is not in (0, 1].')
+
+    rng: np.random.Generator = np.random.default_rng(seed)
+    node_importance_data: List[np.array] = create_synthetic_node_importance(
+        layer, rng)
+    edge_importance_data: List[Any] = [
+        create_synthetic_edge_importance(layer[i], layer[i + 1], rng, density) for i in range(len(layer) - 1)]
+    return node_importance_data, edge_importance_data
+
+
+def save_synthetic_importance(path: str, layer: List[int], seed: Optional[int] = None, density: float = 1.0) -> None:
+    node_importance_data, edge_importance_data = create_synthetic_importance(
+        layer, seed, density)
+    edge_count: int = sum([layer_edges.size if isinstance(layer_edges, np.ndarray) else layer_edges['indices'].shape[0] for
+                           layer_edges in edge_importance_data])
+    logging.info(
+        f'Saving synthetic network {layer} with {edge_count} edges to "{path}"')
+    importance_data: np.array = np.empty(2, dtype=object)
+    importance_data[0], importance_data[1] = node_importance_data, edge_importance_data
+    np.savez(path, importance_data)
@@ -9,6 +9,7 @@ DATA_PATH = BASE_PATH + '/storage/data/'
 SCREENSHOT_PATH = BASE_PATH + '/storage/screenshots/'
 ADDITIONAL_NODE_BUFFER_DATA: int = 6
 ADDITIONAL_EDGE_BUFFER_DATA: int = 8
+EXACT_PRUNE_EDGE_LIMIT: int = 50000000
 
 
 class ProcessRenderMode(IntFlag):
@@ -1,112 +1,207 @@
 from __future__ import annotations
 
-import random
-from typing import List
+from typing import Any, Dict, List, Tuple
 
 import numpy as np
 
-from models.node import Node
-
-
-class Edge:
-    def __init__(self) -> None:
-        self.data: List[float] = []
-        self.sample_data: List[float] = []
-
-    def data_init(self, data: np.array, sample_data: np.array) -> Edge:
-        self.data = []
-        for d in data:
-            self.data.append(d)
-        self.sample_data = []
-        for sd in sample_data:
-            self.sample_data.append(sd)
-        return self
-
-    def importance_init(self, num_classes: int, padding: int, start_node: Node, end_node: Node, layer_id: int,
-                        layer_edge_id: int, importance: float) -> Edge:
-        self.data = []
-        self.data = [2.0, layer_id, layer_edge_id, importance, start_node.data[num_classes + 5],
-                     end_node.data[num_classes + 5], start_node.data[num_classes + 4], end_node.data[num_classes + 4]]
-        self.data.extend(start_node.data[4:(num_classes + 4)])
-        self.data.extend(end_node.data[4:(num_classes + 4)])
-        for _ in range(padding):
-            self.data.append(0.0)
-        self.sample_data = [start_node.position.x, start_node.position.y, start_node.position.z, 1.0,
-                            end_node.position.x, end_node.position.y, end_node.position.z, 0.0]
-        return self
-
-    def random_importance_init(self, num_classes: int, padding: int, start_node: Node, end_node: Node, layer_id: int,
-                               layer_edge_id: int) -> Edge:
-        importance: float = random.random()
-        self.data = [2.0, layer_id, layer_edge_id, importance, start_node.data[num_classes + 5],
-                     end_node.data[num_classes + 5], start_node.data[num_classes + 4], end_node.data[num_classes + 4]]
-        self.data.extend(start_node.data[4:(num_classes + 4)])
-        self.data.extend(end_node.data[4:(num_classes + 4)])
-        for _ in range(padding):
-            self.data.append(0.0)
-        self.sample_data = [start_node.position.x, start_node.position.y, start_node.position.z, 1.0,
-                            end_node.position.x, end_node.position.y, end_node.position.z, 0.0]
-        return self
-
-
-def split_edges_for_buffer(edges: List[List[Edge]], edge_container_size: int = 1000) -> List[List[List[Edge]]]:
-    split_edges: List[List[List[Edge]]] = []
+from definitions import ADDITIONAL_EDGE_BUFFER_DATA
+from opengl_helper.buffer import get_buffer_object_size
+
+
+class EdgeContainer:
+    def __init__(self, edge_data: np.array, sample_data: np.array) -> None:
+        self.edge_data: np.array = edge_data
+        self.sample_data: np.array = sample_data
+
+    def __len__(self) -> int:
+        return self.edge_data.shape[0]
+
+    def get_importance(self, node_importance: np.array) -> np.array:
+        return self.edge_data[:, 3] * node_importance[self.edge_data[:, 4].astype(np.int64)]
+
+    def select(self, mask: np.array) -> EdgeContainer:
+        return EdgeContainer(self.edge_data[mask], self.sample_data[mask])
+
+    def slice(self, start: int, end: int) -> EdgeContainer:
+        return EdgeContainer(self.edge_data[start:end], self.sample_data[start:end])
+
+
+class SparseEdgeLayer:
+    def __init__(self, indptr: np.array, indices: np.array, importance: np.array, end_count: int) -> None:
+        self.indptr: np.array = np.asarray(indptr, dtype=np.int64)
+        self.indices: np.array = np.asarray(indices, dtype=np.int64)
+        self.importance: np.array = np.asarray(importance, dtype=np.float32)
+        self.start_count: int = self.indptr.shape[0] - 1
+        self.end_count: int = end_count
+
+    def __len__(self) -> int:
+        return self.indices.shape[0]
+
+    def get_start_indices(self) -> np.array:
+        return np.repeat(np.arange(self.start_count, dtype=np.int64), np.diff(self.indptr))
+
+    def select(self, mask: np.array) -> SparseEdgeLayer:
+        row_counts: np.array = np.bincount(
+            self.get_start_indices()[mask], minlength=self.start_count)
+        indptr: np.array = np.zeros(self.start_count + 1, dtype=np.int64)
+        np.cumsum(row_counts, out=indptr[1:])
+        return SparseEdgeLayer(indptr, self.indices[mask], self.importance[mask], self.end_count)
+
+
+def create_dense_layer(importance: np.array) -> SparseEdgeLayer:
+    start_count, end_count = importance.shape
+    return SparseEdgeLayer(np.arange(start_count + 1, dtype=np.int64) * end_count,
+                           np.tile(
+                               np.arange(end_count, dtype=np.int64), start_count),
+                           importance.reshape(-1), end_count)
+
+
+def create_sparse_layer_data(indptr: np.array, indices: np.array, importance: np.array) -> Dict[str, np.array]:
+    # sparse layers are tagged by their keys, so they can not be mistaken for a dense matrix with few rows
+    return {'indptr': indptr, 'indices': indices, 'importance': importance}
+
+
+def create_sparse_layer(layer_data: Any, start_count: int, end_count: int) -> SparseEdgeLayer:
+    # importance files store either a dense (start, end) matrix or a dict created by create_sparse_layer_data
+    if isinstance(layer_data, dict):
+        return SparseEdgeLayer(layer_data['indptr'], layer_data['indices'], layer_data['importance'], end_count)
+    return create_dense_layer(np.asarray(layer_data, dtype=np.float32).reshape(start_count, end_count))
+
+
+def create_random_layer(start_count: int, end_count: int) -> SparseEdgeLayer:
+    return create_dense_layer(np.random.random((start_count, end_count)).astype(np.float32))
+
+
+def create_layer_edge_data(layer_id: int, layer_edges: SparseEdgeLayer, start_node_offset: int,
+                           end_node_offset: int) -> np.array:
+    start_indices: np.array = layer_edges.get_start_indices()
+
+    # class importance is read from the node buffer, edges only reference their nodes
+    edge_data: np.array = np.zeros((len(layer_edges), get_buffer_object_size(0, ADDITIONAL_EDGE_BUFFER_DATA)),
+                                   dtype=np.float32)
+    edge_data[:, 0] = 2.0
+    edge_data[:, 1] = layer_id
+    edge_data[:, 2] = start_indices * \
+        layer_edges.end_count + layer_edges.indices
+    edge_data[:, 3] = layer_edges.importance
+    edge_data[:, 4] = start_node_offset + start_indices
+    edge_data[:, 5] = end_node_offset + layer_edges.indices
+    return edge_data
+
+
+def create_layer_sample_data(start_nodes: np.array, end_nodes: np.array, layer_edges: SparseEdgeLayer) -> np.array:
+    sample_data: np.array = np.zeros((len(layer_edges), 8), dtype=np.float32)
+    sample_data[:, 0:3] = start_nodes[layer_edges.get_start_indices(), 0:3]
+    sample_data[:, 3] = 1.0
+    sample_data[:, 4:7] = end_nodes[layer_edges.indices, 0:3]
+    return sample_data
+
+
+def get_sample_capacity(sample_data: np.array, sample_length: float, max_sample_points: int) -> np.array:
+    points: np.array = sample_data.reshape(
+        sample_data.shape[0], sample_data.shape[1] // 4, 4)
+    # an edge always keeps its start and end point, even before it was sampled
+    sample_count: np.array = np.clip(
+        points[:, 0, 3].astype(np.int64), 2, points.shape[1])
+    last_points: np.array = points[np.arange(
+        points.shape[0]), sample_count - 1, 0:3]
+    edge_length: np.array = np.linalg.norm(
+        last_points - points[:, 0, 0:3], axis=1)
+    capacity: np.array = np.maximum(np.divide(np.multiply(edge_length, 5.0), sample_length).astype(np.int64) + 2,
+                                    np.multiply(sample_count, 1.1).astype(np.int64) + 2)
+    return np.minimum(capacity, max_sample_points)
+
+
+def compact_sample_data(sample_data: np.array, capacity: np.array) -> Tuple[np.array, np.array]:
+    points: np.array = sample_data.reshape(
+        sample_data.shape[0], sample_data.shape[1] // 4, 4)
+    sample_offset: np.array = np.zeros(points.shape[0] + 1, dtype=np.uint32)
+    np.cumsum(capacity, out=sample_offset[1:])
+
+    # every edge keeps the first samples of its row that fit into its capacity, the rest stays zero padded
+    copy_count: np.array = np.minimum(capacity, points.shape[1])
+    rows: np.array = np.repeat(np.arange(points.shape[0]), copy_count)
+    columns: np.array = np.arange(
+        rows.shape[0]) - np.repeat(np.cumsum(copy_count) - copy_count, copy_count)
+    compacted_data: np.array = np.zeros(
+        (int(sample_offset[-1]), 4), dtype=np.float32)
+    compacted_data[sample_offset[rows].astype(
+        np.int64) + columns] = points[rows, columns]
+    return compacted_data, sample_offset
+
+
+def expand_sample_data(compacted_data: np.array, sample_offset: np.array, max_sample_points: int) -> np.array:
+    points: np.array = compacted_data.reshape(-1, 4)
+    offsets: np.array = sample_offset.astype(np.int64)
+    copy_count: np.array = np.minimum(np.diff(offsets), max_sample_points)
+    rows: np.array = np.repeat(np.arange(copy_count.shape[0]), copy_count)
+    columns: np.array = np.arange(
+        rows.shape[0]) - np.repeat(np.cumsum(copy_count) - copy_count, copy_count)
+    sample_data: np.array = np.zeros(
+        (copy_count.shape[0], max_sample_points, 4), dtype=np.float32)
+    sample_data[rows, columns] = points[offsets[rows] + columns]
+    return sample_data.reshape(copy_count.shape[0], max_sample_points * 4)
+
+
+def split_edge_count(edge_count: int, edge_container_size: int = 1000) -> List[int]:
+    container_edge_count: List[int] = [min(edge_container_size, edge_count - start) for start in
+                                       range(0, edge_count, edge_container_size)]
+    # a layer without edges still gets a single empty container
+    return container_edge_count if len(container_edge_count) > 0 else [0]
+
+
+def split_edges_for_buffer(edges: List[EdgeContainer], edge_container_size: int = 1000) -> List[List[EdgeContainer]]:
+    split_edges: List[List[EdgeContainer]] = []
     for layer_edges in edges:
-        split_layer_edge_container: List[List[Edge]] = []
-        if len(layer_edges) > edge_container_size:
-            current_container: List[Edge] = []
-            current_container_edge_count: int = 0
-            for edge in layer_edges:
-                current_container_edge_count += 1
-                if current_container_edge_count > edge_container_size:
-                    current_container_edge_count = 1
-                    split_layer_edge_container.append(current_container)
-                    current_container = []
-                else:
-                    current_container.append(edge)
-            split_layer_edge_container.append(current_container)
-        else:
-            split_layer_edge_container.append(layer_edges)
+        split_layer_edge_container: List[EdgeContainer] = []
+        container_start: int = 0
+        for container_edge_count in split_edge_count(len(layer_edges), edge_container_size):
+            split_layer_edge_container.append(
+                layer_edges.slice(container_start, container_start + container_edge_count))
+            container_start += container_edge_count
         split_edges.append(split_layer_edge_container)
 
     return split_edges
 
 
-def create_edges_random(layer_nodes: List[List[Node]], num_classes: int, padding: int) -> List[List[Edge]]:
-    edges: List[List[Edge]] = []
-    for i in range(len(layer_nodes) - 1):
-        layer_edges: List[Edge] = []
-        for node_one_i, node_one in enumerate(layer_nodes[i]):
-            for node_two_i, node_two in enumerate(layer_nodes[i + 1]):
-                new_edge: Edge = Edge().random_importance_init(num_classes, padding, node_one, node_two, i,
-                                                               node_one_i * len(
-                                                                   layer_nodes[i + 1]) + node_two_i)
-                layer_edges.append(new_edge)
-        edges.append(layer_edges)
-    return edges
+def get_layer_importance(node_data: List[np.array], edge_layers: List[SparseEdgeLayer], num_classes: int) \
+        -> List[np.array]:
+    return [layer_edges.importance * node_data[i][layer_edges.get_start_indices(), num_classes + 4] for
+            i, layer_edges in enumerate(edge_layers)]
 
 
-def create_edges_importance(layer_nodes: List[List[Node]], edge_data: np.array, num_classes: int, padding: int) \
-        -> List[List[Edge]]:
-    edges: List[List[Edge]] = []
-    for i in range(len(layer_nodes) - 1):
-        layer_edges: List[Edge] = []
-        for node_one_i, node_one in enumerate(layer_nodes[i]):
-            for node_two_i, node_two in enumerate(layer_nodes[i + 1]):
-                new_edge: Edge = Edge().importance_init(num_classes, padding, node_one, node_two, i, node_one_i * len(
-                    layer_nodes[i + 1]) + node_two_i, edge_data[i][node_one_i][node_two_i])
-                layer_edges.append(new_edge)
-        edges.append(layer_edges)
+def create_edges(node_data: List[np.array], edge_layers: List[SparseEdgeLayer]) -> List[EdgeContainer]:
+    layer_node_offsets: List[int] = np.cumsum(
+        np.array([0] + [layer_data.shape[0] for layer_data in node_data], dtype=np.int64)).tolist()
+    edges: List[EdgeContainer] = []
+    for i, layer_edges in enumerate(edge_layers):
+        edges.append(EdgeContainer(create_layer_edge_data(i, layer_edges, layer_node_offsets[i],
+                                                          layer_node_offsets[i + 1]),
+                                   create_layer_sample_data(node_data[i], node_data[i + 1], layer_edges)))
     return edges
 
 
-def create_edges_processed(edge_data: np.array, sample_data: np.array) -> List[List[Edge]]:
-    edges: List[List[Edge]] = []
+def convert_legacy_edge_data(edge_data: np.array, layer_nodes: List[int]) -> np.array:
+    # older processed files stored both class importance vectors per edge instead of the node indices
+    layer_node_offsets: np.array = np.cumsum([0] + layer_nodes)
+    layer_ids: np.array = edge_data[:, 1].astype(np.int64)
+    layer_edge_ids: np.array = edge_data[:, 2].astype(np.int64)
+    end_counts: np.array = np.asarray(layer_nodes)[layer_ids + 1]
+
+    converted_edge_data: np.array = np.zeros(
+        (edge_data.shape[0], get_buffer_object_size(0, ADDITIONAL_EDGE_BUFFER_DATA)), dtype=np.float32)
+    converted_edge_data[:, 0:4] = edge_data[:, 0:4]
+    converted_edge_data[:, 4] = layer_node_offsets[layer_ids] + \
+        layer_edge_ids // end_counts
+    converted_edge_data[:, 5] = layer_node_offsets[layer_ids +
+                                                   1] + layer_edge_ids % end_counts
+    return converted_edge_data
+
+
+def create_edges_processed(edge_data: List[List[np.array]], sample_data: List[List[np.array]]) \
+        -> List[EdgeContainer]:
+    edges: List[EdgeContainer] = []
     for layer_edge_data, layer_sample_data in zip(edge_data, sample_data):
-        layer_edges: List[Edge] = []
-        for container_edge_data, container_sample_data in zip(layer_edge_data, layer_sample_data):
-            for edge_data, sample_data in zip(container_edge_data, container_sample_data):
-                edge: Edge = Edge().data_init(edge_data, sample_data)
-                layer_edges.append(edge)
-        edges.append(layer_edges)
+        edges.append(EdgeContainer(np.concatenate(layer_edge_data).astype(np.float32),
+                                   np.concatenate(layer_sample_data).astype(np.float32)))
     return edges
@@ -1,3 +1,4 @@
+import copy
 from typing import List, Tuple
 
 from pyrr import Matrix44, Vector3, Vector4, matrix44, vector4
@@ -30,14 +31,9 @@ class Grid:
             self.bounding_volume[0].z, self.bounding_volume[1].z = bounding_volume[0].z - extend_by, \
                 bounding_volume[0].z + layer_distance + extend_by
 
-        self.grid_cell_count: List[int] = [
-            int((
-                self.bounding_volume[1].x - self.bounding_volume[0].x) / self.grid_cell_size.x) + 1,
-            int((
-                self.bounding_volume[1].y - self.bounding_volume[0].y) / self.grid_cell_size.y) + 1,
-            int((self.bounding_volume[1].z - self.bounding_volume[0].z) / self.grid_cell_size.z) + 1]
-        self.grid_cell_count_overall: int = self.grid_cell_count[0] * \
-            self.grid_cell_count[1] * self.grid_cell_count[2]
+        self.grid_cell_count: List[int] = []
+        self.grid_cell_count_overall: int = 0
+        self.set_cell_count()
 
         self.extends: List[Vector4] = [vector4.create_from_vector3(self.bounding_volume[0], 1.0),
                                        vector4.create_from_vector3(self.bounding_volume[1], 1.0)]
@@ -56,6 +52,23 @@ class Grid:
                     self.bounding_volume[1].y, self.bounding_volume[1].z, 1.0])
         ])
 
+    def set_cell_count(self) -> None:
+        self.grid_cell_count = [
+            int((
+                self.bounding_volume[1].x - self.bounding_volume[0].x) / self.grid_cell_size.x) + 1,
+            int((
+                self.bounding_volume[1].y - self.bounding_volume[0].y) / self.grid_cell_size.y) + 1,
+            int((self.bounding_volume[1].z - self.bounding_volume[0].z) / self.grid_cell_size.z) + 1]
+        self.grid_cell_count_overall = self.grid_cell_count[0] * \
+            self.grid_cell_count[1] * self.grid_cell_count[2]
+
+    def coarsen(self, factor: int) -> 'Grid':
+        # grid covering the same volume with cells factor times as large, the bounds are not extended again
+        coarse_grid: Grid = copy.copy(self)
+        coarse_grid.grid_cell_size = self.grid_cell_size * factor
+        coarse_grid.set_cell_count()
+        return coarse_grid
+
     def get_near_far_from_view(self, view: Matrix44) -> Tuple[float, float]:
         nearest_view_z: float = -1000000
         farthest_view_z: float = 1000000
@@ -1,27 +1,32 @@
 import logging
-import math
 from typing import List, Optional, Tuple
 
 import numpy as np
 from pyrr import Vector3
 
 from data.data_handler import ImportanceDataHandler, ProcessedNNHandler
-from definitions import ADDITIONAL_EDGE_BUFFER_DATA
-from models.edge import (Edge, create_edges_importance, create_edges_processed,
-                         create_edges_random, split_edges_for_buffer)
-from models.node import (Node, create_nodes_from_data,
+from definitions import EXACT_PRUNE_EDGE_LIMIT
+from models.edge import (EdgeContainer, SparseEdgeLayer, create_edges,
+                         create_edges_processed, create_random_layer,
+                         get_layer_importance)
+from models.node import (Node, NodeLayout, apply_node_layout,
+                         create_node_views, create_nodes_from_data,
                          create_nodes_with_importance, create_random_nodes)
-from opengl_helper.buffer import get_buffer_padding
+from utility.distance import (combine_means, max_pair_distance,
+                              mean_midpoint_pair_distance, mean_pair_distance)
+from utility.quantile import select_quantile, stream_quantile
 
 
 class NetworkModel:
     def __init__(self, layer: List[int], layer_width: float, layer_distance: float,
                  importance_data: Optional[ImportanceDataHandler] = None, processed_nn: Optional[ProcessedNNHandler] = None,
-                 prune_percentage: float = 0.1) -> None:
+                 prune_percentage: float = 0.1, exact_prune_edge_limit: int = EXACT_PRUNE_EDGE_LIMIT,
+                 node_layout: NodeLayout = NodeLayout.GRID) -> None:
         self.layer: List[int] = layer
         self.layer_width: float = layer_width
         self.layer_distance: float = layer_distance
         self.prune_percentage: float = prune_percentage
+        self.exact_prune_edge_limit: int = exact_prune_edge_limit
         self.num_classes: int = layer[len(layer) - 1]
 
         self.bounding_volume: Tuple[Vector3, Vector3] = (
@@ -36,220 +41,181 @@ class NetworkModel:
         self.bounding_range = Vector3(
             [abs(self.bounding_range.x), abs(self.bounding_range.y), abs(self.bounding_range.z)])
 
-        self.layer_nodes: List[List[Node]] = []
+        self.node_data: List[np.array] = []
+        self.edge_layers: List[SparseEdgeLayer] = []
         self.edge_data: np.array = []
         self.sample_data: np.array = []
-        self.edge_importance_only: bool = False
 
         if importance_data is not None:
-            self.layer_nodes = create_nodes_with_importance(self.layer, self.bounding_mid,
-                                                            (self.bounding_volume[0].x,
-                                                             self.bounding_volume[1].x),
-                                                            (self.bounding_volume[0].y,
-                                                             self.bounding_volume[1].y),
-                                                            (self.bounding_volume[0].z,
-                                                             self.bounding_volume[1].z),
-                                                            importance_data.node_importance_data)
-            self.edge_data = importance_data.edge_importance_data
-            self.edge_importance_only = True
+            self.node_data = create_nodes_with_importance(self.layer, self.bounding_mid,
+                                                          (self.bounding_volume[0].x,
+                                                           self.bounding_volume[1].x),
+                                                          (self.bounding_volume[0].y,
+                                                           self.bounding_volume[1].y),
+                                                          (self.bounding_volume[0].z,
+                                                           self.bounding_volume[1].z),
+                                                          importance_data.node_importance_data)
+            self.edge_layers = importance_data.edge_layers
+            apply_node_layout(self.node_data, self.num_classes, node_layout)
         elif processed_nn is not None:
-            self.layer_nodes = create_nodes_from_data(
+            self.node_data = create_nodes_from_data(
                 self.layer, processed_nn.node_data)
             self.edge_data = processed_nn.edge_data
             self.sample_data = processed_nn.sample_data
         else:
-            self.layer_nodes = create_random_nodes(self.layer, self.bounding_mid,
-                                                   (self.bounding_volume[0].x,
-                                                    self.bounding_volume[1].x),
-                                                   (self.bounding_volume[0].y,
-                                                    self.bounding_volume[1].y),
-                                                   (self.bounding_volume[0].z,
-                                                    self.bounding_volume[1].z))
-        self.edge_count: int = 0
-        for i in range(len(self.layer) - 1):
-            self.edge_count += len(self.layer_nodes[i]) * \
-                len(self.layer_nodes[i + 1])
+            self.node_data = create_random_nodes(self.layer, self.bounding_mid,
+                                                 (self.bounding_volume[0].x,
+                                                  self.bounding_volume[1].x),
+                                                 (self.bounding_volume[0].y,
+                                                  self.bounding_volume[1].y),
+                                                 (self.bounding_volume[0].z,
+                                                  self.bounding_volume[1].z))
+            self.edge_layers = [create_random_layer(self.node_data[i].shape[0], self.node_data[i + 1].shape[0]) for
+                                i in range(len(self.layer) - 1)]
+            apply_node_layout(self.node_data, self.num_classes, node_layout)
+        self.edge_count: int = self.read_edge_count()
         self.pruned_edges: int = 0
-        self.average_node_distance: float = layer_width * \
-            0.75  # self.get_average_node_distance()
-        self.average_edge_distance: float = layer_width * \
-            0.5  # self.get_average_edge_distance()
+        self.average_node_distance: float = self.get_average_node_distance()
+        self.average_edge_distance: float = self.get_average_edge_distance()
 
         self.node_min_importance: float = self.read_node_min_importance()
         self.node_max_importance: float = self.read_node_max_importance()
         self.edge_min_importance: float = 0.0
         self.edge_max_importance: float = 1.0
 
-    def get_nodes(self) -> List[Node]:
-        node_data: List[Node] = []
-        for layer in self.layer_nodes:
-            for node in layer:
-                node_data.append(node)
-        return node_data
-
-    def set_nodes(self, node_data: List[Node]) -> None:
-        read_node_index: int = 0
-        for i, layer in enumerate(self.layer_nodes):
-            new_nodes = []
-            for _ in layer:
-                new_nodes.append(node_data[read_node_index])
-                read_node_index += 1
-            self.layer_nodes[i] = new_nodes
-
-        self.edge_count = 0
-        for i in range(len(self.layer) - 1):
-            self.edge_count += len(self.layer_nodes[i]) * \
-                len(self.layer_nodes[i + 1])
+    @property
+    def layer_nodes(self) -> List[List[Node]]:
+        return create_node_views(self.node_data)
+
+    def get_nodes(self) -> np.array:
+        return np.concatenate(self.node_data)
+
+    def set_nodes(self, node_data: np.array) -> None:
+        layer_offsets: List[int] = np.cumsum(
+            [layer.shape[0] for layer in self.node_data])[:-1].tolist()
+        self.node_data = [np.array(layer_data, dtype=np.float32) for layer_data in
+                          np.split(node_data.reshape(-1, self.node_data[0].shape[1]), layer_offsets)]
+
+        self.edge_count = self.read_edge_count()
 
         self.node_min_importance = self.read_node_min_importance()
         self.node_max_importance = self.read_node_max_importance()
 
-    def generate_filtered_edges(self, edge_container_size: int = 500) -> List[List[List[Edge]]]:
+    def read_edge_count(self) -> int:
+        edge_count: int = 0
+        for i in range(len(self.layer) - 1):
+            edge_count += self.node_data[i].shape[0] * \
+                self.node_data[i + 1].shape[0]
+        return edge_count
+
+    def generate_filtered_edges(self) -> List[EdgeContainer]:
         self.pruned_edges = 0
         self.edge_min_importance = 10000.0
         self.edge_max_importance = 0.0
 
-        padding: int = get_buffer_padding(
-            self.num_classes * 2, ADDITIONAL_EDGE_BUFFER_DATA)
-        edges: List[List[Edge]] = []
-        if len(self.edge_data) == 0:
-            edges = create_edges_random(
-                self.layer_nodes, self.num_classes, padding)
-        elif self.edge_importance_only:
-            edges = create_edges_importance(
-                self.layer_nodes, self.edge_data, self.num_classes, padding)
+        # importance and random edges stay sparse until pruned, only processed edges are already materialized
+        processed_edges: List[EdgeContainer] = []
+        edge_importance_values: List[np.array] = []
+        if len(self.edge_layers) > 0:
+            edge_importance_values = get_layer_importance(
+                self.node_data, self.edge_layers, self.num_classes)
         else:
-            edges = create_edges_processed(self.edge_data, self.sample_data)
+            processed_edges = create_edges_processed(
+                self.edge_data, self.sample_data)
+            node_importance: np.array = np.concatenate(
+                self.node_data)[:, self.num_classes + 4]
+            edge_importance_values = [layer_edge.get_importance(
+                node_importance) for layer_edge in processed_edges]
 
         existing_edges: int = 0
-        for layer_edge in edges:
-            existing_edges += len(layer_edge)
+        for layer_importance in edge_importance_values:
+            existing_edges += layer_importance.shape[0]
         self.pruned_edges = self.edge_count - existing_edges
 
-        edge_importance_values: List[float] = []
-        for layer_edge in edges:
-            for edge in layer_edge:
-                edge_importance_values.append(edge.data[3] * edge.data[6])
-
         importance_prune_threshold: float = -1.0
-        if self.prune_percentage > 0.0:
-            sorted_importance_list = np.sort(np.array(edge_importance_values))
-            lowest_importance: float = sorted_importance_list[0]
-            highest_importance: float = sorted_importance_list[sorted_importance_list.shape[0] - 1]
+        if self.prune_percentage > 0.0 and existing_edges > 0:
+            lowest_importance: float = min([float(np.min(layer_importance)) for layer_importance in
+                                            edge_importance_values if layer_importance.shape[0] > 0])
+            highest_importance: float = max([float(np.max(layer_importance)) for layer_importance in
+                                             edge_importance_values if layer_importance.shape[0] > 0])
             if not lowest_importance == highest_importance:
-                importance_prune_threshold = sorted_importance_list[
-                    int(len(edge_importance_values) * self.prune_percentage)]
+                if existing_edges > self.exact_prune_edge_limit:
+                    importance_prune_threshold = stream_quantile(
+                        edge_importance_values, self.prune_percentage)
+                else:
+                    importance_prune_threshold = select_quantile(
+                        np.concatenate(edge_importance_values), self.prune_percentage)
             else:
                 logging.info(
                     'Pruning ignored, because all importance values are equal.')
 
-        filtered_edges: List[List[Edge]] = []
-        for layer_edge in edges:
-            filtered_layer_edges: List[Edge] = []
-            for edge in layer_edge:
-                if edge.data[3] * edge.data[6] > importance_prune_threshold:
-                    if self.edge_min_importance > edge.data[3] * edge.data[6]:
-                        self.edge_min_importance = edge.data[3] * edge.data[6]
-                    if self.edge_max_importance < edge.data[3] * edge.data[6]:
-                        self.edge_max_importance = edge.data[3] * edge.data[6]
-                    filtered_layer_edges.append(edge)
-                else:
-                    self.pruned_edges += 1
-            filtered_edges.append(filtered_layer_edges)
-        return split_edges_for_buffer(filtered_edges, edge_container_size)
+        importance_masks: List[np.array] = []
+        for layer_importance in edge_importance_values:
+            importance_mask: np.array = layer_importance > importance_prune_threshold
+            self.pruned_edges += layer_importance.shape[0] - int(
+                np.count_nonzero(importance_mask))
+            if np.any(importance_mask):
+                self.edge_min_importance = min(self.edge_min_importance,
+                                               float(np.min(layer_importance[importance_mask])))
+                self.edge_max_importance = max(self.edge_max_importance,
+                                               float(np.max(layer_importance[importance_mask])))
+            importance_masks.append(importance_mask)
+
+        if len(self.edge_layers) > 0:
+            return create_edges(self.node_data, [layer_edges.select(importance_mask) for layer_edges, importance_mask
+                                                 in zip(self.edge_layers, importance_masks)])
+        return [layer_edge.select(importance_mask) for layer_edge, importance_mask in
+                zip(processed_edges, importance_masks)]
 
     def generate_max_distance(self) -> float:
         max_distance: float = 0.0
         for i in range(len(self.layer) - 1):
-            for node_one in self.layer_nodes[i]:
-                for node_two in self.layer_nodes[i + 1]:
-                    distance: float = (node_one.position -
-                                       node_two.position).length
-                    if max_distance < distance:
-                        max_distance = distance
+            max_distance = max(max_distance, max_pair_distance(self.node_data[i][:, 0:3],
+                                                               self.node_data[i + 1][:, 0:3]))
         return max_distance
 
     def get_average_edge_distance(self) -> float:
-        distance_sum: float = 0.0
-        distance_value_count: int = 0
-        edge_positions: List[List[Vector3]] = []
-        for i in range(len(self.layer) - 1):
-            layer_edge_position: List[Vector3] = []
-            for node_one in self.layer_nodes[i]:
-                for node_two in self.layer_nodes[i + 1]:
-                    layer_edge_position.append(
-                        (node_one.position + node_two.position) / 2.0)
-            edge_positions.append(layer_edge_position)
-            distance_value_count += (len(layer_edge_position)
-                                     * (len(layer_edge_position) - 1))
+        layer_means: List[Tuple[float, float]] = []
+        layer_weights: List[float] = []
         for i in range(len(self.layer) - 1):
-            for edge_one in edge_positions[i]:
-                for edge_two in edge_positions[i]:
-                    distance_sum += math.sqrt(
-                        (edge_one.x - edge_two.x) * (edge_one.x - edge_two.x)
-                        + (edge_one.y - edge_two.y) * (edge_one.y - edge_two.y)
-                        + (edge_one.z - edge_two.z) * (edge_one.z - edge_two.z))
-        return distance_sum / distance_value_count
+            layer_edges: int = self.node_data[i].shape[0] * \
+                self.node_data[i + 1].shape[0]
+            layer_means.append(mean_midpoint_pair_distance(
+                self.node_data[i][:, 0:3], self.node_data[i + 1][:, 0:3]))
+            layer_weights.append(float(layer_edges * (layer_edges - 1)))
+        distance, error = combine_means(layer_means, layer_weights)
+        logging.info(
+            f'Average edge distance: {distance:.4f} (standard error {error:.4f})')
+        return distance
 
     def get_average_node_distance(self) -> float:
-        distance_sum: float = 0.0
-        distance_value_count: int = 0
+        layer_means: List[Tuple[float, float]] = []
+        layer_weights: List[float] = []
         for i in range(len(self.layer)):
-            distance_value_count += len(self.layer_nodes[i]) * (
-                len(self.layer_nodes[i]) - 1)
-        for i in range(len(self.layer)):
-            layer_distance_sum: float = 0.0
-            for node_one in self.layer_nodes[i]:
-                for node_two in self.layer_nodes[i]:
-                    layer_distance_sum += math.sqrt(
-                        (node_one.position.x - node_two.position.x) *
-                        (node_one.position.x - node_two.position.x)
-                        + (node_one.position.y - node_two.position.y) *
-                        (node_one.position.y - node_two.position.y)
-                        + (node_one.position.z - node_two.position.z) * (node_one.position.z - node_two.position.z))
-            distance_sum += layer_distance_sum / float(distance_value_count)
-        return distance_sum
+            layer_node_count: int = self.node_data[i].shape[0]
+            layer_means.append(mean_pair_distance(self.node_data[i][:, 0:3]))
+            layer_weights.append(
+                float(layer_node_count * (layer_node_count - 1)))
+        distance, error = combine_means(layer_means, layer_weights)
+        logging.info(
+            f'Average node distance: {distance:.4f} (standard error {error:.4f})')
+        return distance
 
     def get_node_mid(self) -> Vector3:
-        node_position_min_x: float = 0.0
-        node_position_max_x: float = 0.0
-        mid_position_x: float = 0.0
-        node_position_min_y: float = 0.0
-        node_position_max_y: float = 0.0
-        mid_position_y: float = 0.0
-        position_count: int = 0
-        for i in range(len(self.layer)):
-            position_count += len(self.layer_nodes[i])
-        for i in range(len(self.layer)):
-            for node_one in self.layer_nodes[i]:
-                mid_position_x += node_one.position.x
-                mid_position_y += node_one.position.y
-                node_position_min_x = node_one.position.x if node_one.position.x < node_position_min_x \
-                    else node_position_min_x
-                node_position_min_y = node_one.position.y if node_one.position.y < node_position_min_y \
-                    else node_position_min_y
-                node_position_max_x = node_one.position.x if node_one.position.x > node_position_max_x \
-                    else node_position_max_x
-                node_position_max_y = node_one.position.y if node_one.position.y > node_position_max_y \
-                    else node_position_max_y
+        node_positions: np.array = np.concatenate(self.node_data)[:, 0:2]
+        node_position_min: np.array = np.minimum(
+            np.min(node_positions, axis=0), 0.0)
+        node_position_max: np.array = np.maximum(
+            np.max(node_positions, axis=0), 0.0)
+        mid_position: np.array = np.mean(node_positions, axis=0)
         return Vector3(
-            [(node_position_min_x + node_position_max_x) * 0.25 + 0.5 * mid_position_x / position_count,
-             (node_position_min_y + node_position_max_y) *
-             0.25 + 0.5 * mid_position_y / position_count,
+            [(node_position_min[0] + node_position_max[0]) * 0.25 + 0.5 * mid_position[0],
+             (node_position_min[1] + node_position_max[1]) *
+             0.25 + 0.5 * mid_position[1],
              0.0])
 
     def read_node_min_importance(self) -> float:
-        min_importance: float = 10000.0
-        for nodes in self.layer_nodes:
-            for node in nodes:
-                if node.data[self.num_classes + 4] < min_importance:
-                    min_importance = node.data[self.num_classes + 4]
-        return min_importance
+        return float(min(np.min(layer_data[:, self.num_classes + 4]) for layer_data in self.node_data))
 
     def read_node_max_importance(self) -> float:
-        max_importance: float = 0.0
-        for nodes in self.layer_nodes:
-            for node in nodes:
-                if node.data[self.num_classes + 4] > max_importance:
-                    max_importance = node.data[self.num_classes + 4]
-        return max_importance
+        return float(max(np.max(layer_data[:, self.num_classes + 4]) for layer_data in self.node_data))
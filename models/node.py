@@ -1,103 +1,148 @@
 from __future__ import annotations
 
 import math
-import random
-from typing import List, Optional, Tuple
+from enum import IntEnum
+from typing import Any, List, Optional, Tuple
 
 import numpy as np
 from pyrr import Vector3
 
 from definitions import ADDITIONAL_NODE_BUFFER_DATA
-from opengl_helper.buffer import get_buffer_padding
+from opengl_helper.buffer import get_buffer_object_size
+
+
+class NodeLayout(IntEnum):
+    GRID = 0
+    PCA = 1
+    SPECTRAL = 2
 
 
 class Node:
-    def __init__(self, node_id: int, input_edges: int = 0, output_edges: int = 0) -> None:
+    def __init__(self, node_id: int, data: np.array, input_edges: int = 0, output_edges: int = 0) -> None:
         self.node_id: int = node_id
         self.input_edges: int = input_edges
         self.output_edges: int = output_edges
-        self.position: Vector3 = Vector3([0.0, 0.0, 0.0])
-        self.data: List[float] = []
-
-    def data_init(self, data: np.array) -> Node:
-        self.data = []
-        self.position = Vector3([data[0], data[1], data[2]])
-
-        for d in data:
-            self.data.append(d)
-
-        return self
-
-    def importance_init(self, num_classes: int, padding: int, position: Vector3, data: np.array) -> Node:
-        self.data = []
-        if position is not None:
-            self.position = position
-            self.data = [position.x, position.y, position.z, 1.0]
-
-        importance_sum: float = 0
-        importance_squared_sum: float = 0
-        for d in data:
-            importance_sum += d
-            importance_squared_sum += d * d
-            self.data.append(d)
-        self.data.append(importance_sum / num_classes)
-        self.data.append(math.sqrt(importance_squared_sum))
-        for _ in range(padding):
-            self.data.append(0.0)
-
-        return self
-
-    def random_importance_init(self, num_classes: int, padding: int, position: Vector3) -> Node:
-        self.position = position
-        self.data = [position.x, position.y, position.z, 1.0]
-
-        importance_sum: float = 0
-        importance_squared_sum: float = 0
-        position_max_0: int = int(random.random() * num_classes)
-        for i in range(num_classes):
-            if i == position_max_0:
-                random_value = random.random()
-                second_try = random.random()
-                random_value = (random_value if random_value >
-                                second_try else second_try)
-                importance_sum += random_value
-                importance_squared_sum += random_value * random_value
-                self.data.append(random_value)
-            else:
-                random_value = random.random()
-                second_try = random.random()
-                random_value = (random_value if random_value <
-                                second_try else second_try)
-                random_value = random_value * random_value
-                importance_sum += random_value
-                importance_squared_sum += random_value * random_value
-                self.data.append(random_value)
-        self.data.append(importance_sum / num_classes)
-        self.data.append(math.sqrt(importance_squared_sum))
-        for _ in range(padding):
-            self.data.append(0.0)
-        return self
-
-    def class_importance_init(self, num_classes: int, padding: int, position: Vector3) -> Node:
-        self.position = position
-        self.data = [position.x, position.y, position.z, 1.0]
-
-        for i in range(num_classes):
-            if i == self.node_id:
-                self.data.append(1.0)
-            else:
-                self.data.append(0.0)
-        self.data.append(0.1)
-        self.data.append(1.0)
-        for _ in range(padding):
-            self.data.append(0.0)
-        return self
+        self.data: np.array = data
+
+    @property
+    def position(self) -> Vector3:
+        return Vector3(self.data[0:3])
 
     def reset_position(self, position: Vector3) -> None:
-        self.position = position
-        self.data[0] = position.x
-        self.data[1] = position.y
-        self.data[2] = position.z
+        self.data[0:3] = position.xyz
+
+
+def create_layer_positions(layer_nodes: List[int],
+                           layer: int,
+                           center_position: Vector3,
+                           x_range: Tuple[float, float],
+                           y_range: Tuple[float, float],
+                           z_range: Tuple[float, float],
+                           node_size: Optional[float] = None) -> np.array:
+    node_count: int = layer_nodes[layer]
+    nodes_sqrt: int = max(math.ceil(math.sqrt(node_count)), 1)
+    node_size_x: float = node_size if node_size is not None else abs(
+        x_range[1] - x_range[0]) / nodes_sqrt
+    node_size_y: float = node_size if node_size is not None else abs(
+        y_range[1] - y_range[0]) / nodes_sqrt
+    layer_t: float = layer / (len(layer_nodes) - 1)
+
+    node_index: np.array = np.arange(node_count)
+    positions: np.array = np.ones((node_count, 4), dtype=np.float32)
+    positions[:, 0] = ((node_index % nodes_sqrt) -
+                       (nodes_sqrt - 1.0) / 2.0) * node_size_x + center_position.x
+    positions[:, 1] = ((node_index // nodes_sqrt) -
+                       (nodes_sqrt - 1.0) / 2.0) * node_size_y + center_position.y
+    positions[:, 2] = z_range[0] * (1 - layer_t) + z_range[1] * layer_t
+    return positions
+
+
+def create_layer_data(positions: np.array, importance: np.array, num_classes: int,
+                      overall_importance: Optional[np.array] = None,
+                      importance_length: Optional[np.array] = None) -> np.array:
+    layer_data: np.array = np.zeros(
+        (positions.shape[0], get_buffer_object_size(num_classes, ADDITIONAL_NODE_BUFFER_DATA)), dtype=np.float32)
+    layer_data[:, 0:4] = positions
+    layer_data[:, 4:(num_classes + 4)] = importance
+    layer_data[:, num_classes + 4] = np.sum(importance, axis=1) / num_classes \
+        if overall_importance is None else overall_importance
+    layer_data[:, num_classes + 5] = np.sqrt(np.sum(importance * importance, axis=1)) \
+        if importance_length is None else importance_length
+    return layer_data
+
+
+def random_importance(node_count: int, num_classes: int, rng: Optional[np.random.Generator] = None) -> np.array:
+    random: Any = np.random if rng is None else rng
+    # one dominant class per node (max of two draws), squared minimum of two draws for all others
+    importance: np.array = np.square(np.minimum(random.random((node_count, num_classes)),
+                                                random.random((node_count, num_classes))))
+    max_class: np.array = (random.random(node_count) *
+                           num_classes).astype(np.int32)
+    importance[np.arange(node_count), max_class] = np.maximum(random.random(node_count),
+                                                              random.random(node_count))
+    return importance
+
+
+def get_class_profiles(node_data: List[np.array], num_classes: int) -> np.array:
+    importance: np.array = np.concatenate(
+        node_data)[:, 4:(num_classes + 4)].astype(np.float64)
+    importance_length: np.array = np.linalg.norm(
+        importance, axis=1, keepdims=True)
+    return importance / np.where(importance_length > 0.0, importance_length, 1.0)
+
+
+def pad_embedding(embedding: np.array) -> np.array:
+    return np.pad(embedding[:, 0:2], ((0, 0), (0, max(2 - embedding.shape[1], 0))))
+
+
+def pca_embedding(class_profiles: np.array) -> np.array:
+    centered_profiles: np.array = class_profiles - \
+        np.mean(class_profiles, axis=0)
+    _, _, components = np.linalg.svd(centered_profiles, full_matrices=False)
+    return pad_embedding(centered_profiles @ components.T)
+
+
+def spectral_embedding(class_profiles: np.array) -> np.array:
+    # the cosine affinity of the profiles has rank num_classes, so the normalized affinity eigenvectors follow from
+    # a thin svd of the degree scaled profiles without building the node x node matrix
+    degree: np.array = np.maximum(
+        class_profiles @ np.sum(class_profiles, axis=0), 1e-12)
+    eigenvectors, _, _ = np.linalg.svd(
+        class_profiles / np.sqrt(degree)[:, None], full_matrices=False)
+    # skip the trivial eigenvector and map back to random walk coordinates
+    return pad_embedding(eigenvectors[:, 1:3] / np.sqrt(degree)[:, None])
+
+
+def snap_to_grid(grid_positions: np.array, embedding: np.array) -> np.array:
+    # rows of the layer grid take the nodes in embedding y order, each row is filled in embedding x order
+    node_count: int = grid_positions.shape[0]
+    nodes_sqrt: int = max(math.ceil(math.sqrt(node_count)), 1)
+    grid_row: np.array = np.empty(node_count, dtype=np.int64)
+    grid_row[np.argsort(embedding[:, 1], kind='stable')
+             ] = np.arange(node_count) // nodes_sqrt
+    grid_order: np.array = np.lexsort((embedding[:, 0], grid_row))
+    positions: np.array = np.empty_like(grid_positions)
+    positions[grid_order] = grid_positions
+    return positions
+
+
+def apply_node_layout(node_data: List[np.array], num_classes: int, node_layout: NodeLayout) -> None:
+    if node_layout == NodeLayout.GRID:
+        return
+    # one embedding for all layers keeps the orientation of consecutive layers consistent
+    class_profiles: np.array = get_class_profiles(node_data, num_classes)
+    if node_layout == NodeLayout.PCA:
+        embedding: np.array = pca_embedding(class_profiles)
+    elif node_layout == NodeLayout.SPECTRAL:
+        embedding = spectral_embedding(class_profiles)
+    else:
+        raise Exception(f'Unknown node layout {node_layout}.')
+
+    layer_offset: int = 0
+    for layer_data in node_data:
+        layer_data[:, 0:4] = snap_to_grid(layer_data[:, 0:4],
+                                          embedding[layer_offset:(layer_offset + layer_data.shape[0])])
+        layer_offset += layer_data.shape[0]
 
 
 def create_random_nodes(layer_nodes: List[int],
@@ -105,59 +150,20 @@ def create_random_nodes(layer_nodes: List[int],
                         x_range: Tuple[float, float],
                         y_range: Tuple[float, float],
                         z_range: Tuple[float, float],
-                        node_size: Optional[float] = None) -> List[List[Node]]:
-    nodes: List[List[Node]] = []
+                        node_size: Optional[float] = None) -> List[np.array]:
+    nodes: List[np.array] = []
     num_classes: int = layer_nodes[len(layer_nodes) - 1]
-    padding: int = get_buffer_padding(num_classes, ADDITIONAL_NODE_BUFFER_DATA)
     for layer, node_count in enumerate(layer_nodes):
-        input_edges: int = 0
-        output_edges: int = 0
-        if 0 < layer:
-            input_edges = layer_nodes[layer - 1]
-        if layer < len(layer_nodes) - 1:
-            output_edges = layer_nodes[layer + 1]
-        nodes_sqrt = math.ceil(math.sqrt(node_count))
-
-        current_layer_nodes: List[Node] = []
-        if node_count <= 1:
-            position = Vector3(
-                [center_position.x,
-                 center_position.y,
-                 z_range[0] * (1 - layer / (len(layer_nodes) - 1)) + z_range[1] * layer / (len(layer_nodes) - 1)])
-            new_node = Node(len(current_layer_nodes),
-                            input_edges, output_edges)
-            if layer is not len(layer_nodes) - 1:
-                new_node = new_node.random_importance_init(
-                    num_classes, padding, position)
-            else:
-                new_node = new_node.class_importance_init(
-                    num_classes, padding, position)
-            current_layer_nodes.append(new_node)
+        positions: np.array = create_layer_positions(layer_nodes, layer, center_position, x_range, y_range, z_range,
+                                                     node_size)
+        if layer is not len(layer_nodes) - 1:
+            nodes.append(create_layer_data(positions, random_importance(
+                node_count, num_classes), num_classes))
         else:
-            node_size_x: float = node_size if node_size is not None else abs(
-                x_range[1] - x_range[0]) / nodes_sqrt
-            node_size_y: float = node_size if node_size is not None else abs(
-                y_range[1] - y_range[0]) / nodes_sqrt
-            for i in range(node_count):
-                pos_x: float = (i % nodes_sqrt) - (nodes_sqrt - 1.0) / 2.0
-                pos_y: float = (math.floor(i / nodes_sqrt)) - \
-                    (nodes_sqrt - 1.0) / 2.0
-                position = Vector3(
-                    [pos_x * node_size_x + center_position.x,
-                     pos_y * node_size_y + center_position.y,
-                     z_range[0] * (1 - layer / (len(layer_nodes) - 1)) + z_range[1] * layer / (
-                         len(layer_nodes) - 1)])
-                new_node = Node(
-                    len(current_layer_nodes), input_edges, output_edges)
-                if layer is not len(layer_nodes) - 1:
-                    new_node = new_node.random_importance_init(
-                        num_classes, padding, position)
-                else:
-                    new_node = new_node.class_importance_init(
-                        num_classes, padding, position)
-                current_layer_nodes.append(new_node)
-
-        nodes.append(current_layer_nodes)
+            nodes.append(create_layer_data(positions, np.eye(node_count, num_classes, dtype=np.float32), num_classes,
+                                           overall_importance=np.full(
+                                               node_count, 0.1),
+                                           importance_length=np.ones(node_count)))
     return nodes
 
 
@@ -167,75 +173,30 @@ def create_nodes_with_importance(layer_nodes: List[int],
                                  y_range: Tuple[float, float],
                                  z_range: Tuple[float, float],
                                  node_importance_data: List[np.array],
-                                 node_size: Optional[float] = None) -> List[List[Node]]:
-    nodes: List[List[Node]] = []
+                                 node_size: Optional[float] = None) -> List[np.array]:
+    nodes: List[np.array] = []
     num_classes: int = layer_nodes[len(layer_nodes) - 1]
-    padding: int = get_buffer_padding(num_classes, ADDITIONAL_NODE_BUFFER_DATA)
     for layer, node_count in enumerate(layer_nodes):
-        input_edges: int = 0
-        output_edges: int = 0
-        if 0 < layer:
-            input_edges = layer_nodes[layer - 1]
-        if layer < len(layer_nodes) - 1:
-            output_edges = layer_nodes[layer + 1]
-        nodes_sqrt = math.ceil(math.sqrt(node_count))
-
-        current_layer_nodes: List[Node] = []
-        position: Vector3
-        if node_count <= 1:
-            position = Vector3(
-                [center_position.x,
-                 center_position.y,
-                 z_range[0] * (1 - layer / (len(layer_nodes) - 1)) + z_range[1] * layer / (len(layer_nodes) - 1)])
-            current_layer_nodes.append(Node(
-                len(current_layer_nodes),
-                input_edges,
-                output_edges
-            ).importance_init(num_classes, padding, position, node_importance_data[layer][0]))
-        else:
-            node_size_x: float
-            node_size_y: float
-            if node_size is None:
-                node_size_x = abs(x_range[1] - x_range[0]) / nodes_sqrt
-                node_size_y = abs(y_range[1] - y_range[0]) / nodes_sqrt
-            else:
-                node_size_x = node_size
-                node_size_y = node_size
-            for i in range(node_count):
-                pos_x: float = (i % nodes_sqrt) - (nodes_sqrt - 1.0) / 2.0
-                pos_y: float = (math.floor(i / nodes_sqrt)) - \
-                    (nodes_sqrt - 1.0) / 2.0
-                position = Vector3(
-                    [pos_x * node_size_x + center_position.x,
-                     pos_y * node_size_y + center_position.y,
-                     z_range[0] * (1 - layer / (len(layer_nodes) - 1)) + z_range[1] * layer / (
-                         len(layer_nodes) - 1)])
-                current_layer_nodes.append(Node(
-                    len(current_layer_nodes),
-                    input_edges,
-                    output_edges
-                ).importance_init(num_classes, padding, position, node_importance_data[layer][i]))
-        nodes.append(current_layer_nodes)
+        positions: np.array = create_layer_positions(layer_nodes, layer, center_position, x_range, y_range, z_range,
+                                                     node_size)
+        importance: np.array = np.asarray(node_importance_data[layer], dtype=np.float32).reshape(
+            node_count, num_classes)
+        nodes.append(create_layer_data(positions, importance, num_classes))
     return nodes
 
 
 def create_nodes_from_data(layer_nodes: List[int],
-                           node_data: List[np.array]) -> List[List[Node]]:
+                           node_data: List[np.array]) -> List[np.array]:
+    return [np.array(node_data[layer][:node_count], dtype=np.float32) for layer, node_count in
+            enumerate(layer_nodes)]
+
+
+def create_node_views(node_data: List[np.array]) -> List[List[Node]]:
     nodes: List[List[Node]] = []
-    for layer, node_count in enumerate(layer_nodes):
-        input_edges: int = 0
-        output_edges: int = 0
-        if 0 < layer:
-            input_edges = layer_nodes[layer - 1]
-        if layer < len(layer_nodes) - 1:
-            output_edges = layer_nodes[layer + 1]
-        current_layer_nodes: List[Node] = []
-
-        for i in range(node_count):
-            current_layer_nodes.append(Node(
-                len(current_layer_nodes),
-                input_edges,
-                output_edges
-            ).data_init(node_data[layer][i]))
-        nodes.append(current_layer_nodes)
+    for layer, layer_data in enumerate(node_data):
+        input_edges: int = node_data[layer - 1].shape[0] if 0 < layer else 0
+        output_edges: int = node_data[layer +
+                                      1].shape[0] if layer < len(node_data) - 1 else 0
+        nodes.append([Node(i, layer_data[i], input_edges, output_edges)
+                     for i in range(layer_data.shape[0])])
     return nodes
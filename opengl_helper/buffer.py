@@ -1,17 +1,28 @@
+from __future__ import annotations
+
 import logging
 import math
-from typing import Any, Callable, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
-from OpenGL.GL import (GL_ARRAY_BUFFER, GL_FALSE, GL_FLOAT,
+from OpenGL.GL import (GL_ARRAY_BUFFER, GL_BUFFER_UPDATE_BARRIER_BIT,
+                       GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, GL_FALSE,
+                       GL_FLOAT, GL_MAP_COHERENT_BIT, GL_MAP_PERSISTENT_BIT,
+                       GL_MAP_READ_BIT, GL_MAP_WRITE_BIT,
                        GL_MAX_SHADER_STORAGE_BLOCK_SIZE,
                        GL_MAX_SHADER_STORAGE_BUFFER_BINDINGS, GL_RGBA,
                        GL_RGBA32F, GL_SHADER_STORAGE_BUFFER, GL_STATIC_DRAW,
-                       ctypes, glBindBuffer, glBindBufferBase,
-                       glBindVertexArray, glBufferData, glClearBufferData,
+                       GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT, ctypes,
+                       glBindBuffer, glBindVertexArray, glBufferData,
+                       glBufferStorage, glClearBufferData, glCopyBufferSubData,
                        glDeleteBuffers, glEnableVertexAttribArray,
                        glGenBuffers, glGetBufferSubData, glGetIntegerv,
-                       glVertexAttribDivisor, glVertexAttribPointer)
+                       glMapBufferRange, glVertexAttribDivisor,
+                       glVertexAttribPointer)
+
+from opengl_helper.synchronization import BufferSync
+
+MAPPED_STORAGE_FLAGS: int = GL_MAP_READ_BIT | GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
 
 
 def get_buffer_object_size(num_classes: int, additional_data: int) -> int:
@@ -32,6 +43,38 @@ def get_buffer_settings(num_classes: int, additional_data: int) -> Tuple[int, Li
     return object_size, data_offset, data_size
 
 
+def copy_buffer_data(read_handle: int, write_handle: int, size: int, read_offset: int = 0,
+                     write_offset: int = 0) -> None:
+    BufferSync().access([read_handle, write_handle],
+                        GL_BUFFER_UPDATE_BARRIER_BIT)
+    glBindBuffer(GL_COPY_READ_BUFFER, read_handle)
+    glBindBuffer(GL_COPY_WRITE_BUFFER, write_handle)
+    glCopyBufferSubData(GL_COPY_READ_BUFFER,
+                        GL_COPY_WRITE_BUFFER, read_offset, write_offset, size)
+    BufferSync().fence_written([write_handle])
+
+
+def allocate_buffer_data(handle: int, size: int) -> None:
+    glBindVertexArray(0)
+    glBindBuffer(GL_SHADER_STORAGE_BUFFER, handle)
+    glBufferData(GL_SHADER_STORAGE_BUFFER, size, None, GL_STATIC_DRAW)
+
+
+def create_mapped_storage(size: int) -> Tuple[int, np.array]:
+    # immutable storage can not be resized, every new storage needs a new buffer name
+    storage_size: int = max(size, 16)
+    handle: int = glGenBuffers(1)
+    glBindVertexArray(0)
+    glBindBuffer(GL_SHADER_STORAGE_BUFFER, handle)
+    glBufferStorage(GL_SHADER_STORAGE_BUFFER, storage_size,
+                    None, MAPPED_STORAGE_FLAGS)
+    pointer: int = glMapBufferRange(
+        GL_SHADER_STORAGE_BUFFER, 0, storage_size, MAPPED_STORAGE_FLAGS)
+    mapped_data: np.array = np.ctypeslib.as_array(ctypes.cast(pointer, ctypes.POINTER(ctypes.c_ubyte)),
+                                                  shape=(storage_size,))
+    return handle, mapped_data
+
+
 class BufferObject:
     def __init__(self, ssbo: bool = False, object_size: int = 4, render_data_offset: Optional[List[int]] = None,
                  render_data_size: Optional[List[int]] = None) -> None:
@@ -50,6 +93,7 @@ class BufferObject:
 
     def load(self, data: Any) -> None:
         glBindVertexArray(0)
+        BufferSync().access([self.handle], GL_BUFFER_UPDATE_BARRIER_BIT)
 
         self.size = data.nbytes
         if self.ssbo:
@@ -64,14 +108,29 @@ class BufferObject:
             glBindBuffer(GL_ARRAY_BUFFER, self.handle)
             glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
 
-    def read(self) -> Any:
+    def allocate(self, size: int) -> None:
+        if size > self.max_ssbo_size:
+            raise Exception(
+                f'Data to big for SSBO ({size} bytes, max {self.max_ssbo_size} bytes).')
+        self.size = size
+        allocate_buffer_data(self.handle, size)
+
+    def copy_to(self, target: BufferObject, size: int, read_offset: int = 0, write_offset: int = 0) -> None:
+        copy_buffer_data(self.handle, target.handle,
+                         size, read_offset, write_offset)
+
+    def read(self, offset: int = 0, size: Optional[int] = None, view: bool = False) -> Any:
+        # the read back is always a copy, view only matters for mapped buffers
         if self.ssbo:
+            BufferSync().access([self.handle], GL_BUFFER_UPDATE_BARRIER_BIT)
             glBindBuffer(GL_SHADER_STORAGE_BUFFER, self.handle)
-            return glGetBufferSubData(GL_SHADER_STORAGE_BUFFER, 0, self.size)
+            return glGetBufferSubData(GL_SHADER_STORAGE_BUFFER, offset, self.size - offset if size is None else size)
 
     def bind(self, location: int, rendering: bool = False, divisor: int = 0) -> None:
         if self.ssbo:
             if rendering:
+                BufferSync().access([self.handle],
+                                    GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
                 glBindBuffer(GL_ARRAY_BUFFER, self.handle)
                 for i in range(len(self.render_data_offset)):
                     glEnableVertexAttribArray(location + i)
@@ -80,9 +139,10 @@ class BufferObject:
                     if divisor > 0:
                         glVertexAttribDivisor(location + i, divisor)
             else:
-                glBindBufferBase(GL_SHADER_STORAGE_BUFFER,
-                                 location, self.handle)
+                BufferSync().bind_storage(location, self.handle)
         else:
+            BufferSync().access([self.handle],
+                                GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
             glBindBuffer(GL_ARRAY_BUFFER, self.handle)
             for i in range(len(self.render_data_offset)):
                 glEnableVertexAttribArray(location + i)
@@ -92,7 +152,8 @@ class BufferObject:
                     glVertexAttribDivisor(location + i, divisor)
 
     def clear(self) -> None:
-        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 0, self.handle)
+        BufferSync().access([self.handle], GL_BUFFER_UPDATE_BARRIER_BIT)
+        glBindBuffer(GL_SHADER_STORAGE_BUFFER, self.handle)
         glClearBufferData(GL_SHADER_STORAGE_BUFFER,
                           GL_RGBA32F, GL_RGBA, GL_FLOAT, None)
 
@@ -105,13 +166,43 @@ class SwappingBufferObject(BufferObject):
                  render_data_size: Optional[List[int]] = None) -> None:
         super().__init__(ssbo, object_size, render_data_offset, render_data_size)
         self.swap_handle: int = glGenBuffers(1)
+        # allocated bytes of both buffer names
+        self.storage_size: Dict[int, int] = dict()
 
     def swap(self) -> None:
         self.handle, self.swap_handle = self.swap_handle, self.handle
 
+    def load(self, data: Any) -> None:
+        BufferObject.load(self, data)
+        self.storage_size[self.handle] = data.nbytes
+
+    def allocate(self, size: int) -> None:
+        BufferObject.allocate(self, size)
+        allocate_buffer_data(self.swap_handle, size)
+        self.storage_size[self.handle] = size
+        self.storage_size[self.swap_handle] = size
+
+    def allocate_swap(self, size: int) -> None:
+        # only the swap buffer gets new storage, the current data stays readable until the next swap
+        if size > self.max_ssbo_size:
+            raise Exception(
+                f'Data to big for SSBO ({size} bytes, max {self.max_ssbo_size} bytes).')
+        allocate_buffer_data(self.swap_handle, size)
+        self.storage_size[self.swap_handle] = size
+
+    def reserve_swap(self, size: int) -> None:
+        # the swap buffer only gets new storage if it is too small
+        if self.storage_size.get(self.swap_handle, -1) < size:
+            self.allocate_swap(size)
+
+    def copy_to_swap(self) -> None:
+        copy_buffer_data(self.handle, self.swap_handle, self.size)
+
     def bind(self, location: int, rendering: bool = False, divisor: int = 0) -> None:
         if self.ssbo:
             if rendering:
+                BufferSync().access([self.handle],
+                                    GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
                 glBindBuffer(GL_ARRAY_BUFFER, self.handle)
                 for i in range(len(self.render_data_offset)):
                     glEnableVertexAttribArray(location + i)
@@ -120,11 +211,11 @@ class SwappingBufferObject(BufferObject):
                     if divisor > 0:
                         glVertexAttribDivisor(location + i, divisor)
             else:
-                glBindBufferBase(GL_SHADER_STORAGE_BUFFER,
-                                 location, self.handle)
-                glBindBufferBase(GL_SHADER_STORAGE_BUFFER,
-                                 location + 1, self.swap_handle)
+                BufferSync().bind_storage(location, self.handle)
+                BufferSync().bind_storage(location + 1, self.swap_handle)
         else:
+            BufferSync().access([self.handle],
+                                GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
             glBindBuffer(GL_ARRAY_BUFFER, self.handle)
             for i in range(len(self.render_data_offset)):
                 glEnableVertexAttribArray(location + i)
@@ -138,6 +229,67 @@ class SwappingBufferObject(BufferObject):
         glDeleteBuffers(1, [self.swap_handle])
 
 
+class MappedBufferObject(BufferObject):
+    def __init__(self, object_size: int = 4, render_data_offset: Optional[List[int]] = None,
+                 render_data_size: Optional[List[int]] = None) -> None:
+        super().__init__(True, object_size, render_data_offset, render_data_size)
+        # persistently mapped cpu views of the storage, keyed by buffer name
+        self.mapped_data: Dict[int, np.array] = dict()
+
+    def reserve(self, handle: int, size: int) -> int:
+        if handle in self.mapped_data and self.mapped_data[handle].nbytes >= size:
+            return handle
+        if size > self.max_ssbo_size:
+            raise Exception(
+                f'Data to big for SSBO ({size} bytes, max {self.max_ssbo_size} bytes).')
+        glDeleteBuffers(1, [handle])
+        self.mapped_data.pop(handle, None)
+        BufferSync().untrack_fence(handle)
+        new_handle, new_mapped_data = create_mapped_storage(size)
+        self.mapped_data[new_handle] = new_mapped_data
+        BufferSync().track_fence(new_handle)
+        return new_handle
+
+    def load(self, data: Any) -> None:
+        # a shader may still write the current content
+        BufferSync().wait_for_write(self.handle)
+        self.handle = self.reserve(self.handle, data.nbytes)
+        self.size = data.nbytes
+        self.mapped_data[self.handle][:data.nbytes] = np.ascontiguousarray(
+            data).reshape(-1).view(np.uint8)
+
+    def allocate(self, size: int) -> None:
+        self.handle = self.reserve(self.handle, size)
+        self.size = size
+
+    def read(self, offset: int = 0, size: Optional[int] = None, view: bool = False) -> Any:
+        # a view is not a copy, it follows later changes of the buffer
+        BufferSync().wait_for_write(self.handle)
+        data: np.array = self.mapped_data[self.handle][offset:(
+            self.size if size is None else offset + size)]
+        return data if view else data.copy()
+
+    def delete(self) -> None:
+        for handle in set(self.mapped_data.keys()) | {self.handle}:
+            glDeleteBuffers(1, [handle])
+            BufferSync().untrack_fence(handle)
+        self.mapped_data = dict()
+
+
+class MappedSwappingBufferObject(MappedBufferObject, SwappingBufferObject):
+    def allocate(self, size: int) -> None:
+        MappedBufferObject.allocate(self, size)
+        self.swap_handle = self.reserve(self.swap_handle, size)
+
+    def allocate_swap(self, size: int) -> None:
+        self.swap_handle = self.reserve(self.swap_handle, size)
+
+    def delete(self) -> None:
+        if self.swap_handle not in self.mapped_data:
+            glDeleteBuffers(1, [self.swap_handle])
+        MappedBufferObject.delete(self)
+
+
 class OverflowingBufferObject:
     def __init__(self, data_splitting_function: Callable, object_size: int = 4, render_data_offset: Optional[List[int]] = None,
                  render_data_size: Optional[List[int]] = None) -> None:
@@ -158,6 +310,7 @@ class OverflowingBufferObject:
 
     def load(self, data: Any) -> None:
         glBindVertexArray(0)
+        BufferSync().access(self.handle, GL_BUFFER_UPDATE_BARRIER_BIT)
 
         self.overall_size = data.nbytes
         if data.nbytes > self.max_ssbo_size:
@@ -179,6 +332,7 @@ class OverflowingBufferObject:
 
     def load_empty(self, dtype: Any, size: int, component_size: int) -> None:
         glBindVertexArray(0)
+        BufferSync().access(self.handle, GL_BUFFER_UPDATE_BARRIER_BIT)
 
         self.overall_size = size * self.object_size * 4
         if self.overall_size > self.max_ssbo_size:
@@ -201,6 +355,7 @@ class OverflowingBufferObject:
                          empty.nbytes, empty, GL_STATIC_DRAW)
 
     def read(self) -> Any:
+        BufferSync().access(self.handle, GL_BUFFER_UPDATE_BARRIER_BIT)
         data: Optional[Any] = None
         for i, buffer in enumerate(self.handle):
             glBindBuffer(GL_SHADER_STORAGE_BUFFER, buffer)
@@ -214,6 +369,8 @@ class OverflowingBufferObject:
 
     def bind_single(self, buffer_id: int, location: int, rendering: bool = False, divisor: int = 0) -> None:
         if rendering:
+            BufferSync().access([self.handle[buffer_id]],
+                                GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
             glBindBuffer(GL_ARRAY_BUFFER, self.handle[buffer_id])
             for i in range(len(self.render_data_offset)):
                 glEnableVertexAttribArray(location + i)
@@ -222,17 +379,16 @@ class OverflowingBufferObject:
                 if divisor > 0:
                     glVertexAttribDivisor(location + i, divisor)
         else:
-            glBindBufferBase(GL_SHADER_STORAGE_BUFFER,
-                             location, self.handle[buffer_id])
+            BufferSync().bind_storage(location, self.handle[buffer_id])
 
     def bind_consecutive(self, location: int) -> None:
         for i, buffer in enumerate(self.handle):
-            glBindBufferBase(GL_SHADER_STORAGE_BUFFER,
-                             location + i, len(self.handle), buffer)
+            BufferSync().bind_storage(location + i, buffer)
 
     def clear(self) -> None:
+        BufferSync().access(self.handle, GL_BUFFER_UPDATE_BARRIER_BIT)
         for buffer in self.handle:
-            glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 0, buffer)
+            glBindBuffer(GL_SHADER_STORAGE_BUFFER, buffer)
             glClearBufferData(GL_SHADER_STORAGE_BUFFER,
                               GL_RGBA32F, GL_RGBA, GL_FLOAT, None)
 
@@ -1,44 +1,110 @@
 import math
+import re
+import time
 from typing import Any, Dict, List, Tuple
 
-from OpenGL.GL import (GL_ALL_BARRIER_BITS, GL_COMPUTE_SHADER,
-                       GL_MAX_COMPUTE_WORK_GROUP_COUNT, glDispatchCompute,
-                       glGetIntegeri_v, glMemoryBarrier, glUseProgram)
+from OpenGL.GL import (GL_COMPUTE_SHADER, GL_MAX_COMPUTE_WORK_GROUP_COUNT,
+                       GL_SHADER_STORAGE_BARRIER_BIT, glDeleteProgram,
+                       glDispatchCompute, glFinish, glGetIntegeri_v,
+                       glUseProgram)
 from OpenGL.GL.shaders import compileProgram, compileShader
 
 from opengl_helper.shader import BaseShader
+from opengl_helper.synchronization import BufferSync
 from opengl_helper.texture import Texture
+from opengl_helper.uniform_block import set_uniform_block_binding
+
+STORAGE_BLOCK_PATTERN: Any = re.compile(
+    r'layout\s*\(([^)]*)\)\s*((?:\w+\s+)*)buffer\s')
+BINDING_PATTERN: Any = re.compile(r'binding\s*=\s*(\d+)')
+
+
+def get_storage_access(shader_src: str) -> Tuple[List[int], List[int], List[int]]:
+    # binding points the shader reads from and writes to, taken from the memory qualifiers of its storage blocks
+    read_locations: List[int] = []
+    write_locations: List[int] = []
+    accumulate_locations: List[int] = []
+    for layout, qualifiers in STORAGE_BLOCK_PATTERN.findall(shader_src):
+        binding: Any = BINDING_PATTERN.search(layout)
+        if binding is None:
+            continue
+        if 'writeonly' not in qualifiers.split():
+            read_locations.append(int(binding.group(1)))
+        if 'readonly' not in qualifiers.split():
+            write_locations.append(int(binding.group(1)))
+        # coherent blocks are only changed atomically, consecutive dispatches of a shader add up its results
+        if 'coherent' in qualifiers.split():
+            accumulate_locations.append(int(binding.group(1)))
+    return read_locations, write_locations, accumulate_locations
 
 
 class ComputeShader(BaseShader):
-    def __init__(self, shader_src: str) -> None:
+    def __init__(self, shader_src: str, local_size: int = 1) -> None:
         BaseShader.__init__(self)
         self.shader_handle: int = compileProgram(
             compileShader(shader_src, GL_COMPUTE_SHADER))
+        set_uniform_block_binding(self.shader_handle)
         self.textures: List[Tuple[Texture, str, int]] = []
         self.uniform_cache: Dict[str, Tuple[int, Any, Any]] = dict()
         self.max_workgroup_size: int = glGetIntegeri_v(
             GL_MAX_COMPUTE_WORK_GROUP_COUNT, 0)[0]
+        # number of work items covered by a single workgroup
+        self.local_size: int = local_size
+        storage_read, storage_write, storage_accumulate = get_storage_access(
+            shader_src)
+        self.storage_read: List[int] = storage_read
+        self.storage_write: List[int] = storage_write
+        self.storage_accumulate: List[int] = storage_accumulate
 
-    def compute(self, width: int, barrier: bool = False) -> None:
-        for i in range(math.ceil(width / self.max_workgroup_size)):
-            self.set_uniform_data(
-                [('work_group_offset', i * self.max_workgroup_size, 'int')])
+        self.timed: bool = False
+        self.elapsed_time: float = 0.0
+        self.compute_count: int = 0
 
-            for texture, flag, image_position in self.textures:
-                texture.bind_as_image(flag, image_position)
-            glUseProgram(self.shader_handle)
+    def compute(self, width: int) -> None:
+        if self.timed:
+            glFinish()
+            start_time: float = time.perf_counter()
 
-            for uniform_location, uniform_data, uniform_setter in self.uniform_cache.values():
-                uniform_setter(uniform_location, uniform_data)
+        buffer_sync: BufferSync = BufferSync()
+        accumulating: List[int] = [handle for handle in buffer_sync.get_storage(self.storage_accumulate) if
+                                   buffer_sync.is_last_writer(handle, self.shader_handle)]
+        buffer_sync.access([handle for handle in buffer_sync.get_storage(self.storage_read + self.storage_write) if
+                            handle not in accumulating], GL_SHADER_STORAGE_BARRIER_BIT)
+        self.set_uniform_data([('work_group_offset', 0, 'int'),
+                               ('work_item_count', width, 'int')])
+        for texture, flag, image_position in self.textures:
+            texture.bind_as_image(flag, image_position)
+        glUseProgram(self.shader_handle)
+        self.upload_uniform_data()
 
-            if i == math.ceil(width / self.max_workgroup_size) - 1:
-                glDispatchCompute(width % self.max_workgroup_size, 1, 1)
+        group_count: int = math.ceil(width / self.local_size)
+        dispatch_count: int = math.ceil(group_count / self.max_workgroup_size)
+        for i in range(dispatch_count):
+            # only the offset changes between the dispatches of a large width
+            if i > 0 and 'work_group_offset' in self.uniform_cache:
+                work_offset: int = i * self.max_workgroup_size * self.local_size
+                uniform_location, _, uniform_setter = self.uniform_cache['work_group_offset']
+                self.uniform_cache['work_group_offset'] = (
+                    uniform_location, work_offset, uniform_setter)
+                uniform_setter(uniform_location, work_offset)
+
+            if i == dispatch_count - 1:
+                glDispatchCompute(group_count - i *
+                                  self.max_workgroup_size, 1, 1)
             else:
                 glDispatchCompute(self.max_workgroup_size, 1, 1)
-        if barrier:
-            self.barrier()
+        buffer_sync.written(buffer_sync.get_storage(
+            self.storage_write), self.shader_handle)
+        buffer_sync.fence_written(buffer_sync.get_storage(self.storage_write))
+
+        if self.timed:
+            glFinish()
+            self.elapsed_time += time.perf_counter() - start_time
+            self.compute_count += 1
+
+    def reset_timing(self) -> None:
+        self.elapsed_time = 0.0
+        self.compute_count = 0
 
-    @staticmethod
-    def barrier() -> None:
-        glMemoryBarrier(GL_ALL_BARRIER_BITS)
+    def delete(self) -> None:
+        glDeleteProgram(self.shader_handle)
@@ -0,0 +1,52 @@
+from typing import List, Optional, Tuple
+
+from utility.config import BaseConfig
+
+DEFAULT_LOCAL_SIZE: int = 64
+
+
+class ComputeShaderConfig(BaseConfig):
+    def __init__(self, name: Optional[str] = None) -> None:
+        if name is None:
+            super().__init__('compute_shader')
+        else:
+            super().__init__('compute_shader', name)
+
+        self.set_defaults()
+
+    def set_defaults(self) -> None:
+        # workgroup size of every shader using the $local_size$ template variable
+        local_size_items: List[Tuple[str, int]] = []
+        local_size_items.extend([('node_noise', DEFAULT_LOCAL_SIZE),
+                                 ('init_edge_sampler', DEFAULT_LOCAL_SIZE),
+                                 ('edge_sampler', DEFAULT_LOCAL_SIZE),
+                                 ('edge_noise', DEFAULT_LOCAL_SIZE),
+                                 ('sample_smooth', DEFAULT_LOCAL_SIZE),
+                                 ('sample_smooth_shared', DEFAULT_LOCAL_SIZE),
+                                 ('sample_position_sum', DEFAULT_LOCAL_SIZE),
+                                 ('sample_smooth_prefix', DEFAULT_LOCAL_SIZE),
+                                 ('sample_arc_length', DEFAULT_LOCAL_SIZE),
+                                 ('arc_length_sampler', DEFAULT_LOCAL_SIZE),
+                                 ('edge_limits', DEFAULT_LOCAL_SIZE),
+                                 ('sample_copy', DEFAULT_LOCAL_SIZE),
+                                 ('edge_position_update', DEFAULT_LOCAL_SIZE),
+                                 ('sample_resize', DEFAULT_LOCAL_SIZE),
+                                 ('sample_capacity', DEFAULT_LOCAL_SIZE),
+                                 ('clear_grid', DEFAULT_LOCAL_SIZE),
+                                 ('grid_position', DEFAULT_LOCAL_SIZE),
+                                 ('node_density', DEFAULT_LOCAL_SIZE),
+                                 ('sample_density', DEFAULT_LOCAL_SIZE),
+                                 ('node_advect', DEFAULT_LOCAL_SIZE),
+                                 ('sample_advect', DEFAULT_LOCAL_SIZE),
+                                 ('brick_mark', DEFAULT_LOCAL_SIZE),
+                                 ('brick_density', DEFAULT_LOCAL_SIZE),
+                                 ('brick_advect', DEFAULT_LOCAL_SIZE),
+                                 ('gather_bin_count', DEFAULT_LOCAL_SIZE),
+                                 ('gather_bin_sort', DEFAULT_LOCAL_SIZE),
+                                 ('gather_density', DEFAULT_LOCAL_SIZE)])
+
+        for key, value in local_size_items:
+            self.setdefault(key, value)
+
+    def get_local_size(self, shader_name: str) -> int:
+        return int(self.get(shader_name, DEFAULT_LOCAL_SIZE))
@@ -3,15 +3,17 @@ from typing import Dict, List
 
 from definitions import BASE_PATH
 from opengl_helper.compute_shader import ComputeShader
+from opengl_helper.compute_shader_config import ComputeShaderConfig
 from utility.singleton import Singleton
 
 SHADER_STATIC_VAR: List[str] = [
-    'num_classes'
+    'num_classes',
+    'local_size',
+    'shared_sample_capacity'
 ]
 
 SHADER_DYNAMIC_VAR: List[str] = [
     'r_class_id',
-    'r_edgebuffer_padding_id',
     'r_densitybuffer_padding_id',
     'r_nodebuffer_padding_id'
 ]
@@ -22,29 +24,50 @@ class ComputeShaderHandler(metaclass=Singleton):
         self.shader_dir: str = os.path.join(BASE_PATH, 'shader_src/compute')
         self.shader_list: Dict[str, ComputeShader] = dict()
         self.num_classes: int = 10  # default value
-        self.edgebuffer_padding: int = 0  # will be calculated
         self.densitybuffer_padding: int = 0  # will be calculated
         self.nodebuffer_padding: int = 0  # will be calculated
         self.static_var_map: Dict[str, str] = dict()
+        self.shader_paths: Dict[str, str] = dict()
+        self.compute_config: ComputeShaderConfig = ComputeShaderConfig()
 
         self.set_classification_number(self.num_classes)
+        self.set_shared_sample_capacity(1024)
 
     def set_classification_number(self, num_classes: int) -> None:
         self.num_classes = num_classes
         self.static_var_map['$num_classes$'] = str(num_classes)
-        self.edgebuffer_padding = (4 - ((self.num_classes * 2) % 4)) % 4
         self.densitybuffer_padding = (4 - ((self.num_classes + 1) % 4)) % 4
         self.nodebuffer_padding = (4 - ((self.num_classes + 2) % 4)) % 4
         self.shader_list = dict()
 
+    def set_shared_sample_capacity(self, capacity: int) -> None:
+        # samples of a single edge a workgroup can hold in shared memory
+        self.static_var_map['$shared_sample_capacity$'] = str(capacity)
+
     def create(self, shader_name: str, shader_file_path: str) -> ComputeShader:
         if shader_name in self.shader_list.keys():
             return self.shader_list[shader_name]
-        shader_src = self.get_processed_src(
-            os.path.join(self.shader_dir, shader_file_path))
-        self.shader_list[shader_name] = ComputeShader(shader_src)
+        self.shader_paths[shader_name] = shader_file_path
+        shader_path: str = os.path.join(self.shader_dir, shader_file_path)
+        with open(shader_path, 'r') as src:
+            uses_local_size: bool = '$local_size$' in src.read()
+
+        # shaders with a fixed workgroup size are dispatched per workgroup
+        local_size: int = self.compute_config.get_local_size(
+            shader_name) if uses_local_size else 1
+        self.static_var_map['$local_size$'] = str(local_size)
+        shader_src = self.get_processed_src(shader_path)
+        self.shader_list[shader_name] = ComputeShader(shader_src, local_size)
         return self.shader_list[shader_name]
 
+    def set_local_size(self, shader_name: str, local_size: int, store: bool = False) -> None:
+        self.compute_config[shader_name] = local_size
+        if store:
+            self.compute_config.store()
+        if shader_name in self.shader_list.keys():
+            self.shader_list.pop(shader_name).delete()
+            self.create(shader_name, self.shader_paths[shader_name])
+
     def get(self, shader_name: str) -> ComputeShader:
         return self.shader_list[shader_name]
 
@@ -66,17 +89,6 @@ class ComputeShaderHandler(metaclass=Singleton):
             new_line: str = ''
             added: bool = False
 
-            for padding_id in range(self.edgebuffer_padding):
-                new_line = processed_line
-                added = False
-                if '$r_edgebuffer_padding_id$' in new_line:
-                    new_line = new_line.replace(
-                        '$r_edgebuffer_padding_id$', str(padding_id))
-                    added = True
-                if added:
-                    parsed_lines = parsed_lines + \
-                        new_line.replace('//$$', '').replace('$$', '')
-
             for padding_id in range(self.densitybuffer_padding):
                 new_line = processed_line
                 added = False
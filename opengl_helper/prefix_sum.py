@@ -0,0 +1,45 @@
+import math
+from typing import List
+
+from opengl_helper.buffer import BufferObject
+from opengl_helper.compute_shader import ComputeShader
+from opengl_helper.compute_shader_handler import ComputeShaderHandler
+
+PREFIX_SUM_BLOCK_SIZE: int = 256
+
+
+class PrefixSum:
+    def __init__(self) -> None:
+        ComputeShaderHandler().create('prefix_sum_block', 'scan/prefix_sum_block.comp')
+        ComputeShaderHandler().create('prefix_sum_add', 'scan/prefix_sum_add.comp')
+        self.block_sum_buffer: List[BufferObject] = []
+
+    def compute(self, buffer: BufferObject, value_count: int, level: int = 0) -> None:
+        # inclusive scan of the first value_count uints in the buffer, block sums are scanned recursively
+        block_count: int = math.ceil(value_count / PREFIX_SUM_BLOCK_SIZE)
+        if block_count == 0:
+            return
+        if len(self.block_sum_buffer) <= level:
+            self.block_sum_buffer.append(BufferObject(ssbo=True))
+        if self.block_sum_buffer[level].size < block_count * 4:
+            self.block_sum_buffer[level].allocate(block_count * 4)
+
+        scan: ComputeShader = ComputeShaderHandler().get('prefix_sum_block')
+        scan.set_uniform_data([('value_count', value_count, 'int')])
+        buffer.bind(0)
+        self.block_sum_buffer[level].bind(1)
+        scan.compute(block_count)
+
+        if block_count > 1:
+            self.compute(self.block_sum_buffer[level], block_count, level + 1)
+
+            add: ComputeShader = ComputeShaderHandler().get('prefix_sum_add')
+            add.set_uniform_data([('value_count', value_count, 'int')])
+            buffer.bind(0)
+            self.block_sum_buffer[level].bind(1)
+            add.compute(block_count)
+
+    def delete(self) -> None:
+        for buffer in self.block_sum_buffer:
+            buffer.delete()
+        self.block_sum_buffer = []
@@ -3,13 +3,12 @@ from typing import Callable, List, Optional, Union
 
 from OpenGL.constant import (Constant, FloatConstant, IntConstant,
                              LongConstant, StringConstant)
-from OpenGL.GL import (GL_ALL_BARRIER_BITS, GL_BLEND, GL_COLOR_BUFFER_BIT,
-                       GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST, GL_MAX, GL_MIN,
-                       GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA,
-                       glBlendEquationSeparate, glBlendFunc, glClear,
-                       glClearColor, glDisable, glDrawArrays,
+from OpenGL.GL import (GL_BLEND, GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT,
+                       GL_DEPTH_TEST, GL_MAX, GL_MIN, GL_ONE_MINUS_SRC_ALPHA,
+                       GL_SRC_ALPHA, glBlendEquationSeparate, glBlendFunc,
+                       glClear, glClearColor, glDisable, glDrawArrays,
                        glDrawArraysInstanced, glEnable, glLineWidth,
-                       glMemoryBarrier, glPointSize)
+                       glPointSize)
 
 
 def clear_screen(clear_color: List[float]) -> None:
@@ -51,6 +50,4 @@ def generate_render_function(ogl_func: OGLRenderFunction,
         elif ogl_func is OGLRenderFunction.ARRAYS_INSTANCED:
             glDrawArraysInstanced(primitive, 0, 1, element_count)
 
-        glMemoryBarrier(GL_ALL_BARRIER_BITS)
-
     return render_func
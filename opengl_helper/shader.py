@@ -1,4 +1,4 @@
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from OpenGL.GL import (GL_FALSE, GL_FRAGMENT_SHADER, GL_GEOMETRY_SHADER,
                        GL_VERTEX_SHADER, glGetUniformLocation, glUniform1f,
@@ -7,6 +7,7 @@ from OpenGL.GL import (GL_FALSE, GL_FRAGMENT_SHADER, GL_GEOMETRY_SHADER,
 from OpenGL.GL.shaders import compileProgram, compileShader
 
 from opengl_helper.texture import Texture
+from opengl_helper.uniform_block import set_uniform_block_binding
 from rendering.rendering_config import RenderingConfig
 
 
@@ -69,7 +70,9 @@ class BaseShader:
         self.textures: List[Tuple[Texture, str, int]] = []
         self.uniform_cache: Dict[str, Tuple[int, Any, Callable]] = dict()
         self.uniform_labels: List[str] = []
-        self.uniform_ignore_labels: List[str] = []
+        self.uniform_ignore_labels: Set[str] = set()
+        # uniforms whose cached data was not uploaded to the program yet
+        self.uniform_changed: Set[str] = set()
 
     def set_uniform_label(self, data: List[str]) -> None:
         for setting in data:
@@ -100,15 +103,27 @@ class BaseShader:
                             uniform_data,
                             uniform_setter_function(uniform_setter),
                         )
+                        self.uniform_changed.add(uniform_name)
                     else:
-                        self.uniform_ignore_labels.append(uniform_name)
+                        self.uniform_ignore_labels.add(uniform_name)
                 else:
-                    uniform_location, _, setter = self.uniform_cache[uniform_name]
+                    uniform_location, cached_data, setter = self.uniform_cache[uniform_name]
+                    # scalars are compared, vectors and matrices are uploaded again with every set
+                    if isinstance(uniform_data, (int, float)) and uniform_data == cached_data:
+                        continue
                     self.uniform_cache[uniform_name] = (
                         uniform_location,
                         uniform_data,
                         setter,
                     )
+                    self.uniform_changed.add(uniform_name)
+
+    def upload_uniform_data(self) -> None:
+        # the program has to be in use, uniform values persist in the program between uses
+        for uniform_name in self.uniform_changed:
+            uniform_location, uniform_data, uniform_setter = self.uniform_cache[uniform_name]
+            uniform_setter(uniform_location, uniform_data)
+        self.uniform_changed.clear()
 
     def set_textures(self, textures: List[Tuple[Texture, str, int]]) -> None:
         self.textures = textures
@@ -137,6 +152,7 @@ class RenderShader(BaseShader):
                 compileShader(fragment_src, GL_FRAGMENT_SHADER),
                 compileShader(geometry_src, GL_GEOMETRY_SHADER),
             )
+        set_uniform_block_binding(self.shader_handle)
         if uniform_labels is not None:
             self.set_uniform_label(uniform_labels)
 
@@ -144,10 +160,4 @@ class RenderShader(BaseShader):
         for texture, _, texture_position in self.textures:
             texture.bind_as_texture(texture_position)
         glUseProgram(self.shader_handle)
-
-        for (
-            uniform_location,
-            uniform_data,
-            uniform_setter,
-        ) in self.uniform_cache.values():
-            uniform_setter(uniform_location, uniform_data)
+        self.upload_uniform_data()
@@ -4,7 +4,10 @@ from typing import Dict, List, Optional
 
 from definitions import (ADDITIONAL_EDGE_BUFFER_DATA,
                          ADDITIONAL_NODE_BUFFER_DATA, BASE_PATH)
+from opengl_helper.buffer import get_buffer_object_size
 from opengl_helper.shader import RenderShader, ShaderSetting
+from opengl_helper.uniform_block import CAMERA_PARAMETER, UniformBlock
+from utility.camera import BaseCamera
 from utility.singleton import Singleton
 
 SHADER_STATIC_VAR: List[str] = [
@@ -15,10 +18,9 @@ SHADER_STATIC_VAR: List[str] = [
     'edgebuffer_layer',
     'edgebuffer_edge',
     'edgebuffer_importance',
-    'edgebuffer_start_length',
-    'edgebuffer_end_length',
-    'edgebuffer_start_average',
-    'edgebuffer_end_average'
+    'edgebuffer_start_node',
+    'edgebuffer_end_node',
+    'nodebuffer_object_size'
 ]
 
 SHADER_DYNAMIC_VAR: List[str] = [
@@ -28,9 +30,7 @@ SHADER_DYNAMIC_VAR: List[str] = [
     'r_edgebuffer_group_location',
     'r_class_color',
     'r_class_id',
-    'r_nodebuffer_class_importance',
-    'r_edgebuffer_start_class_importance',
-    'r_edgebuffer_end_class_importance'
+    'r_nodebuffer_class_importance'
 ]
 
 BUFFER_GROUP_VALUE: List[str] = ['x', 'y', 'z', 'w']
@@ -60,6 +60,7 @@ class RenderShaderHandler(metaclass=Singleton):
         self.shader_list: Dict[str, RenderShader] = dict()
         self.num_classes: int = 10  # default value
         self.static_var_map: Dict[str, str] = dict()
+        self.camera_parameter: Optional[UniformBlock] = None
 
         self.set_classification_number(self.num_classes)
 
@@ -74,10 +75,10 @@ class RenderShaderHandler(metaclass=Singleton):
         self.static_var_map['$edgebuffer_layer$'] = get_buffer_id(1)
         self.static_var_map['$edgebuffer_edge$'] = get_buffer_id(2)
         self.static_var_map['$edgebuffer_importance$'] = get_buffer_id(3)
-        self.static_var_map['$edgebuffer_start_length$'] = get_buffer_id(4)
-        self.static_var_map['$edgebuffer_end_length$'] = get_buffer_id(5)
-        self.static_var_map['$edgebuffer_start_average$'] = get_buffer_id(6)
-        self.static_var_map['$edgebuffer_end_average$'] = get_buffer_id(7)
+        self.static_var_map['$edgebuffer_start_node$'] = get_buffer_id(4)
+        self.static_var_map['$edgebuffer_end_node$'] = get_buffer_id(5)
+        self.static_var_map['$nodebuffer_object_size$'] = str(
+            get_buffer_object_size(num_classes, ADDITIONAL_NODE_BUFFER_DATA))
         self.shader_list = dict()
 
     def create(self, shader_setting: ShaderSetting) -> RenderShader:
@@ -98,6 +99,16 @@ class RenderShaderHandler(metaclass=Singleton):
     def get(self, shader_name: str) -> RenderShader:
         return self.shader_list[shader_name]
 
+    def set_camera(self, cam: BaseCamera) -> None:
+        # shared by all render shaders, only uploaded when the camera moved
+        if self.camera_parameter is None:
+            self.camera_parameter = UniformBlock(
+                'camera_parameter', CAMERA_PARAMETER)
+        self.camera_parameter.set_data([('projection', cam.projection),
+                                        ('view', cam.view),
+                                        ('scale', cam.object_scale)])
+        self.camera_parameter.bind()
+
     def get_processed_src(self, path: str) -> str:
         processed_src: str = ''
         with open(path, 'r') as src:
@@ -132,7 +143,7 @@ class RenderShaderHandler(metaclass=Singleton):
                     parsed_lines = parsed_lines + \
                         new_line.replace('//$$', '').replace('$$', '')
 
-            for edge_buffer_group in range(int(math.ceil((self.num_classes * 2 + ADDITIONAL_EDGE_BUFFER_DATA) / 4))):
+            for edge_buffer_group in range(int(math.ceil(ADDITIONAL_EDGE_BUFFER_DATA / 4))):
                 new_line = processed_line
                 added = False
                 if '$r_edgebuffer_group_id$' in new_line:
@@ -161,15 +172,6 @@ class RenderShaderHandler(metaclass=Singleton):
                     new_line = new_line.replace(
                         '$r_nodebuffer_class_importance$', get_buffer_id(class_id))
                     added = True
-                if '$r_edgebuffer_start_class_importance$' in new_line:
-                    new_line = new_line.replace('$r_edgebuffer_start_class_importance$',
-                                                get_buffer_id(class_id + ADDITIONAL_EDGE_BUFFER_DATA))
-                    added = True
-                if '$r_edgebuffer_end_class_importance$' in new_line:
-                    new_line = new_line.replace('$r_edgebuffer_end_class_importance$',
-                                                get_buffer_id(
-                                                    class_id + self.num_classes + ADDITIONAL_EDGE_BUFFER_DATA))
-                    added = True
                 if added:
                     parsed_lines = parsed_lines + \
                         new_line.replace('//$$', '').replace('$$', '')
@@ -0,0 +1,102 @@
+from typing import Any, Dict, Iterable, List, Set
+
+from OpenGL.GL import (GL_ALREADY_SIGNALED, GL_BUFFER_UPDATE_BARRIER_BIT,
+                       GL_CLIENT_MAPPED_BUFFER_BARRIER_BIT,
+                       GL_CONDITION_SATISFIED, GL_SHADER_STORAGE_BARRIER_BIT,
+                       GL_SHADER_STORAGE_BUFFER, GL_SYNC_FLUSH_COMMANDS_BIT,
+                       GL_SYNC_GPU_COMMANDS_COMPLETE, GL_TIMEOUT_IGNORED,
+                       GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT, glBindBufferBase,
+                       glClientWaitSync, glDeleteSync, glFenceSync,
+                       glMemoryBarrier)
+
+from utility.singleton import Singleton
+
+# every way the buffers written by a shader are accessed afterwards
+BUFFER_BARRIER_BITS: int = GL_SHADER_STORAGE_BARRIER_BIT | GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT | \
+    GL_BUFFER_UPDATE_BARRIER_BIT | GL_CLIENT_MAPPED_BUFFER_BARRIER_BIT
+
+
+class BufferSync(metaclass=Singleton):
+    def __init__(self) -> None:
+        # buffer name bound to every shader storage binding point
+        self.storage_binding: Dict[int, int] = dict()
+        # barrier bits a buffer still needs since it was last written by a shader
+        self.pending_barrier: Dict[int, int] = dict()
+        self.last_writer: Dict[int, int] = dict()
+        # persistently mapped buffers get a fence after every gpu write, the cpu only waits for its own buffer
+        self.fenced_handles: Set[int] = set()
+        self.write_fence: Dict[int, Any] = dict()
+
+    def bind_storage(self, location: int, handle: int) -> None:
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, location, handle)
+        self.storage_binding[location] = handle
+
+    def get_storage(self, locations: Iterable[int]) -> List[int]:
+        return [self.storage_binding[location] for location in locations if location in self.storage_binding]
+
+    def written(self, handles: Iterable[int], writer: int = 0) -> None:
+        for handle in handles:
+            self.pending_barrier[handle] = BUFFER_BARRIER_BITS
+            self.last_writer[handle] = writer
+
+    def is_last_writer(self, handle: int, writer: int) -> bool:
+        return handle in self.pending_barrier and self.last_writer.get(handle, 0) == writer
+
+    def access(self, handles: Iterable[int], barrier_bit: int) -> None:
+        if not any(self.pending_barrier.get(handle, 0) & barrier_bit for handle in handles):
+            return
+        glMemoryBarrier(barrier_bit)
+        # a barrier orders the shader writes to all buffers, not only to the accessed ones
+        for handle in list(self.pending_barrier.keys()):
+            self.pending_barrier[handle] &= ~barrier_bit
+            if self.pending_barrier[handle] == 0:
+                del self.pending_barrier[handle]
+                self.last_writer.pop(handle, None)
+
+    def access_storage(self, barrier_bit: int = GL_SHADER_STORAGE_BARRIER_BIT) -> None:
+        self.access(self.storage_binding.values(), barrier_bit)
+
+    def track_fence(self, handle: int) -> None:
+        self.fenced_handles.add(handle)
+
+    def untrack_fence(self, handle: int) -> None:
+        self.fenced_handles.discard(handle)
+        self.release_fence(handle)
+
+    def fence_written(self, handles: Iterable[int]) -> None:
+        fenced: List[int] = [
+            handle for handle in handles if handle in self.fenced_handles]
+        if len(fenced) == 0:
+            return
+        # shader writes are only visible through the mapping after the client barrier
+        self.access(fenced, GL_CLIENT_MAPPED_BUFFER_BARRIER_BIT)
+        fence: Any = create_fence()
+        for handle in fenced:
+            self.release_fence(handle)
+            self.write_fence[handle] = fence
+
+    def release_fence(self, handle: int) -> None:
+        fence: Any = self.write_fence.pop(handle, None)
+        # one fence is shared by all buffers written by the same command
+        if fence is not None and not any(fence is other for other in self.write_fence.values()):
+            delete_fence(fence)
+
+    def wait_for_write(self, handle: int) -> None:
+        if handle not in self.write_fence:
+            return
+        wait_for_fence(self.write_fence[handle])
+        self.release_fence(handle)
+
+
+def create_fence() -> Any:
+    return glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+
+
+def wait_for_fence(fence: Any, wait: bool = True) -> bool:
+    wait_status: int = glClientWaitSync(
+        fence, GL_SYNC_FLUSH_COMMANDS_BIT, GL_TIMEOUT_IGNORED if wait else 0)
+    return wait_status in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED)
+
+
+def delete_fence(fence: Any) -> None:
+    glDeleteSync(fence)
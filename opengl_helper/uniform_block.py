@@ -0,0 +1,88 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from OpenGL.GL import (GL_DYNAMIC_DRAW, GL_INVALID_INDEX, GL_UNIFORM_BUFFER,
+                       glBindBuffer, glBindBufferBase, glBufferData,
+                       glBufferSubData, glDeleteBuffers, glGenBuffers,
+                       glGetUniformBlockIndex, glUniformBlockBinding)
+
+# binding point of every uniform block, render shaders (glsl 410) can not set them in the layout
+UNIFORM_BLOCK_BINDING: Dict[str, int] = {
+    'camera_parameter': 0,
+    'grid_parameter': 1,
+    'edge_parameter': 2
+}
+
+# std140 base alignment, size and component type of the supported members
+STD140_TYPE: Dict[str, Tuple[int, int, Any]] = {
+    'float': (4, 4, np.float32),
+    'int': (4, 4, np.int32),
+    'vec3': (16, 12, np.float32),
+    'ivec3': (16, 12, np.int32),
+    'mat4': (16, 64, np.float32)
+}
+
+CAMERA_PARAMETER: List[Tuple[str, str]] = [('projection', 'mat4'),
+                                           ('view', 'mat4'),
+                                           ('scale', 'float')]
+
+GRID_PARAMETER: List[Tuple[str, str]] = [('grid_cell_count', 'ivec3'),
+                                         ('slice_size', 'int'),
+                                         ('grid_cell_size', 'vec3'),
+                                         ('slice_count', 'int'),
+                                         ('grid_bounding_min', 'vec3'),
+                                         ('density_strength', 'float'),
+                                         ('grid_bounding_max', 'vec3'),
+                                         ('edge_importance_type', 'int')]
+
+EDGE_PARAMETER: List[Tuple[str, str]] = [('sample_length', 'float'),
+                                         ('max_sample_points', 'int')]
+
+
+def set_uniform_block_binding(shader_handle: int) -> None:
+    for block_name, binding in UNIFORM_BLOCK_BINDING.items():
+        block_index: int = glGetUniformBlockIndex(shader_handle, block_name)
+        if block_index != GL_INVALID_INDEX:
+            glUniformBlockBinding(shader_handle, block_index, binding)
+
+
+class UniformBlock:
+    def __init__(self, name: str, members: List[Tuple[str, str]]) -> None:
+        self.name: str = name
+        self.binding: int = UNIFORM_BLOCK_BINDING[name]
+
+        self.member_offset: Dict[str, Tuple[int, str]] = dict()
+        offset: int = 0
+        for member_name, member_type in members:
+            alignment, size, _ = STD140_TYPE[member_type]
+            offset = int(np.ceil(offset / alignment)) * alignment
+            self.member_offset[member_name] = (offset, member_type)
+            offset += size
+        self.size: int = int(np.ceil(offset / 16)) * 16
+
+        self.data: np.array = np.zeros(self.size, dtype=np.uint8)
+        self.changed: bool = True
+        self.handle: int = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.handle)
+        glBufferData(GL_UNIFORM_BUFFER, self.size, None, GL_DYNAMIC_DRAW)
+
+    def set_data(self, data: List[Tuple[str, Any]]) -> None:
+        for member_name, member_data in data:
+            offset, member_type = self.member_offset[member_name]
+            _, size, component_type = STD140_TYPE[member_type]
+            # matrices keep the memory order glUniformMatrix4fv gets them in
+            new_data: np.array = np.ascontiguousarray(
+                member_data, dtype=component_type).reshape(-1).view(np.uint8)
+            if not np.array_equal(self.data[offset:offset + size], new_data):
+                self.data[offset:offset + size] = new_data
+                self.changed = True
+
+    def bind(self) -> None:
+        if self.changed:
+            glBindBuffer(GL_UNIFORM_BUFFER, self.handle)
+            glBufferSubData(GL_UNIFORM_BUFFER, 0, self.size, self.data)
+            self.changed = False
+        glBindBufferBase(GL_UNIFORM_BUFFER, self.binding, self.handle)
+
+    def delete(self) -> None:
+        glDeleteBuffers(1, [self.handle])
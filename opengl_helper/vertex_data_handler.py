@@ -3,11 +3,11 @@ from __future__ import annotations
 import abc
 from typing import List, Optional, Tuple
 
-from OpenGL.GL import (GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT, glBindVertexArray,
-                       glDeleteVertexArrays, glGenVertexArrays,
-                       glMemoryBarrier)
+from OpenGL.GL import (GL_SHADER_STORAGE_BARRIER_BIT, glBindVertexArray,
+                       glDeleteVertexArrays, glGenVertexArrays)
 
 from opengl_helper.buffer import BufferObject, OverflowingBufferObject
+from opengl_helper.synchronization import BufferSync
 
 
 class BaseDataHandler:
@@ -26,16 +26,19 @@ class BaseDataHandler:
 
 class VertexDataHandler(BaseDataHandler):
     def __init__(self, targeted_buffer_objects: List[Tuple[BufferObject, int]],
-                 buffer_divisor: Optional[List[Tuple[int, int]]] = None) -> None:
+                 buffer_divisor: Optional[List[Tuple[int, int]]] = None,
+                 storage_buffer_objects: Optional[List[Tuple[BufferObject, int]]] = None) -> None:
         super().__init__()
         self.handle: int = glGenVertexArrays(1)
         self.targeted_buffer_objects: List[Tuple[BufferObject,
                                                  int]] = targeted_buffer_objects
         self.buffer_divisor: List[Tuple[int, int]] = [
         ] if buffer_divisor is None else buffer_divisor
+        # storage buffers stay bound as ssbo, even when the other buffers are used as vertex attributes
+        self.storage_buffer_objects: List[Tuple[BufferObject, int]] = [
+        ] if storage_buffer_objects is None else storage_buffer_objects
 
     def set(self, rendering: bool = False) -> None:
-        glMemoryBarrier(GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
         glBindVertexArray(self.handle)
         for i, (buffer, location) in enumerate(self.targeted_buffer_objects):
             found_divisor: bool = False
@@ -48,6 +51,11 @@ class VertexDataHandler(BaseDataHandler):
                     buffer.bind(location, rendering)
                 else:
                     buffer.bind(location, rendering, divisor=1)
+        for buffer, location in self.storage_buffer_objects:
+            buffer.bind(location)
+        if rendering:
+            # compute shaders order their own storage accesses, render shaders may read any bound storage
+            BufferSync().access_storage(GL_SHADER_STORAGE_BARRIER_BIT)
 
     def delete(self) -> None:
         glDeleteVertexArrays(1, [self.handle])
@@ -71,7 +79,6 @@ class OverflowingVertexDataHandler(VertexDataHandler):
             o_buffer.bind_single(self.current_buffer_id, location, rendering)
 
     def set_range(self, count: int) -> None:
-        glMemoryBarrier(GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
         glBindVertexArray(self.handle)
         for buffer, location in self.targeted_buffer_objects:
             buffer.bind(location)
@@ -82,7 +89,6 @@ class OverflowingVertexDataHandler(VertexDataHandler):
                                          len(o_buffer.handle), location + i)
 
     def set_consecutive(self) -> None:
-        glMemoryBarrier(GL_VERTEX_ATTRIB_ARRAY_BARRIER_BIT)
         glBindVertexArray(self.handle)
         for buffer, location in self.targeted_buffer_objects:
             buffer.bind(location)
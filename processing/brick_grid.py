@@ -0,0 +1,86 @@
+import logging
+import math
+from typing import Any, List, Tuple
+
+import numpy as np
+from OpenGL.GL import GL_MAX_SHADER_STORAGE_BLOCK_SIZE, glGetIntegerv
+
+from models.grid import Grid
+from opengl_helper.buffer import BufferObject
+from opengl_helper.compute_shader import ComputeShader
+from opengl_helper.compute_shader_handler import ComputeShaderHandler
+
+BRICK_SIZE: int = 4
+BRICK_CELLS: int = BRICK_SIZE * BRICK_SIZE * BRICK_SIZE
+# share of the bricks covering the grid the pool starts with, it grows when more bricks are requested
+INITIAL_BRICK_OCCUPANCY: float = 0.25
+BRICK_POOL_GROWTH: float = 1.25
+
+
+class BrickGrid:
+    def __init__(self, grid: Grid, cell_object_size: int) -> None:
+        ComputeShaderHandler().create('brick_allocate', 'grid/brick_allocate.comp')
+
+        self.grid: Grid = grid
+        self.brick_count: List[int] = [
+            math.ceil(cell_count / BRICK_SIZE) for cell_count in grid.grid_cell_count]
+        self.brick_count_overall: int = self.brick_count[0] * \
+            self.brick_count[1] * self.brick_count[2]
+        self.brick_byte_size: int = BRICK_CELLS * cell_object_size * 4
+        self.max_brick_capacity: int = min(self.brick_count_overall,
+                                           int(glGetIntegerv(GL_MAX_SHADER_STORAGE_BLOCK_SIZE)) // self.brick_byte_size)
+
+        # the page table starts with the number of bricks allocated since the last clear
+        self.page_table_buffer: BufferObject = BufferObject(ssbo=True)
+        self.page_table_buffer.allocate(
+            math.ceil((self.brick_count_overall + 1) / 4) * 16)
+        self.page_table_buffer.clear()
+        self.brick_pool_buffer: BufferObject = BufferObject(ssbo=True)
+
+        self.brick_capacity: int = 0
+        self.resize(max(min(math.ceil(self.brick_count_overall * INITIAL_BRICK_OCCUPANCY), self.max_brick_capacity),
+                        1))
+
+    def resize(self, brick_capacity: int) -> None:
+        self.brick_capacity = brick_capacity
+        self.brick_pool_buffer.allocate(brick_capacity * self.brick_byte_size)
+        logging.info(
+            f'Brick pool holds {brick_capacity} of {self.brick_count_overall} bricks')
+
+    def get_uniform_data(self) -> List[Tuple[str, Any, str]]:
+        return [('brick_count', self.brick_count, 'ivec3'),
+                ('brick_capacity', self.brick_capacity, 'int')]
+
+    def clear(self) -> None:
+        # only the page table is cleared, cells of a brick are cleared when it is allocated again
+        self.page_table_buffer.clear()
+
+    def bind(self, page_location: int = 3, pool_location: int = 4) -> None:
+        self.page_table_buffer.bind(page_location)
+        self.brick_pool_buffer.bind(pool_location)
+
+    def allocate(self) -> bool:
+        # every requested page entry gets a brick from the pool
+        allocate: ComputeShader = ComputeShaderHandler().get('brick_allocate')
+        allocate.set_uniform_data(self.get_uniform_data())
+        self.bind()
+        allocate.compute(self.brick_count_overall)
+
+        # the density of bricks without a slot would be lost, so the pool grows before the density pass
+        requested_bricks: int = int(np.frombuffer(
+            self.page_table_buffer.read(0, 4, view=True), dtype=np.uint32)[0])
+        if requested_bricks <= self.brick_capacity:
+            return True
+        new_capacity: int = min(
+            math.ceil(requested_bricks * BRICK_POOL_GROWTH), self.max_brick_capacity)
+        if new_capacity <= self.brick_capacity:
+            logging.warning(
+                f'{requested_bricks} bricks requested, but only {self.brick_capacity} fit into a SSBO')
+            return True
+        logging.info(f'{requested_bricks} bricks requested, grow brick pool')
+        self.resize(new_capacity)
+        return False
+
+    def delete(self) -> None:
+        self.page_table_buffer.delete()
+        self.brick_pool_buffer.delete()
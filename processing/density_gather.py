@@ -0,0 +1,73 @@
+import math
+from typing import Any, List, Tuple
+
+from models.grid import Grid
+from opengl_helper.buffer import BufferObject, OverflowingBufferObject
+from opengl_helper.compute_shader import ComputeShader
+from opengl_helper.compute_shader_handler import ComputeShaderHandler
+from opengl_helper.prefix_sum import PrefixSum
+from opengl_helper.vertex_data_handler import VertexDataHandler
+
+
+class DensityGather:
+    def __init__(self, grid: Grid) -> None:
+        ComputeShaderHandler().create('gather_bin_count', 'grid/gather_bin_count.comp')
+        ComputeShaderHandler().create('gather_bin_sort', 'grid/gather_bin_sort.comp')
+        ComputeShaderHandler().create('gather_density', 'grid/gather_density_map.comp')
+
+        # one bin per grid cell, holding the segments with their midpoint in the cell
+        self.bin_count: int = grid.grid_cell_count[0] * \
+            grid.grid_cell_count[1] * grid.grid_cell_count[2]
+        self.bin_buffer: BufferObject = BufferObject(ssbo=True)
+        self.bin_buffer.allocate(math.ceil(self.bin_count / 4) * 16)
+        self.sample_bin_buffer: BufferObject = BufferObject(ssbo=True)
+        self.segment_buffer: BufferObject = BufferObject(ssbo=True)
+        # two end points and the importance of every class, std430 rounds it up to whole vec4
+        self.segment_byte_size: int = (
+            8 + math.ceil(ComputeShaderHandler().num_classes / 4) * 4) * 4
+        self.prefix_sum: PrefixSum = PrefixSum()
+
+    def reserve(self, sample_count: int) -> None:
+        if self.sample_bin_buffer.size < sample_count * 8:
+            self.sample_bin_buffer.allocate(sample_count * 8)
+        if self.segment_buffer.size < sample_count * self.segment_byte_size:
+            self.segment_buffer.allocate(sample_count * self.segment_byte_size)
+
+    def sort(self, sample_ssbo_handler: VertexDataHandler, sample_count: int, cell_count: int,
+             uniform_data: List[Tuple[str, Any, str]]) -> None:
+        # counting sort of the segments by the cell of their midpoint
+        self.reserve(sample_count)
+        self.bin_buffer.clear()
+
+        count: ComputeShader = ComputeShaderHandler().get('gather_bin_count')
+        count.set_uniform_data(uniform_data)
+        sample_ssbo_handler.set()
+        self.bin_buffer.bind(4)
+        self.sample_bin_buffer.bind(5)
+        count.compute(sample_count)
+
+        self.prefix_sum.compute(self.bin_buffer, cell_count)
+
+        sort: ComputeShader = ComputeShaderHandler().get('gather_bin_sort')
+        sample_ssbo_handler.set()
+        self.segment_buffer.bind(3)
+        self.bin_buffer.bind(4)
+        self.sample_bin_buffer.bind(5)
+        sort.compute(sample_count)
+
+    def gather(self, density_buffer: OverflowingBufferObject, uniform_data: List[Tuple[str, Any, str]]) -> None:
+        # every cell adds up the sorted segments of the bins its density can come from
+        gather: ComputeShader = ComputeShaderHandler().get('gather_density')
+        gather.set_uniform_data(uniform_data)
+        self.bin_buffer.bind(4)
+        self.segment_buffer.bind(5)
+        for i in range(len(density_buffer.handle)):
+            gather.set_uniform_data([('current_buffer', i, 'int')])
+            density_buffer.bind_single(i, 3)
+            gather.compute(density_buffer.get_objects(i))
+
+    def delete(self) -> None:
+        self.bin_buffer.delete()
+        self.sample_bin_buffer.delete()
+        self.segment_buffer.delete()
+        self.prefix_sum.delete()
@@ -1,38 +1,90 @@
 import logging
+import math
+from enum import IntEnum
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
-from OpenGL.GL import glFinish
-
-from definitions import ADDITIONAL_EDGE_BUFFER_DATA, pairwise
-from models.edge import Edge
+from OpenGL.GL import (GL_BUFFER_UPDATE_BARRIER_BIT,
+                       GL_MAX_COMPUTE_SHARED_MEMORY_SIZE,
+                       GL_MAX_SHADER_STORAGE_BLOCK_SIZE, glFlush,
+                       glGetIntegerv)
+
+from definitions import ADDITIONAL_EDGE_BUFFER_DATA
+from models.edge import (EdgeContainer, compact_sample_data,
+                         expand_sample_data, get_sample_capacity,
+                         split_edge_count, split_edges_for_buffer)
 from models.network import NetworkModel
-from opengl_helper.buffer import (BufferObject, SwappingBufferObject,
+from opengl_helper.buffer import (BufferObject, MappedBufferObject,
+                                  MappedSwappingBufferObject,
+                                  SwappingBufferObject, get_buffer_object_size,
                                   get_buffer_settings)
 from opengl_helper.compute_shader import ComputeShader
 from opengl_helper.compute_shader_handler import ComputeShaderHandler
+from opengl_helper.prefix_sum import PrefixSum
+from opengl_helper.synchronization import (BufferSync, create_fence,
+                                           delete_fence, wait_for_fence)
+from opengl_helper.uniform_block import EDGE_PARAMETER, UniformBlock
 from opengl_helper.vertex_data_handler import VertexDataHandler
 from processing.advection_process import AdvectionProgress
 from utility.performance import track_time
 
 
+class SmoothingKernel(IntEnum):
+    LEGACY = 0
+    SHARED = 1
+    PREFIX = 2
+
+
 class EdgeProcessor:
-    def __init__(self, sample_length: float, max_edges_per_buffer: int = 1000, edge_importance_type: int = 0) -> None:
+    def __init__(self, sample_length: float, max_edges_per_buffer: Optional[int] = None,
+                 edge_importance_type: int = 0, mapped_buffer: bool = False, layer_containers: bool = False,
+                 smoothing_kernel: SmoothingKernel = SmoothingKernel.LEGACY,
+                 parallel_resampling: bool = False) -> None:
+        # the single pass smoothing keeps an edge's samples and their prefix sum in shared memory,
+        # the remaining space has to hold one chunk sum for each invocation of the largest workgroup
+        self.shared_sample_capacity: int = min(
+            (int(glGetIntegerv(GL_MAX_COMPUTE_SHARED_MEMORY_SIZE)) - 1024 * 16) // 32, 1024)
+        ComputeShaderHandler().set_shared_sample_capacity(self.shared_sample_capacity)
         shader_settings: Dict[str, str] = {
             'init_edge_sampler': 'edge/initial_edge_sample.comp',
             'edge_sampler': 'edge/edge_sample.comp',
             'edge_noise': 'edge/sample_noise.comp',
             'sample_smooth': 'edge/sample_smooth.comp',
+            'sample_smooth_shared': 'edge/sample_smooth_shared.comp',
+            'sample_position_sum': 'edge/sample_position_sum.comp',
+            'sample_smooth_prefix': 'edge/sample_smooth_prefix.comp',
+            'sample_arc_length': 'edge/sample_arc_length.comp',
+            'arc_length_sampler': 'edge/arc_length_sample.comp',
             'edge_limits': 'edge/edge_limits.comp',
+            'edge_limits_reduction': 'edge/edge_limits_reduction.comp',
             'sample_copy': 'edge/sample_copy.comp',
+            'edge_position_update': 'edge/edge_position_update.comp',
+            'sample_resize': 'edge/sample_resize.comp',
+            'sample_capacity': 'edge/sample_capacity.comp',
         }
         for shader_name, path in shader_settings.items():
             ComputeShaderHandler().create(shader_name, path)
 
-        self.max_edges_per_buffer: int = max_edges_per_buffer
+        self.max_edges_per_buffer: Optional[int] = max_edges_per_buffer
+        self.mapped_buffer: bool = mapped_buffer
+        self.layer_containers: bool = layer_containers
+        self.smoothing_kernel: SmoothingKernel = smoothing_kernel
+        self.parallel_resampling: bool = parallel_resampling
+        self.max_ssbo_size: int = glGetIntegerv(
+            GL_MAX_SHADER_STORAGE_BLOCK_SIZE)
+        self.edge_container_size: int = 0
+        self.buffer_layout_changed: bool = False
+        self.num_classes: int = 0
         self.sample_buffer: List[List[SwappingBufferObject]] = []
         self.edge_buffer: List[List[BufferObject]] = []
+        self.sample_offset_buffer: List[List[BufferObject]] = []
         self.ssbo_handler: List[List[VertexDataHandler]] = []
+        # scanned sample capacities of every container and their totals, kept to only grow between resamples
+        self.capacity_buffer: List[BufferObject] = []
+        self.sample_total_buffer: BufferObject = BufferObject(ssbo=True)
+        # per sample data of a container only needed during a single pass, e.g. prefix sums or arc lengths
+        self.sample_scratch_buffer: BufferObject = BufferObject(ssbo=True)
+        self.prefix_sum: PrefixSum = PrefixSum()
 
         self.edge_count: int = 0
         self.layer_edge_count: List[int] = []
@@ -41,6 +93,10 @@ class EdgeProcessor:
         self.sampled: bool = False
         self.sample_length: float = sample_length
         self.point_count: int = 0
+        self.max_edge_samples: int = 0
+        self.limit_buffer: BufferObject = BufferObject(ssbo=True)
+        self.limit_buffer.load(np.zeros(4, dtype=np.uint32))
+        self.limit_fence: Any = None
         self.nearest_view_z: int = -1000000
         self.farthest_view_z: int = 1000000
         self.max_sample_points: int = 0
@@ -48,119 +104,282 @@ class EdgeProcessor:
         self.edge_importance_type: int = edge_importance_type
         self.edge_min_importance: float = 0.0
         self.edge_max_importance: float = 1.0
+        self.edge_parameter: UniformBlock = UniformBlock(
+            'edge_parameter', EDGE_PARAMETER)
 
     def set_data(self, network: NetworkModel) -> None:
-        edges: List[List[List[Edge]]] = network.generate_filtered_edges(
-            self.max_edges_per_buffer)
+        edges: List[EdgeContainer] = network.generate_filtered_edges()
         self.edge_min_importance = network.edge_min_importance
         self.edge_max_importance = network.edge_max_importance
-
-        self.layer_edge_count = [len(layer) for layer in edges]
-        self.layer_container_edge_count = [
-            [len(container) for container in layer] for layer in edges]
-        self.edge_count = sum([sum(layer)
-                              for layer in self.layer_container_edge_count])
+        self.num_classes = network.num_classes
 
         # calculate smoothing radius
         max_distance: float = network.generate_max_distance()
-        self.smooth_radius = (
-            int((max_distance * 2.0) / self.sample_length) * 8.0) / 100.0
+        self.smooth_radius = self.get_smooth_radius(max_distance)
 
         # read or calculate max sample point value for buffer objects
-        if len(edges[0][0][0].sample_data) > 8:
+        if edges[0].sample_data.shape[1] > 8:
             self.sampled = True
-            self.max_sample_points = int(len(edges[0][0][0].sample_data) / 4)
+            self.max_sample_points = int(edges[0].sample_data.shape[1] / 4)
         else:
-            self.max_sample_points = int(
-                (max_distance * 5.0) / self.sample_length) + 2
+            self.max_sample_points = self.get_max_sample_points(max_distance)
 
         if len(self.sample_buffer) > 0:
-            self.delete()
-
-        self.fill_buffer(edges, network.num_classes)
+            self.delete_container()
+
+        self.fill_buffer(edges)
+
+    def get_smooth_radius(self, max_distance: float) -> float:
+        return (int((max_distance * 2.0) / self.sample_length) * 8.0) / 100.0
+
+    def get_max_sample_points(self, max_distance: float) -> int:
+        return int((max_distance * 5.0) / self.sample_length) + 2
+
+    def get_container_size(self, max_sample_points: Optional[int] = None) -> int:
+        if self.max_edges_per_buffer is not None:
+            return self.max_edges_per_buffer
+        if self.layer_containers:
+            # the compacted samples of a whole layer share one container and are processed by a single dispatch
+            return max(max(self.layer_edge_count, default=0), 1)
+        if max_sample_points is None:
+            max_sample_points = self.max_sample_points
+        edge_record_size: int = get_buffer_object_size(
+            0, ADDITIONAL_EDGE_BUFFER_DATA) * 4
+        sample_record_size: int = max_sample_points * 4 * 4
+        return max(int(self.max_ssbo_size / max(edge_record_size, sample_record_size)), 1)
+
+    def create_container(self) -> Tuple[SwappingBufferObject, BufferObject, BufferObject, VertexDataHandler]:
+        object_size, render_data_offset, render_data_size = \
+            get_buffer_settings(0, ADDITIONAL_EDGE_BUFFER_DATA)
+        if self.mapped_buffer:
+            sample_buffer: SwappingBufferObject = MappedSwappingBufferObject(object_size=4, render_data_size=[4, 4],
+                                                                             render_data_offset=[0, 4])
+            edge_buffer: BufferObject = MappedBufferObject(object_size=object_size,
+                                                           render_data_size=render_data_size,
+                                                           render_data_offset=render_data_offset)
+            sample_offset_buffer: BufferObject = MappedBufferObject()
+        else:
+            sample_buffer = SwappingBufferObject(ssbo=True, object_size=4, render_data_size=[4, 4],
+                                                 render_data_offset=[0, 4])
+            edge_buffer = BufferObject(ssbo=True, object_size=object_size, render_data_size=render_data_size,
+                                       render_data_offset=render_data_offset)
+            sample_offset_buffer = BufferObject(ssbo=True)
+        return sample_buffer, edge_buffer, sample_offset_buffer, VertexDataHandler(
+            [(sample_buffer, 0), (edge_buffer, 2), (sample_offset_buffer, 7)])
+
+    def fill_buffer(self, edges: List[EdgeContainer]) -> None:
+        self.layer_edge_count = [len(layer_edges) for layer_edges in edges]
+        self.edge_count = sum(self.layer_edge_count)
+
+        # every edge only gets the sample slots its own length needs
+        layer_capacity: List[np.array] = [
+            get_sample_capacity(layer_edges.sample_data, self.sample_length, self.max_sample_points) for layer_edges in
+            edges]
+        edge_record_size: int = get_buffer_object_size(
+            0, ADDITIONAL_EDGE_BUFFER_DATA) * 4
+        if self.layer_containers and any(
+                int(np.sum(capacity)) * 16 > self.max_ssbo_size or capacity.shape[0] * edge_record_size >
+                self.max_ssbo_size for capacity in layer_capacity):
+            logging.info(
+                'Edges of a layer do not fit into a single container.')
+            self.layer_containers = False
+
+        self.edge_container_size = self.get_container_size()
+        split_edges: List[List[EdgeContainer]] = split_edges_for_buffer(
+            edges, self.edge_container_size)
+        logging.info(
+            f'Edges split into {sum([len(layer) for layer in split_edges])} containers of up to {self.edge_container_size} edges')
+        self.layer_container_edge_count = [
+            [len(container) for container in layer] for layer in split_edges]
 
-    def fill_buffer(self, edges: List[List[List[Edge]]], num_classes: int) -> None:
-        for layer_data in edges:
+        for layer_data, capacity in zip(split_edges, layer_capacity):
             new_layer_sample_buffer: List[SwappingBufferObject] = []
             new_layer_edge_buffer: List[BufferObject] = []
+            new_layer_sample_offset_buffer: List[BufferObject] = []
             new_layer_ssbo_handler: List[VertexDataHandler] = []
+            container_start: int = 0
             for edge_container in layer_data:
-                new_sample_buffer: SwappingBufferObject = SwappingBufferObject(ssbo=True, object_size=4,
-                                                                               render_data_size=[
-                                                                                   4, 4],
-                                                                               render_data_offset=[0, 4])
-
-                object_size, render_data_offset, render_data_size = \
-                    get_buffer_settings(
-                        num_classes * 2, ADDITIONAL_EDGE_BUFFER_DATA)
-                new_edge_buffer: BufferObject = BufferObject(ssbo=True, object_size=object_size,
-                                                             render_data_size=render_data_size,
-                                                             render_data_offset=render_data_offset)
-                new_ssbo_handler: VertexDataHandler = VertexDataHandler(
-                    [(new_sample_buffer, 0), (new_edge_buffer, 2)])
-
-                initial_data: List[float] = []
-                for edge in edge_container:
-                    initial_data.extend(edge.sample_data)
-                    if self.max_sample_points * 4 - len(edge.sample_data) > 0:
-                        initial_data.extend(
-                            [0] * (self.max_sample_points * 4 - len(edge.sample_data)))
-                transfer_data = np.array(initial_data, dtype=np.float32)
+                new_sample_buffer, new_edge_buffer, new_sample_offset_buffer, new_ssbo_handler = \
+                    self.create_container()
+
+                transfer_data, sample_offset = compact_sample_data(
+                    edge_container.sample_data, capacity[container_start:container_start + len(edge_container)])
+                container_start += len(edge_container)
                 new_sample_buffer.load(transfer_data)
                 new_sample_buffer.swap()
                 new_sample_buffer.load(transfer_data)
                 new_sample_buffer.swap()
+                new_sample_offset_buffer.load(sample_offset)
 
-                initial_data = []
-                for edge in edge_container:
-                    initial_data.extend(edge.data)
-                transfer_data = np.array(initial_data, dtype=np.float32)
-                new_edge_buffer.load(transfer_data)
+                new_edge_buffer.load(np.ascontiguousarray(
+                    edge_container.edge_data, dtype=np.float32))
 
                 new_layer_sample_buffer.append(new_sample_buffer)
                 new_layer_edge_buffer.append(new_edge_buffer)
+                new_layer_sample_offset_buffer.append(new_sample_offset_buffer)
                 new_layer_ssbo_handler.append(new_ssbo_handler)
 
             self.sample_buffer.append(new_layer_sample_buffer)
             self.edge_buffer.append(new_layer_edge_buffer)
+            self.sample_offset_buffer.append(new_layer_sample_offset_buffer)
             self.ssbo_handler.append(new_layer_ssbo_handler)
 
-    def set_uniform(self, compute_shader: ComputeShader, uniforms: List[str]) -> None:
-        uniform_data: List[Tuple[str, Any, Any]] = []
-        if 'max_sample_points' in uniforms:
-            uniform_data.append(
-                ('max_sample_points', self.max_sample_points, 'int'))
-        if 'sample_length' in uniforms:
-            uniform_data.append(('sample_length', self.sample_length, 'float'))
-        compute_shader.set_uniform_data(uniform_data)
+    def set_edge_parameter(self) -> None:
+        # the block is only uploaded again if the sample length or limit changed since the last use
+        self.edge_parameter.set_data([('sample_length', self.sample_length),
+                                      ('max_sample_points', self.max_sample_points)])
+        self.edge_parameter.bind()
 
     @track_time
     def resize_sample_storage(self, new_max_samples: int) -> None:
         logging.info('Resize buffer.')
 
-        for i in range(len(self.sample_buffer)):
-            for j in range(len(self.sample_buffer[i])):
-                edge_sample_data = np.array(
-                    self.read_samples_from_buffer(i, j), dtype=np.float32)
-                edge_sample_data = edge_sample_data.reshape(
-                    (self.get_edge_count(i, j), self.max_sample_points * 4))
-
-                buffer_data = []
-                for k in range(self.get_edge_count(i, j)):
-                    edge_points: int = int(edge_sample_data[k][3])
-                    buffer_data.extend(
-                        edge_sample_data[k][None:(int(edge_points * 4))])
-                    buffer_data.extend(
-                        [0] * (new_max_samples * 4 - edge_points * 4))
-
-                transfer_data = np.array(buffer_data, dtype=np.float32)
-
-                self.sample_buffer[i][j].load(transfer_data)
-                self.sample_buffer[i][j].swap()
-                self.sample_buffer[i][j].load(transfer_data)
-                self.sample_buffer[i][j].swap()
-
         self.max_sample_points = new_max_samples
+        self.rebuild_sample_offsets()
+        if self.get_container_size() < self.edge_container_size:
+            # the larger sample limit does not fit into the current containers anymore, repartition them
+            self.repartition_buffer()
+            self.buffer_layout_changed = True
+
+    @track_time
+    def rebuild_sample_offsets(self) -> None:
+        capacity: ComputeShader = ComputeShaderHandler().get('sample_capacity')
+        resize: ComputeShader = ComputeShaderHandler().get('sample_resize')
+        self.set_edge_parameter()
+
+        containers: List[Tuple[int, int]] = [(i, j) for i in range(len(self.sample_buffer)) for j in
+                                             range(len(self.sample_buffer[i])) if self.get_edge_count(i, j) > 0]
+        while len(self.capacity_buffer) < len(containers):
+            self.capacity_buffer.append(BufferObject(ssbo=True))
+        total_size: int = math.ceil(len(containers) / 4) * 16
+        if self.sample_total_buffer.size < total_size:
+            self.sample_total_buffer.allocate(total_size)
+
+        # new offsets of every container are the scanned capacities of its edges
+        for container_id, (i, j) in enumerate(containers):
+            edge_count: int = self.get_edge_count(i, j)
+            capacity_buffer: BufferObject = self.capacity_buffer[container_id]
+            if capacity_buffer.size < (edge_count + 1) * 4:
+                capacity_buffer.allocate((edge_count + 1) * 4)
+            self.ssbo_handler[i][j].set()
+            capacity_buffer.bind(3)
+            capacity.compute(edge_count)
+            self.prefix_sum.compute(capacity_buffer, edge_count + 1)
+            capacity_buffer.copy_to(
+                self.sample_total_buffer, 4, edge_count * 4, container_id * 4)
+        # a single read back of all container sizes
+        sample_totals: np.array = np.frombuffer(
+            self.sample_total_buffer.read(0, len(containers) * 4, view=True), dtype=np.uint32) if len(containers) > 0 else np.zeros(0, dtype=np.uint32)
+
+        container_overflow: bool = False
+        for container_id, (i, j) in enumerate(containers):
+            edge_count = self.get_edge_count(i, j)
+            capacity_buffer = self.capacity_buffer[container_id]
+            sample_size: int = int(sample_totals[container_id]) * 16
+            if self.layer_containers and sample_size > self.max_ssbo_size:
+                # keep the old samples, the container is split before it is rebuilt
+                container_overflow = True
+                continue
+
+            # move the samples into their new ranges, then mirror samples and offsets into the used buffers
+            self.sample_buffer[i][j].reserve_swap(sample_size)
+            self.ssbo_handler[i][j].set()
+            capacity_buffer.bind(3)
+            resize.compute(edge_count)
+            self.sample_buffer[i][j].swap()
+            self.sample_buffer[i][j].size = sample_size
+            self.sample_buffer[i][j].reserve_swap(sample_size)
+            self.sample_buffer[i][j].copy_to_swap()
+            capacity_buffer.copy_to(
+                self.sample_offset_buffer[i][j], (edge_count + 1) * 4)
+
+        if container_overflow:
+            logging.info(
+                'Edges of a layer do not fit into a single container anymore.')
+            self.layer_containers = False
+            self.repartition_buffer()
+            self.buffer_layout_changed = True
+            self.rebuild_sample_offsets()
+
+    def repartition_buffer(self) -> None:
+        self.edge_container_size = self.get_container_size()
+        layer_container_edge_count: List[List[int]] = [
+            split_edge_count(layer_edge_count, self.edge_container_size) for layer_edge_count in self.layer_edge_count]
+        logging.info(
+            f'Edges split into {sum([len(layer) for layer in layer_container_edge_count])} containers of up to {self.edge_container_size} edges')
+        edge_record_size: int = get_buffer_object_size(
+            0, ADDITIONAL_EDGE_BUFFER_DATA) * 4
+        old_sample_offset: List[List[np.array]] = [
+            [np.frombuffer(buffer.read(view=True), dtype=np.uint32).astype(np.int64) for buffer in layer_buffer] for
+            layer_buffer in self.sample_offset_buffer]
+
+        sample_buffer: List[List[SwappingBufferObject]] = []
+        edge_buffer: List[List[BufferObject]] = []
+        sample_offset_buffer: List[List[BufferObject]] = []
+        ssbo_handler: List[List[VertexDataHandler]] = []
+        for i, container_edge_count in enumerate(layer_container_edge_count):
+            new_layer_sample_buffer: List[SwappingBufferObject] = []
+            new_layer_edge_buffer: List[BufferObject] = []
+            new_layer_sample_offset_buffer: List[BufferObject] = []
+            new_layer_ssbo_handler: List[VertexDataHandler] = []
+            new_container_start: List[int] = np.cumsum(
+                [0] + container_edge_count).tolist()
+            old_container_start: List[int] = np.cumsum(
+                [0] + self.layer_container_edge_count[i]).tolist()
+            for j, edge_count in enumerate(container_edge_count):
+                new_sample_buffer, new_edge_buffer, new_sample_offset_buffer, new_ssbo_handler = \
+                    self.create_container()
+
+                # the samples of consecutive edges are consecutive, every overlapping range of the old containers
+                # is a single copy and its offsets only have to be moved to the new start
+                copy_ranges: List[Tuple[int, int, int, int, int, int]] = []
+                sample_offset: np.array = np.zeros(
+                    edge_count + 1, dtype=np.uint32)
+                sample_count: int = 0
+                for k in range(len(self.edge_buffer[i])):
+                    range_start: int = max(
+                        new_container_start[j], old_container_start[k])
+                    range_end: int = min(
+                        new_container_start[j + 1], old_container_start[k + 1])
+                    if range_end <= range_start:
+                        continue
+                    old_offset: np.array = old_sample_offset[i][k][
+                        range_start - old_container_start[k]:range_end - old_container_start[k] + 1]
+                    sample_offset[range_start - new_container_start[j]:range_end - new_container_start[j] + 1] = \
+                        old_offset - old_offset[0] + sample_count
+                    range_sample_count: int = int(
+                        old_offset[-1] - old_offset[0])
+                    copy_ranges.append((k, range_start, range_end, int(
+                        old_offset[0]), sample_count, range_sample_count))
+                    sample_count += range_sample_count
+
+                new_sample_buffer.allocate(sample_count * 16)
+                new_edge_buffer.allocate(edge_count * edge_record_size)
+                new_sample_offset_buffer.load(sample_offset)
+                for k, range_start, range_end, read_sample, write_sample, range_sample_count in copy_ranges:
+                    self.edge_buffer[i][k].copy_to(new_edge_buffer, (range_end - range_start) * edge_record_size,
+                                                   (range_start -
+                                                    old_container_start[k]) * edge_record_size,
+                                                   (range_start - new_container_start[j]) * edge_record_size)
+                    self.sample_buffer[i][k].copy_to(new_sample_buffer, range_sample_count * 16,
+                                                     read_sample * 16, write_sample * 16)
+                new_sample_buffer.copy_to_swap()
+
+                new_layer_sample_buffer.append(new_sample_buffer)
+                new_layer_edge_buffer.append(new_edge_buffer)
+                new_layer_sample_offset_buffer.append(new_sample_offset_buffer)
+                new_layer_ssbo_handler.append(new_ssbo_handler)
+            sample_buffer.append(new_layer_sample_buffer)
+            edge_buffer.append(new_layer_edge_buffer)
+            sample_offset_buffer.append(new_layer_sample_offset_buffer)
+            ssbo_handler.append(new_layer_ssbo_handler)
+
+        self.delete_container()
+        self.sample_buffer = sample_buffer
+        self.edge_buffer = edge_buffer
+        self.sample_offset_buffer = sample_offset_buffer
+        self.ssbo_handler = ssbo_handler
+        self.layer_container_edge_count = layer_container_edge_count
 
     def run_compute(self, compute_shader: ComputeShader, compute_width_func: Callable, wait_for_compute: bool = False) -> None:
         for i in range(len(self.sample_buffer)):
@@ -168,28 +387,64 @@ class EdgeProcessor:
                 self.ssbo_handler[i][j].set()
                 compute_shader.compute(compute_width_func(i, j))
                 self.sample_buffer[i][j].swap()
-                compute_shader.barrier()
                 if wait_for_compute:
-                    glFinish()
+                    glFlush()
 
     def copy(self) -> None:
         copy: ComputeShader = ComputeShaderHandler().get('sample_copy')
-        self.set_uniform(copy, ['max_sample_points'])
         self.run_compute(copy, self.get_buffer_points)
 
-    def set_edge_sample(self, compute_shader: ComputeShader, sample_length: Optional[float] = None) -> None:
+    def set_edge_sample(self, compute_shader: ComputeShader, sample_length: Optional[float] = None,
+                        even_spacing: bool = False) -> None:
         if sample_length is not None:
             self.sample_length = sample_length
-        self.set_uniform(compute_shader, [
-                         'max_sample_points', 'sample_length'])
-        self.run_compute(compute_shader, self.get_edge_count)
-        self.copy()
+        self.set_edge_parameter()
+        if self.parallel_resampling:
+            self.arc_length_sample(even_spacing)
+        else:
+            self.run_compute(compute_shader, self.get_edge_count)
+        # the sample count of the edges changed, fit every edge into a new capacity of its own
+        self.rebuild_sample_offsets()
         self.sampled = True
 
     @track_time
     def init_sample_edge(self, sample_length: Optional[float] = None) -> None:
         init: ComputeShader = ComputeShaderHandler().get('init_edge_sampler')
-        self.set_edge_sample(init, sample_length)
+        self.set_edge_sample(init, sample_length, True)
+
+    def arc_length_sample(self, even_spacing: bool = False) -> None:
+        # the cumulative arc length of every edge lets each output sample find its position independently
+        arc_length: ComputeShader = ComputeShaderHandler().get('sample_arc_length')
+        sampler: ComputeShader = ComputeShaderHandler().get('arc_length_sampler')
+        sampler.set_uniform_data(
+            [('even_spacing', 1 if even_spacing else 0, 'int')])
+        for i in range(len(self.sample_buffer)):
+            for j in range(len(self.sample_buffer[i])):
+                scratch_size: int = self.get_buffer_points(i, j) * 4
+                if self.sample_scratch_buffer.size < scratch_size:
+                    self.sample_scratch_buffer.allocate(scratch_size)
+                self.ssbo_handler[i][j].set()
+                self.sample_scratch_buffer.bind(3)
+                arc_length.compute(self.get_edge_count(i, j)
+                                   * arc_length.local_size)
+                sampler.compute(self.get_buffer_points(i, j))
+                self.sample_buffer[i][j].swap()
+
+    @track_time
+    def update_edge_positions(self, network: NetworkModel, node_buffer: BufferObject) -> None:
+        # moved nodes may lengthen edges beyond the current sample storage
+        max_distance: float = network.generate_max_distance()
+        self.smooth_radius = self.get_smooth_radius(max_distance)
+        if self.get_max_sample_points(max_distance) > self.max_sample_points:
+            self.resize_sample_storage(
+                self.get_max_sample_points(max_distance))
+
+        update: ComputeShader = ComputeShaderHandler().get('edge_position_update')
+        node_buffer.bind(6)
+        self.run_compute(update, self.get_edge_count)
+        # the initial sampler needs the capacity of the new edge length
+        self.rebuild_sample_offsets()
+        self.init_sample_edge()
 
     @track_time
     def sample_edges(self, sample_length: Optional[float] = None) -> None:
@@ -199,7 +454,7 @@ class EdgeProcessor:
     @track_time
     def sample_noise(self, strength: float = 1.0, move_start_end: int = 0) -> None:
         noise: ComputeShader = ComputeShaderHandler().get('edge_noise')
-        self.set_uniform(noise, ['max_sample_points', 'sample_length'])
+        self.set_edge_parameter()
         noise.set_uniform_data([
             ('noise_strength', strength, 'float'),
             ('move_start_end', move_start_end, 'int')
@@ -207,33 +462,94 @@ class EdgeProcessor:
         self.run_compute(noise, self.get_edge_count)
 
     @track_time
-    def sample_smooth(self, advection_status: AdvectionProgress, wait_for_compute: bool = False) -> None:
+    def sample_smooth(self, advection_status: AdvectionProgress, wait_for_compute: bool = False,
+                      iterations: int = 1) -> None:
+        if iterations <= 0:
+            return
+        if self.smoothing_kernel == SmoothingKernel.SHARED and self.max_sample_points <= self.shared_sample_capacity:
+            # one workgroup per edge applies all iterations to the edge's samples in shared memory
+            shared_smooth: ComputeShader = ComputeShaderHandler().get('sample_smooth_shared')
+            shared_smooth.set_uniform_data(
+                [('bandwidth_reduction', advection_status.get_bandwidth_reduction(), 'float'),
+                 ('smoothing_iterations', iterations, 'int')])
+            self.run_compute(shared_smooth, lambda i, j: self.get_edge_count(i, j) * shared_smooth.local_size,
+                             wait_for_compute)
+            return
+
+        # edges with more samples than the shared memory holds fall back to the prefix sum smoothing
+        if self.smoothing_kernel != SmoothingKernel.LEGACY:
+            self.sample_smooth_prefix_sum(
+                advection_status, wait_for_compute, iterations)
+            return
+
         smooth: ComputeShader = ComputeShaderHandler().get('sample_smooth')
-        self.set_uniform(smooth, ['max_sample_points'])
         smooth.set_uniform_data(
             [('bandwidth_reduction', advection_status.get_bandwidth_reduction(), 'float')])
-        self.run_compute(smooth, self.get_buffer_points, wait_for_compute)
+        for _ in range(iterations):
+            self.run_compute(smooth, self.get_buffer_points, wait_for_compute)
+
+    def sample_smooth_prefix_sum(self, advection_status: AdvectionProgress, wait_for_compute: bool = False,
+                                 iterations: int = 1) -> None:
+        # per edge prefix sums of the sample positions let every sample average its window in constant time
+        position_sum: ComputeShader = ComputeShaderHandler().get('sample_position_sum')
+        smooth: ComputeShader = ComputeShaderHandler().get('sample_smooth_prefix')
+        smooth.set_uniform_data(
+            [('bandwidth_reduction', advection_status.get_bandwidth_reduction(), 'float')])
+        for _ in range(iterations):
+            for i in range(len(self.sample_buffer)):
+                for j in range(len(self.sample_buffer[i])):
+                    sample_size: int = self.get_buffer_points(i, j) * 16
+                    if self.sample_scratch_buffer.size < sample_size:
+                        self.sample_scratch_buffer.allocate(sample_size)
+                    self.ssbo_handler[i][j].set()
+                    self.sample_scratch_buffer.bind(3)
+                    position_sum.compute(self.get_edge_count(i, j))
+                    smooth.compute(self.get_buffer_points(i, j))
+                    self.sample_buffer[i][j].swap()
+                    if wait_for_compute:
+                        glFlush()
 
     @track_time
     def check_limits(self, check_resize: bool = False) -> None:
+        # pick up the result of the last check if the gpu already finished it
+        self.fetch_limits()
+
         limit: ComputeShader = ComputeShaderHandler().get('edge_limits')
-        self.set_uniform(limit, ['max_sample_points'])
-        self.point_count = 0
-        max_edge_samples: float = 0
+        reduction: ComputeShader = ComputeShaderHandler().get('edge_limits_reduction')
+        self.limit_buffer.clear()
+        self.limit_buffer.bind(3)
         for i in range(len(self.edge_buffer)):
             for j in range(len(self.edge_buffer[i])):
                 self.ssbo_handler[i][j].set()
-                limit.compute(self.get_edge_count(i, j), barrier=True)
-                if check_resize:
-                    limits: List[int] = np.frombuffer(
-                        self.edge_buffer[i][j].read(), dtype=np.float32)
-                    for samples in pairwise(limits, 28):
-                        self.point_count += samples
-                        if samples > max_edge_samples:
-                            max_edge_samples = samples
+                limit.compute(self.get_edge_count(i, j))
+                reduction.set_uniform_data(
+                    [('edge_count', self.get_edge_count(i, j), 'int')])
+                reduction.compute(math.ceil(self.get_edge_count(i, j) / 64.0))
+
+        # order the limit writes before the readback, the fence only tells when they are done
+        BufferSync().access([self.limit_buffer.handle],
+                            GL_BUFFER_UPDATE_BARRIER_BIT)
+        if self.limit_fence is not None:
+            delete_fence(self.limit_fence)
+        self.limit_fence = create_fence()
+
         if check_resize:
-            if max_edge_samples * 1.1 >= (self.max_sample_points - 1):
-                self.resize_sample_storage(int(max_edge_samples * 1.1))
+            self.fetch_limits(True)
+            if self.max_edge_samples * 1.1 >= (self.max_sample_points - 1):
+                self.resize_sample_storage(int(self.max_edge_samples * 1.1))
+
+    def fetch_limits(self, wait: bool = False) -> None:
+        if self.limit_fence is None:
+            return
+        if not wait_for_fence(self.limit_fence, wait):
+            return
+        delete_fence(self.limit_fence)
+        self.limit_fence = None
+
+        limits: np.array = np.frombuffer(
+            self.limit_buffer.read(view=True), dtype=np.uint32)
+        self.point_count = int(limits[0])
+        self.max_edge_samples = int(limits[1])
 
     @track_time
     def read_edges_from_buffer(self, layer: int, container: int) -> np.array:
@@ -241,7 +557,11 @@ class EdgeProcessor:
 
     @track_time
     def read_samples_from_buffer(self, layer: int, container: int) -> np.array:
-        return np.frombuffer(self.sample_buffer[layer][container].read(), dtype=np.float32)
+        # samples are stored compacted, the returned data uses a fixed stride of max_sample_points per edge
+        return expand_sample_data(np.frombuffer(self.sample_buffer[layer][container].read(view=True), dtype=np.float32),
+                                  np.frombuffer(self.sample_offset_buffer[layer][container].read(
+                                      view=True), dtype=np.uint32),
+                                  self.max_sample_points)
 
     @track_time
     def read_edges_from_all_buffer(self) -> List[List[np.array]]:
@@ -250,8 +570,8 @@ class EdgeProcessor:
 
     @track_time
     def read_samples_from_all_buffer(self) -> List[List[np.array]]:
-        return [[np.frombuffer(buffer.read(), dtype=np.float32) for buffer in layer_buffer] for layer_buffer in
-                self.sample_buffer]
+        return [[self.read_samples_from_buffer(i, j) for j in range(len(layer_buffer))] for i, layer_buffer in
+                enumerate(self.sample_buffer)]
 
     def get_buffer_points(self, layer: int, container: int) -> int:
         return int(self.sample_buffer[layer][container].size / 16.0)
@@ -268,6 +588,20 @@ class EdgeProcessor:
             return self.edge_count
 
     def delete(self) -> None:
+        self.delete_container()
+        if self.limit_fence is not None:
+            delete_fence(self.limit_fence)
+            self.limit_fence = None
+        self.limit_buffer.delete()
+        for capacity_buffer in self.capacity_buffer:
+            capacity_buffer.delete()
+        self.capacity_buffer = []
+        self.sample_total_buffer.delete()
+        self.sample_scratch_buffer.delete()
+        self.prefix_sum.delete()
+        self.edge_parameter.delete()
+
+    def delete_container(self) -> None:
         for sample_layer_buffer in self.sample_buffer:
             for sample_container_buffer in sample_layer_buffer:
                 sample_container_buffer.delete()
@@ -278,6 +612,11 @@ class EdgeProcessor:
                 edge_container_buffer.delete()
         self.edge_buffer = []
 
+        for sample_offset_layer_buffer in self.sample_offset_buffer:
+            for sample_offset_container_buffer in sample_offset_layer_buffer:
+                sample_offset_container_buffer.delete()
+        self.sample_offset_buffer = []
+
         for ssbo_layer_handler in self.ssbo_handler:
             for ssbo_container_handler in ssbo_layer_handler:
                 ssbo_container_handler.delete()
@@ -1,24 +1,40 @@
 import logging
 import math
-from typing import Any, Callable, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
-from OpenGL.GL import glFinish
+from OpenGL.GL import glFlush
 
 from models.grid import Grid
 from opengl_helper.buffer import OverflowingBufferObject
 from opengl_helper.compute_shader import ComputeShader
 from opengl_helper.compute_shader_handler import ComputeShaderHandler
-from opengl_helper.vertex_data_handler import OverflowingVertexDataHandler
+from opengl_helper.uniform_block import GRID_PARAMETER, UniformBlock
+from opengl_helper.vertex_data_handler import (OverflowingVertexDataHandler,
+                                               VertexDataHandler)
 from processing.advection_process import AdvectionProgress
+from processing.brick_grid import BrickGrid
+from processing.density_gather import DensityGather
 from processing.edge_processing import EdgeProcessor
 from processing.node_processing import NodeProcessor
 from utility.performance import track_time
 
+# coarser grid levels are used while the bandwidth still spans this many of their cells
+GRID_LEVEL_BANDWIDTH_CELLS: float = 4.0
+MAX_GRID_LEVELS: int = 5
+MIN_GRID_LEVEL_CELLS: int = 4
+
+
+def delete_container_ssbo_handler(ssbo_handler: Sequence[Sequence[VertexDataHandler]]) -> None:
+    for layer_ssbo_handler in ssbo_handler:
+        for container_ssbo_handler in layer_ssbo_handler:
+            container_ssbo_handler.delete()
+
 
 class GridProcessor:
     def __init__(self, grid: Grid, node_processor: NodeProcessor, edge_processor: EdgeProcessor,
-                 density_strength: float = 1000.0) -> None:
+                 density_strength: float = 1000.0, sparse_grid: bool = False, gather_density: bool = False,
+                 density_pyramid: bool = False, layer_slabs: bool = False) -> None:
         self.node_processor: NodeProcessor = node_processor
         self.edge_processor: EdgeProcessor = edge_processor
         self.grid: Grid = grid
@@ -33,6 +49,12 @@ class GridProcessor:
             'node_advect': 'grid/node_advect.comp',
             'sample_advect': 'grid/sample_advect.comp',
         }
+        if sparse_grid:
+            shader_settings.update({
+                'brick_mark': 'grid/brick_mark.comp',
+                'brick_density': 'grid/brick_density_map.comp',
+                'brick_advect': 'grid/brick_advect.comp',
+            })
         for shader_name, path in shader_settings.items():
             ComputeShaderHandler().create(shader_name, path)
 
@@ -65,193 +87,354 @@ class GridProcessor:
                                                                                     render_data_offset=[
                                                                                         0],
                                                                                     render_data_size=[1])
+        # the sparse grid keeps the edge densities in bricks, the dense buffers only hold the node density plane
+        self.brick_grid: Optional[BrickGrid] = BrickGrid(
+            grid, self.grid_density_buffer.object_size) if sparse_grid else None
+        dense_slice_count: int = grid.grid_cell_count[2] if self.brick_grid is None else 2
+
+        # every layer can keep its own density slab, so the layers do not wait for each other's clear and advection
+        self.layer_density_buffer: List[OverflowingBufferObject] = [
+            self.grid_density_buffer]
+        while layer_slabs and self.brick_grid is None and \
+                len(self.layer_density_buffer) < len(self.edge_processor.sample_buffer):
+            self.layer_density_buffer.append(OverflowingBufferObject(split_function_generation(grid),
+                                                                     object_size=12,
+                                                                     render_data_offset=[
+                                                                         0],
+                                                                     render_data_size=[1]))
+
+        # the dense grid can gather the edge densities from sorted samples instead of splatting them atomically
+        self.gather_density: bool = gather_density
+        self.density_gather: Optional[DensityGather] = DensityGather(
+            grid) if gather_density else None
+
+        # coarser levels double the cell size per level and reuse the dense buffers, the sparse grid has one level
+        self.grid_levels: List[Grid] = [grid]
+        while density_pyramid and self.brick_grid is None and len(self.grid_levels) < MAX_GRID_LEVELS:
+            coarse_grid: Grid = grid.coarsen(2 ** len(self.grid_levels))
+            if min(coarse_grid.grid_cell_count) < MIN_GRID_LEVEL_CELLS:
+                break
+            self.grid_levels.append(coarse_grid)
+        self.grid_level: int = 0
 
         self.position_ssbo_handler: OverflowingVertexDataHandler = OverflowingVertexDataHandler(
             [], [(self.grid_position_buffer, 0)])
         self.node_density_ssbo_handler: OverflowingVertexDataHandler = OverflowingVertexDataHandler(
             [(self.node_processor.node_buffer, 0)], [(self.grid_density_buffer, 2)])
-        self.sample_density_ssbo_handler: List[List[OverflowingVertexDataHandler]] = [[OverflowingVertexDataHandler(
-            [(self.edge_processor.sample_buffer[i][j], 0),
-             (self.edge_processor.edge_buffer[i][j], 2)],
-            [(self.grid_density_buffer, 3)]) for j in range(len(self.edge_processor.sample_buffer[i]))] for i in range(
-            len(self.edge_processor.sample_buffer))]
+        self.sample_density_ssbo_handler: List[List[OverflowingVertexDataHandler]
+                                               ] = self.create_sample_ssbo_handler()
+        self.brick_density_ssbo_handler: List[List[VertexDataHandler]
+                                              ] = self.create_brick_ssbo_handler()
         self.node_advect_ssbo_handler: OverflowingVertexDataHandler = OverflowingVertexDataHandler(
             [(self.node_processor.node_buffer, 0)], [(self.grid_density_buffer, 2)])
-        self.sample_advect_ssbo_handler: List[List[OverflowingVertexDataHandler]] = [[OverflowingVertexDataHandler(
-            [(self.edge_processor.sample_buffer[i][j], 0),
-             (self.edge_processor.edge_buffer[i][j], 2)],
-            [(self.grid_density_buffer, 3)]) for j in range(len(self.edge_processor.sample_buffer[i]))] for i in range(
-            len(self.edge_processor.sample_buffer))]
-        self.density_ssbo_handler: OverflowingVertexDataHandler = OverflowingVertexDataHandler(
-            [], [(self.grid_density_buffer, 0)])
+        self.sample_advect_ssbo_handler: List[List[OverflowingVertexDataHandler]
+                                              ] = self.create_sample_ssbo_handler()
+        self.brick_advect_ssbo_handler: List[List[VertexDataHandler]
+                                             ] = self.create_brick_ssbo_handler()
+        self.density_ssbo_handler: List[OverflowingVertexDataHandler] = [OverflowingVertexDataHandler(
+            [], [(density_buffer, 0)]) for density_buffer in self.layer_density_buffer]
 
         self.density_strength: float = density_strength
 
-        self.grid_position_buffer.load_empty(np.float32, self.grid_slice_size * grid.grid_cell_count[2],
+        self.grid_position_buffer.load_empty(np.float32, self.grid_slice_size * dense_slice_count,
                                              self.grid_slice_size)
-        self.grid_density_buffer.load_empty(np.int32, self.grid_slice_size * grid.grid_cell_count[2],
-                                            self.grid_slice_size)
+        for density_buffer in self.layer_density_buffer:
+            density_buffer.load_empty(
+                np.int32, self.grid_slice_size * dense_slice_count, self.grid_slice_size)
 
         self.position_buffer_slice_count: int = math.floor(
             self.grid_position_buffer.size[0] / (self.grid_position_buffer.object_size * 4 * self.grid_slice_size)) - 1
         self.density_buffer_slice_count: int = math.floor(
             self.grid_density_buffer.size[0] / (self.grid_density_buffer.object_size * 4 * self.grid_slice_size)) - 1
 
+        # static grid parameter shared by all grid shaders, only uploaded again if they change
+        self.grid_parameter: UniformBlock = UniformBlock(
+            'grid_parameter', GRID_PARAMETER)
+        self.set_grid_parameter()
+
     def set_new_edge_processor(self, edge_processor: EdgeProcessor) -> None:
         self.edge_processor = edge_processor
+        self.set_grid_parameter()
+
+        delete_container_ssbo_handler(self.sample_density_ssbo_handler)
+        self.sample_density_ssbo_handler = self.create_sample_ssbo_handler()
+        delete_container_ssbo_handler(self.brick_density_ssbo_handler)
+        self.brick_density_ssbo_handler = self.create_brick_ssbo_handler()
+
+        delete_container_ssbo_handler(self.sample_advect_ssbo_handler)
+        self.sample_advect_ssbo_handler = self.create_sample_ssbo_handler()
+        delete_container_ssbo_handler(self.brick_advect_ssbo_handler)
+        self.brick_advect_ssbo_handler = self.create_brick_ssbo_handler()
+
+    def get_sample_data(self, layer: int, container: int) -> List[Tuple[Any, int]]:
+        # the node buffer also binds its swap buffer to 7, so the offsets have to be bound after it
+        return [(self.edge_processor.sample_buffer[layer][container], 0),
+                (self.edge_processor.edge_buffer[layer][container], 2),
+                (self.node_processor.node_buffer, 6),
+                (self.edge_processor.sample_offset_buffer[layer][container], 7)]
+
+    def create_sample_ssbo_handler(self) -> List[List[OverflowingVertexDataHandler]]:
+        if self.brick_grid is not None:
+            return []
+        return [[OverflowingVertexDataHandler(self.get_sample_data(i, j), [(self.get_density_buffer(i), 3)])
+                 for j in range(len(self.edge_processor.sample_buffer[i]))]
+                for i in range(len(self.edge_processor.sample_buffer))]
+
+    def create_brick_ssbo_handler(self) -> List[List[VertexDataHandler]]:
+        if self.brick_grid is None:
+            return []
+        brick_data: List[Tuple[Any, int]] = [(self.brick_grid.page_table_buffer, 3),
+                                             (self.brick_grid.brick_pool_buffer, 4)]
+        return [[VertexDataHandler(self.get_sample_data(i, j) + brick_data)
+                 for j in range(len(self.edge_processor.sample_buffer[i]))]
+                for i in range(len(self.edge_processor.sample_buffer))]
+
+    def has_layer_slabs(self) -> bool:
+        return len(self.layer_density_buffer) > 1
+
+    def get_density_buffer(self, layer: int) -> OverflowingBufferObject:
+        return self.layer_density_buffer[layer] if self.has_layer_slabs() else self.grid_density_buffer
+
+    def get_level_grid(self) -> Grid:
+        return self.grid_levels[self.grid_level]
+
+    def get_level_slice_count(self) -> int:
+        if self.grid_level == 0:
+            return self.position_buffer_slice_count
+        level_grid: Grid = self.get_level_grid()
+        level_slice_size: int = level_grid.grid_cell_count[0] * \
+            level_grid.grid_cell_count[1]
+        return math.floor(
+            self.grid_position_buffer.size[0] / (self.grid_position_buffer.object_size * 4 * level_slice_size)) - 1
 
-        for layer_ssbo_handler in self.sample_density_ssbo_handler:
-            for container_ssbo_handler in layer_ssbo_handler:
-                container_ssbo_handler.delete()
-        self.sample_density_ssbo_handler = [[OverflowingVertexDataHandler(
-            [(self.edge_processor.sample_buffer[i][j], 0),
-             (self.edge_processor.edge_buffer[i][j], 2)],
-            [(self.grid_density_buffer, 3)]) for j in range(len(self.edge_processor.sample_buffer[i]))] for i in range(
-            len(self.edge_processor.sample_buffer))]
-
-        for layer_ssbo_handler in self.sample_advect_ssbo_handler:
-            for container_ssbo_handler in layer_ssbo_handler:
-                container_ssbo_handler.delete()
-        self.sample_advect_ssbo_handler = [[OverflowingVertexDataHandler(
-            [(self.edge_processor.sample_buffer[i][j], 0),
-             (self.edge_processor.edge_buffer[i][j], 2)],
-            [(self.grid_density_buffer, 3)]) for j in range(len(self.edge_processor.sample_buffer[i]))] for i in range(
-            len(self.edge_processor.sample_buffer))]
-
-    def set_uniform(self, compute_shader: ComputeShader, uniforms: List[str]) -> None:
-        uniform_data: List[Tuple[str, Any, Any]] = []
-        if 'slice_size' in uniforms:
-            uniform_data.append(('slice_size', self.grid_slice_size, 'int'))
-        if 'slice_count' in uniforms:
-            uniform_data.append(
-                ('slice_count', self.position_buffer_slice_count, 'int'))
-        if 'grid_cell_size' in uniforms:
-            uniform_data.append(
-                ('grid_cell_size', self.grid.grid_cell_size, 'vec3'))
-        if 'grid_bounding_min' in uniforms:
-            uniform_data.append(
-                ('grid_bounding_min', self.grid.bounding_volume[0], 'vec3'))
-        if 'grid_bounding_max' in uniforms:
-            uniform_data.append(
-                ('grid_bounding_max', self.grid.bounding_volume[1], 'vec3'))
-        if 'grid_cell_count' in uniforms:
-            uniform_data.append(
-                ('grid_cell_count', self.grid.grid_cell_count, 'ivec3'))
-        if 'density_strength' in uniforms:
-            uniform_data.append(
-                ('density_strength', self.density_strength, 'float'))
-        if 'max_sample_points' in uniforms:
-            uniform_data.append(
-                ('max_sample_points', self.edge_processor.max_sample_points, 'int'))
-        if 'edge_importance_type' in uniforms:
-            uniform_data.append(
-                ('edge_importance_type', self.edge_processor.edge_importance_type, 'int'))
-        compute_shader.set_uniform_data(uniform_data)
+    def get_level_objects(self, buffer_id: int) -> int:
+        # coarser levels only cover the start of the density buffers
+        if self.grid_level == 0:
+            return self.grid_density_buffer.get_objects(buffer_id)
+        level_grid: Grid = self.get_level_grid()
+        level_slice_count: int = self.get_level_slice_count()
+        buffer_slices: int = min(max(level_grid.grid_cell_count[2] - buffer_id * level_slice_count, 0),
+                                 level_slice_count + 1)
+        return min(buffer_slices * level_grid.grid_cell_count[0] * level_grid.grid_cell_count[1],
+                   self.grid_density_buffer.get_objects(buffer_id))
+
+    def set_grid_level(self, level: int) -> None:
+        if level != self.grid_level:
+            self.grid_level = level
+            self.set_grid_parameter()
+
+    def select_grid_level(self, bandwidth: float) -> None:
+        # the coarsest level that still resolves the bandwidth, only the last iterations use the full grid
+        level: int = 0
+        while level + 1 < len(self.grid_levels) and \
+                bandwidth >= self.grid_levels[level + 1].grid_cell_size.x * GRID_LEVEL_BANDWIDTH_CELLS:
+            level += 1
+        self.set_grid_level(level)
+
+    def set_grid_parameter(self) -> None:
+        level_grid: Grid = self.get_level_grid()
+        self.grid_parameter.set_data([('grid_cell_count', level_grid.grid_cell_count),
+                                      ('slice_size',
+                                       level_grid.grid_cell_count[0] * level_grid.grid_cell_count[1]),
+                                      ('grid_cell_size', level_grid.grid_cell_size),
+                                      ('slice_count', self.get_level_slice_count()),
+                                      ('grid_bounding_min',
+                                       self.grid.bounding_volume[0]),
+                                      ('density_strength', self.density_strength),
+                                      ('grid_bounding_max',
+                                       self.grid.bounding_volume[1]),
+                                      ('edge_importance_type', self.edge_processor.edge_importance_type)])
 
     @track_time
-    def clear_buffer(self) -> None:
+    def clear_buffer(self, layer: int = 0) -> None:
+        # only the density slab of the layer is cleared
         clear: ComputeShader = ComputeShaderHandler().get('clear_grid')
+        density_ssbo_handler: OverflowingVertexDataHandler = self.density_ssbo_handler[
+            layer if self.has_layer_slabs() else 0]
         for i in range(len(self.grid_density_buffer.handle)):
-            self.density_ssbo_handler.set_buffer(i)
-            self.density_ssbo_handler.set()
-            clear.compute(self.grid_density_buffer.get_objects(i))
-        clear.barrier()
+            if self.get_level_objects(i) == 0:
+                continue
+            density_ssbo_handler.set_buffer(i)
+            density_ssbo_handler.set()
+            clear.compute(self.get_level_objects(i))
+        if self.brick_grid is not None:
+            self.brick_grid.clear()
 
     @track_time
     def calculate_position(self) -> None:
         logging.info('Calculate grid positions.')
         position: ComputeShader = ComputeShaderHandler().get('grid_position')
-        self.set_uniform(position,
-                         ['slice_size', 'slice_count', 'grid_cell_size', 'grid_bounding_min', 'grid_cell_count'])
+        self.grid_parameter.bind()
         for i in range(len(self.grid_position_buffer.handle)):
             self.position_ssbo_handler.set_buffer(i)
             self.position_ssbo_handler.set()
             position.set_uniform_data([('current_buffer', i, 'int')])
             position.compute(self.grid_position_buffer.get_objects(i))
-        position.barrier()
 
     @track_time
     def calculate_node_density(self, advection_status: AdvectionProgress) -> None:
         self.node_density_ssbo_handler.set_buffer(0)
         self.node_density_ssbo_handler.set()
         density: ComputeShader = ComputeShaderHandler().get('node_density')
-        self.set_uniform(density, [
-                         'density_strength', 'grid_cell_size', 'grid_bounding_min', 'grid_cell_count'])
+        self.grid_parameter.bind()
         density.set_uniform_data(
             [('bandwidth', advection_status.current_bandwidth, 'float')])
-        density.compute(len(self.node_processor.nodes))
-        density.barrier()
+        density.compute(self.node_processor.get_buffer_points())
 
     @track_time
     def calculate_edge_density(self, layer: int, advection_status: AdvectionProgress, wait_for_compute: bool = False) -> None:
+        if self.brick_grid is not None:
+            self.calculate_edge_brick_density(
+                layer, self.brick_grid, advection_status, wait_for_compute)
+            return
+        if self.gather_density:
+            self.calculate_edge_gather_density(
+                layer, advection_status, wait_for_compute)
+            return
+
         density: ComputeShader = ComputeShaderHandler().get('sample_density')
-        self.set_uniform(density, ['max_sample_points', 'slice_size', 'slice_count', 'density_strength',
-                                   'grid_cell_size', 'grid_bounding_min', 'grid_cell_count', 'edge_importance_type'])
-        density.set_uniform_data(
-            [('bandwidth', advection_status.current_bandwidth, 'float')])
+        self.grid_parameter.bind()
+        density.set_uniform_data([('bandwidth', advection_status.current_bandwidth, 'float'),
+                                  ('grid_layer_offset', self.grid.layer_distance * layer, 'float')])
         for i in range(len(self.grid_density_buffer.handle)):
+            if self.get_level_objects(i) == 0:
+                continue
             density.set_uniform_data([('current_buffer', i, 'int')])
             for container in range(len(self.edge_processor.sample_buffer[layer])):
-                density.set_uniform_data(
-                    [('grid_layer_offset', self.grid.layer_distance * layer, 'float')])
                 self.sample_density_ssbo_handler[layer][container].set_buffer(
                     i - 1)
                 self.sample_density_ssbo_handler[layer][container].set_range(3)
                 density.compute(
                     self.edge_processor.get_buffer_points(layer, container))
                 if wait_for_compute:
-                    glFinish()
-        density.barrier()
+                    glFlush()
+
+    def calculate_edge_gather_density(self, layer: int, advection_status: AdvectionProgress,
+                                      wait_for_compute: bool = False) -> None:
+        if self.density_gather is None:
+            self.density_gather = DensityGather(self.grid)
+        self.grid_parameter.bind()
+        uniform_data: List[Tuple[str, Any, str]] = [
+            ('bandwidth', advection_status.current_bandwidth, 'float'),
+            ('grid_layer_offset', self.grid.layer_distance * layer, 'float')]
+        for container in range(len(self.edge_processor.sample_buffer[layer])):
+            self.sample_density_ssbo_handler[layer][container].set_buffer(0)
+            self.density_gather.sort(self.sample_density_ssbo_handler[layer][container],
+                                     self.edge_processor.get_buffer_points(
+                                         layer, container),
+                                     self.get_level_grid().grid_cell_count_overall, uniform_data)
+            self.density_gather.gather(
+                self.get_density_buffer(layer), uniform_data)
+            if wait_for_compute:
+                glFlush()
+
+    def calculate_edge_brick_density(self, layer: int, brick_grid: BrickGrid, advection_status: AdvectionProgress,
+                                     wait_for_compute: bool = False) -> None:
+        # bricks touched by any sample of the layer are allocated before the densities are added to them
+        self.grid_parameter.bind()
+        uniform_data: List[Tuple[str, Any, str]] = [
+            ('bandwidth', advection_status.current_bandwidth, 'float'),
+            ('grid_layer_offset', self.grid.layer_distance * layer, 'float')]
+        self.mark_bricks(layer, brick_grid, uniform_data)
+        if not brick_grid.allocate():
+            # the pool grew, the bricks of the layer are requested and allocated again
+            brick_grid.clear()
+            self.mark_bricks(layer, brick_grid, uniform_data)
+            brick_grid.allocate()
+
+        density: ComputeShader = ComputeShaderHandler().get('brick_density')
+        density.set_uniform_data(uniform_data + brick_grid.get_uniform_data())
+        for container in range(len(self.edge_processor.sample_buffer[layer])):
+            self.brick_density_ssbo_handler[layer][container].set()
+            density.compute(
+                self.edge_processor.get_buffer_points(layer, container))
+            if wait_for_compute:
+                glFlush()
+
+    def mark_bricks(self, layer: int, brick_grid: BrickGrid, uniform_data: List[Tuple[str, Any, str]]) -> None:
+        mark: ComputeShader = ComputeShaderHandler().get('brick_mark')
+        mark.set_uniform_data(uniform_data + brick_grid.get_uniform_data())
+        for container in range(len(self.edge_processor.sample_buffer[layer])):
+            self.brick_density_ssbo_handler[layer][container].set()
+            mark.compute(
+                self.edge_processor.get_buffer_points(layer, container))
 
     @track_time
     def node_advect(self, advection_status: AdvectionProgress) -> None:
         self.node_advect_ssbo_handler.set_buffer(0)
         self.node_advect_ssbo_handler.set()
         advect: ComputeShader = ComputeShaderHandler().get('node_advect')
-        self.set_uniform(advect, [
-                         'grid_cell_size', 'grid_bounding_min', 'grid_bounding_max', 'grid_cell_count'])
+        self.grid_parameter.bind()
         advect.set_uniform_data([
             ('advect_strength', advection_status.get_advection_strength(), 'float'),
             ('importance_similarity', advection_status.importance_similarity, 'float')
         ])
         advect.compute(self.node_processor.get_buffer_points())
-        advect.barrier()
         self.node_processor.node_buffer.swap()
 
     @track_time
     def sample_advect(self, layer: int, advection_status: AdvectionProgress, wait_for_compute: bool = False) -> None:
+        if self.brick_grid is not None:
+            self.sample_brick_advect(
+                layer, self.brick_grid, advection_status, wait_for_compute)
+            return
+
         advect: ComputeShader = ComputeShaderHandler().get('sample_advect')
-        self.set_uniform(advect, ['max_sample_points', 'slice_size', 'slice_count', 'grid_cell_size',
-                                  'grid_bounding_min', 'grid_cell_count', 'edge_importance_type'])
+        self.grid_parameter.bind()
         advect.set_uniform_data([
             ('advect_strength', advection_status.get_advection_strength(), 'float'),
-            ('importance_similarity', advection_status.importance_similarity, 'float')
+            ('importance_similarity', advection_status.importance_similarity, 'float'),
+            ('grid_layer_offset', self.grid.layer_distance * layer, 'float')
         ])
         for i in range(len(self.grid_density_buffer.handle)):
+            if self.get_level_objects(i) == 0:
+                continue
             advect.set_uniform_data([('current_buffer', i, 'int')])
             for container in range(len(self.edge_processor.sample_buffer[layer])):
-                advect.set_uniform_data(
-                    [('grid_layer_offset', self.grid.layer_distance * layer, 'float')])
                 self.sample_advect_ssbo_handler[layer][container].set_buffer(i)
                 self.sample_advect_ssbo_handler[layer][container].set()
                 advect.compute(
                     self.edge_processor.get_buffer_points(layer, container))
                 self.edge_processor.sample_buffer[layer][container].swap()
                 if wait_for_compute:
-                    glFinish()
-        advect.barrier()
+                    glFlush()
+
+    def sample_brick_advect(self, layer: int, brick_grid: BrickGrid, advection_status: AdvectionProgress,
+                            wait_for_compute: bool = False) -> None:
+        advect: ComputeShader = ComputeShaderHandler().get('brick_advect')
+        self.grid_parameter.bind()
+        advect.set_uniform_data([
+            ('advect_strength', advection_status.get_advection_strength(), 'float'),
+            ('importance_similarity', advection_status.importance_similarity, 'float'),
+            ('grid_layer_offset', self.grid.layer_distance * layer, 'float')
+        ] + brick_grid.get_uniform_data())
+        for container in range(len(self.edge_processor.sample_buffer[layer])):
+            self.brick_advect_ssbo_handler[layer][container].set()
+            advect.compute(
+                self.edge_processor.get_buffer_points(layer, container))
+            self.edge_processor.sample_buffer[layer][container].swap()
+            if wait_for_compute:
+                glFlush()
 
     def delete(self) -> None:
         self.grid_position_buffer.delete()
-        self.grid_density_buffer.delete()
+        for density_buffer in self.layer_density_buffer:
+            density_buffer.delete()
         self.position_ssbo_handler.delete()
         self.node_density_ssbo_handler.delete()
-        for layer_ssbo_handler in self.sample_density_ssbo_handler:
-            for container_ssbo_handler in layer_ssbo_handler:
-                container_ssbo_handler.delete()
+        delete_container_ssbo_handler(self.sample_density_ssbo_handler)
         self.sample_density_ssbo_handler = []
-        self.density_ssbo_handler.delete()
-        for layer_ssbo_handler in self.sample_advect_ssbo_handler:
-            for container_ssbo_handler in layer_ssbo_handler:
-                container_ssbo_handler.delete()
+        delete_container_ssbo_handler(self.brick_density_ssbo_handler)
+        self.brick_density_ssbo_handler = []
+        for density_ssbo_handler in self.density_ssbo_handler:
+            density_ssbo_handler.delete()
+        self.density_ssbo_handler = []
+        delete_container_ssbo_handler(self.sample_advect_ssbo_handler)
         self.sample_advect_ssbo_handler = []
+        delete_container_ssbo_handler(self.brick_advect_ssbo_handler)
+        self.brick_advect_ssbo_handler = []
+        self.grid_parameter.delete()
+        if self.brick_grid is not None:
+            self.brick_grid.delete()
+        if self.density_gather is not None:
+            self.density_gather.delete()
@@ -3,18 +3,19 @@ from enum import IntEnum
 from typing import List, Optional
 
 import numpy as np
-from OpenGL.GL import glFinish
+from OpenGL.GL import glFlush
 from progressbar import ProgressBar
 from pyrr import Vector3
 
 from data.data_handler import ImportanceDataHandler, ProcessedNNHandler
 from models.grid import Grid
 from models.network import NetworkModel
+from models.node import NodeLayout
 from opengl_helper.compute_shader_handler import ComputeShaderHandler
 from opengl_helper.render_utility import clear_screen
 from opengl_helper.shader_handler import RenderShaderHandler
 from processing.advection_process import AdvectionProgress
-from processing.edge_processing import EdgeProcessor
+from processing.edge_processing import EdgeProcessor, SmoothingKernel
 from processing.grid_processing import GridProcessor
 from processing.node_processing import NodeProcessor
 from processing.processing_config import ProcessingConfig
@@ -48,7 +49,9 @@ class NetworkProcessor:
 
         logging.info('Create network model...')
         self.network: NetworkModel = NetworkModel(self.layer_nodes, self.layer_width, self.layer_distance,
-                                                  importance_data, processed_nn, processing_config['prune_percentage'])
+                                                  importance_data, processed_nn, processing_config[
+                                                      'prune_percentage'],
+                                                  node_layout=NodeLayout(processing_config['node_layout']))
         self.sample_length: float = self.network.layer_width / \
             processing_config['sampling_rate']
         self.grid_cell_size: float = self.sample_length / 3.0
@@ -70,22 +73,30 @@ class NetworkProcessor:
                                self.network.bounding_volume, self.layer_distance)
 
         logging.info('Prepare node processing...')
-        self.node_processor: NodeProcessor = NodeProcessor(self.network)
+        self.node_processor: NodeProcessor = NodeProcessor(
+            self.network, processing_config['mapped_buffer'])
         self.node_renderer: NodeRenderer = NodeRenderer(
             self.node_processor, self.grid)
 
         logging.info('Prepare edge processing...')
         self.edge_processor: EdgeProcessor = EdgeProcessor(self.sample_length,
-                                                           edge_importance_type=self.edge_importance_type)
+                                                           edge_importance_type=self.edge_importance_type,
+                                                           mapped_buffer=processing_config['mapped_buffer'],
+                                                           layer_containers=processing_config['layer_containers'],
+                                                           smoothing_kernel=SmoothingKernel(
+                                                               processing_config['smoothing_kernel']),
+                                                           parallel_resampling=processing_config['parallel_resampling'])
         self.edge_processor.set_data(self.network)
         if not self.edge_processor.sampled:
             self.edge_processor.init_sample_edge()
         self.edge_renderer: EdgeRenderer = EdgeRenderer(
-            self.edge_processor, self.grid)
+            self.edge_processor, self.node_processor, self.grid)
 
         logging.info('Prepare grid processing...')
         self.grid_processor: GridProcessor = GridProcessor(
-            self.grid, self.node_processor, self.edge_processor, 10000.0)
+            self.grid, self.node_processor, self.edge_processor, 10000.0,
+            sparse_grid=processing_config['sparse_grid'], gather_density=processing_config['gather_density'],
+            density_pyramid=processing_config['density_pyramid'], layer_slabs=processing_config['layer_slabs'])
         self.grid_processor.calculate_position()
         self.grid_renderer: GridRenderer = GridRenderer(self.grid_processor)
 
@@ -97,22 +108,24 @@ class NetworkProcessor:
         self.bar: Optional[ProgressBar] = None
 
     def reset_edges(self) -> None:
-        self.edge_processor.delete()
-        self.edge_renderer.delete()
-
         self.node_processor.read_nodes_from_buffer()
-        self.network.set_nodes(self.node_processor.nodes)
-        self.edge_processor = EdgeProcessor(
-            self.sample_length, edge_importance_type=self.edge_importance_type)
-        self.edge_processor.set_data(self.network)
-        self.edge_processor.init_sample_edge()
-        self.edge_renderer = EdgeRenderer(self.edge_processor, self.grid)
+        self.network.set_nodes(self.node_processor.node_data)
+        self.edge_processor.update_edge_positions(
+            self.network, self.node_processor.node_buffer)
+        self.update_edge_handler()
 
-        self.grid_processor.set_new_edge_processor(self.edge_processor)
         self.node_advection_status.reset()
         self.edge_advection_status.reset()
         self.edge_processor.check_limits()
 
+    def update_edge_handler(self) -> None:
+        if self.edge_processor.buffer_layout_changed:
+            self.edge_renderer.delete()
+            self.edge_renderer = EdgeRenderer(
+                self.edge_processor, self.node_processor, self.grid)
+            self.grid_processor.set_new_edge_processor(self.edge_processor)
+            self.edge_processor.buffer_layout_changed = False
+
     def process(self, action_mode: NetworkProcess) -> None:
         if self.last_action_mode is not action_mode:
             if action_mode == NetworkProcess.RESET:
@@ -145,25 +158,22 @@ class NetworkProcessor:
 
             if action_mode >= NetworkProcess.EDGE_ADVECT:
                 if self.edge_smoothing:
-                    for i in range(self.edge_smoothing_iterations):
-                        glFinish()
-                        self.edge_processor.sample_smooth(
-                            self.edge_advection_status, True)
-                        glFinish()
+                    self.edge_processor.sample_smooth(
+                        self.edge_advection_status, True, self.edge_smoothing_iterations)
         else:
             self.edge_processor.check_limits()
 
+        self.update_edge_handler()
         self.last_action_mode = action_mode
-        glFinish()
+        # submit the frame's compute work, the cpu only waits where results are read back
+        glFlush()
 
     def smooth_edges(self) -> None:
-        glFinish()
         self.edge_processor.sample_smooth(self.edge_advection_status, True)
-        glFinish()
 
     def node_advection(self, reverse: bool = False) -> None:
         if self.bar is None:
-            logging.info(f'Advect {len(self.node_processor.nodes)} nodes')
+            logging.info(f'Advect {self.node_processor.node_count} nodes')
             self.bar = ProgressBar(
                 max_value=self.node_advection_status.get_max_iterations())
             self.bar.start()
@@ -199,12 +209,26 @@ class NetworkProcessor:
         else:
             self.edge_advection_status.advection_direction = 1.0
 
-        for layer in range(len(self.network.layer) - 1):
-            self.grid_processor.clear_buffer()
-            self.grid_processor.calculate_edge_density(
-                layer, self.edge_advection_status, True)
-            self.grid_processor.sample_advect(
-                layer, self.edge_advection_status, True)
+        # early iterations with a wide bandwidth run on a coarser grid
+        self.grid_processor.select_grid_level(
+            self.edge_advection_status.current_bandwidth)
+        if self.grid_processor.has_layer_slabs():
+            # every layer splats into its own slab, so all densities are done before the first sample moves
+            for layer in range(len(self.network.layer) - 1):
+                self.grid_processor.clear_buffer(layer)
+                self.grid_processor.calculate_edge_density(
+                    layer, self.edge_advection_status, True)
+            for layer in range(len(self.network.layer) - 1):
+                self.grid_processor.sample_advect(
+                    layer, self.edge_advection_status, True)
+        else:
+            for layer in range(len(self.network.layer) - 1):
+                self.grid_processor.clear_buffer()
+                self.grid_processor.calculate_edge_density(
+                    layer, self.edge_advection_status, True)
+                self.grid_processor.sample_advect(
+                    layer, self.edge_advection_status, True)
+        self.grid_processor.set_grid_level(0)
 
         self.edge_advection_status.iterate()
         self.bar.update(self.edge_advection_status.iteration)
@@ -248,7 +272,7 @@ class NetworkProcessor:
     def save_model(self, file_path: str) -> None:
         layer_data: List[int] = self.network.layer
         logging.info('Reading nodes from buffer...')
-        node_data: List[float] = self.node_processor.read_nodes_from_buffer(
+        node_data: np.array = self.node_processor.read_nodes_from_buffer(
             raw=True)
         logging.info('Reading edges from buffer...')
         edge_data: List[List[np.array]
@@ -271,5 +295,5 @@ class NetworkProcessor:
 
     def get_node_mid(self) -> Vector3:
         self.node_processor.read_nodes_from_buffer()
-        self.network.set_nodes(self.node_processor.nodes)
+        self.network.set_nodes(self.node_processor.node_data)
         return self.network.get_node_mid()
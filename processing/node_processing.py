@@ -1,12 +1,9 @@
-from typing import List
-
 import numpy as np
-from pyrr import Vector3
 
 from definitions import ADDITIONAL_NODE_BUFFER_DATA
 from models.network import NetworkModel
-from models.node import Node
-from opengl_helper.buffer import SwappingBufferObject, get_buffer_settings
+from opengl_helper.buffer import (MappedSwappingBufferObject,
+                                  SwappingBufferObject, get_buffer_settings)
 from opengl_helper.compute_shader import ComputeShader
 from opengl_helper.compute_shader_handler import ComputeShaderHandler
 from opengl_helper.vertex_data_handler import VertexDataHandler
@@ -14,19 +11,24 @@ from utility.performance import track_time
 
 
 class NodeProcessor:
-    def __init__(self, network: NetworkModel) -> None:
+    def __init__(self, network: NetworkModel, mapped_buffer: bool = False) -> None:
         ComputeShaderHandler().create('node_noise', 'node/node_noise.comp')
 
         object_size, render_data_offset, render_data_size = \
             get_buffer_settings(network.num_classes,
                                 ADDITIONAL_NODE_BUFFER_DATA)
-        self.node_buffer: SwappingBufferObject = SwappingBufferObject(ssbo=True, object_size=object_size,
-                                                                      render_data_offset=render_data_offset,
-                                                                      render_data_size=render_data_size)
+        if mapped_buffer:
+            self.node_buffer: SwappingBufferObject = MappedSwappingBufferObject(
+                object_size=object_size, render_data_offset=render_data_offset, render_data_size=render_data_size)
+        else:
+            self.node_buffer = SwappingBufferObject(ssbo=True, object_size=object_size,
+                                                    render_data_offset=render_data_offset,
+                                                    render_data_size=render_data_size)
         self.ssbo_handler: VertexDataHandler = VertexDataHandler(
             [(self.node_buffer, 0)])
 
-        self.nodes: List[Node] = network.get_nodes()
+        self.node_data: np.array = network.get_nodes()
+        self.node_count: int = self.node_data.shape[0]
 
         self.point_count: int = 0
         self.nearest_view_z: int = -1000000
@@ -39,10 +41,8 @@ class NodeProcessor:
         self.set_data()
 
     def set_data(self) -> None:
-        initial_data: List[float] = []
-        for node in self.nodes:
-            initial_data.extend(node.data)
-        transfer_data = np.array(initial_data, dtype=np.float32)
+        transfer_data: np.array = np.ascontiguousarray(
+            self.node_data, dtype=np.float32)
         self.node_buffer.load(transfer_data)
         self.node_buffer.swap()
         self.node_buffer.load(transfer_data)
@@ -53,27 +53,24 @@ class NodeProcessor:
         noise.set_uniform_data(
             [('noise_strength', strength, 'float'), ('sample_length', sample_length, 'float')])
         self.ssbo_handler.set()
-        noise.compute(len(self.nodes), barrier=True)
+        noise.compute(self.node_count)
         self.node_buffer.swap()
 
     @track_time
-    def read_nodes_from_buffer(self, raw: bool = False) -> List[float]:
-        buffer_data = np.frombuffer(self.node_buffer.read(), dtype=np.float32)
+    def read_nodes_from_buffer(self, raw: bool = False) -> np.array:
+        buffer_data: np.array = np.frombuffer(
+            self.node_buffer.read(view=not raw), dtype=np.float32)
         if raw:
             return buffer_data
 
-        node_data = buffer_data.reshape(
-            (len(self.nodes), self.node_buffer.object_size))
-        node_count = len(self.nodes)
-        for i in range(node_count):
-            self.nodes[i].reset_position(
-                Vector3([node_data[i][0], node_data[i][1], node_data[i][2]]))
+        self.node_data[:, 0:3] = buffer_data.reshape(
+            (self.node_count, self.node_buffer.object_size))[:, 0:3]
 
         return buffer_data
 
     @track_time
     def get_buffer_points(self) -> int:
-        return len(self.nodes)
+        return self.node_count
 
     def delete(self) -> None:
         self.node_buffer.delete()
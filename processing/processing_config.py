@@ -24,7 +24,9 @@ class ProcessingConfig(BaseConfig):
                                'Node bandwidth reduction', 'float', 0.95),
                               ('edge_bandwidth_reduction',
                                'Edge bandwidth reduction', 'float', 0.90),
-                              ('edge_importance_type', 'Edge importance type', 'int', 0)])
+                              ('edge_importance_type',
+                               'Edge importance type', 'int', 0),
+                              ('node_layout', 'Node layout', 'int', 0)])
 
         for key, label, valueType, value in setting_items:
             self.label[key] = label
@@ -33,7 +35,15 @@ class ProcessingConfig(BaseConfig):
 
         phase_setting_items: List[Tuple[str, Any]] = []
         phase_setting_items.extend([('smoothing', True),
-                                    ('smoothing_iterations', 8)])
+                                    ('smoothing_kernel', 0),
+                                    ('smoothing_iterations', 8),
+                                    ('parallel_resampling', False),
+                                    ('mapped_buffer', False),
+                                    ('layer_containers', False),
+                                    ('sparse_grid', False),
+                                    ('gather_density', False),
+                                    ('density_pyramid', False),
+                                    ('layer_slabs', False)])
 
         for key, value in phase_setting_items:
             self.setdefault(key, value)
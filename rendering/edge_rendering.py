@@ -7,9 +7,11 @@ from opengl_helper.data_set import BaseRenderSet, LayeredRenderSet
 from opengl_helper.render_utility import (OGLRenderFunction,
                                           generate_render_function)
 from opengl_helper.shader import ShaderSetting
+from opengl_helper.shader_handler import RenderShaderHandler
 from opengl_helper.vertex_data_handler import (LayeredVertexDataHandler,
                                                VertexDataHandler)
 from processing.edge_processing import EdgeProcessor
+from processing.node_processing import NodeProcessor
 from rendering.renderer import Renderer
 from rendering.rendering_config import RenderingConfig
 from utility.camera import BaseCamera
@@ -17,9 +19,10 @@ from utility.performance import track_time
 
 
 class EdgeRenderer(Renderer):
-    def __init__(self, edge_processor: EdgeProcessor, grid: Grid) -> None:
+    def __init__(self, edge_processor: EdgeProcessor, node_processor: NodeProcessor, grid: Grid) -> None:
         Renderer.__init__(self)
         self.edge_processor = edge_processor
+        self.node_processor = node_processor
         self.grid = grid
 
         shader_settings: List[ShaderSetting] = []
@@ -47,8 +50,10 @@ class EdgeRenderer(Renderer):
              ])
         self.set_shader(shader_settings)
 
+        # edge records are looked up through the sample offsets, only the samples are vertex attributes
         self.data_handler: LayeredVertexDataHandler = LayeredVertexDataHandler([[VertexDataHandler(
-            [(self.edge_processor.sample_buffer[i][j], 0), (self.edge_processor.edge_buffer[i][j], 2)], []) for j in
+            [(self.edge_processor.sample_buffer[i][j], 0)], [],
+            [(self.edge_processor.edge_buffer[i][j], 2), (self.edge_processor.sample_offset_buffer[i][j], 7)]) for j in
             range(len(self.edge_processor.sample_buffer[i]))] for i in range(len(self.edge_processor.sample_buffer))])
 
         def generate_element_count_func(ep: EdgeProcessor) -> Callable:
@@ -88,16 +93,13 @@ class EdgeRenderer(Renderer):
     def render(self, set_name: str, cam: BaseCamera, config: RenderingConfig, show_class: int = 0) -> None:
         current_set: BaseRenderSet = self.sets[set_name]
         if isinstance(current_set, LayeredRenderSet):
-            current_set.set_buffer_divisor(
-                [(0, 1), (1, self.edge_processor.max_sample_points)])
+            current_set.set_buffer_divisor([(0, 1)])
         near: float = 0.0
         far: float = 0.0
         if set_name == 'sample_ellipsoid_transparent' or set_name == 'sample_transparent_sphere':
             near, far = self.grid.get_near_far_from_view(cam.view)
-        current_set.set_uniform_data([('projection', cam.projection, 'mat4'),
-                                      ('view', cam.view, 'mat4'),
-                                      ('scale', cam.object_scale, 'float'),
-                                      ('farthest_point_view_z', far, 'float'),
+        RenderShaderHandler().set_camera(cam)
+        current_set.set_uniform_data([('farthest_point_view_z', far, 'float'),
                                       ('nearest_point_view_z', near, 'float'),
                                       ('object_radius',
                                        self.edge_processor.sample_length * 0.5, 'float'),
@@ -105,11 +107,10 @@ class EdgeRenderer(Renderer):
                                        self.importance_threshold, 'float'),
                                       ('importance_max',
                                        self.edge_processor.edge_max_importance, 'float'),
-                                      ('max_sample_points',
-                                       self.edge_processor.max_sample_points, 'int'),
                                       ('show_class', show_class, 'int'),
                                       ('edge_importance_type', 0, 'int')])
         current_set.set_uniform_labeled_data(config)
+        self.node_processor.node_buffer.bind(6)
         current_set.render()
 
     def delete(self) -> None:
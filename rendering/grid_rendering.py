@@ -6,6 +6,7 @@ from opengl_helper.data_set import BaseRenderSet
 from opengl_helper.render_utility import (OGLRenderFunction,
                                           generate_render_function)
 from opengl_helper.shader import ShaderSetting
+from opengl_helper.shader_handler import RenderShaderHandler
 from opengl_helper.vertex_data_handler import OverflowingVertexDataHandler
 from processing.grid_processing import GridProcessor
 from rendering.renderer import Renderer
@@ -53,9 +54,7 @@ class GridRenderer(Renderer):
     @track_time
     def render(self, set_name: str, cam: BaseCamera, config: RenderingConfig, show_class: int = 0) -> None:
         current_set: BaseRenderSet = self.sets[set_name]
-        current_set.set_uniform_data([('projection', cam.projection, 'mat4'),
-                                      ('view', cam.view, 'mat4'),
-                                      ('scale', cam.object_scale, 'float')])
+        RenderShaderHandler().set_camera(cam)
         current_set.set_uniform_labeled_data(config)
         current_set.render()
 
@@ -7,6 +7,7 @@ from opengl_helper.data_set import BaseRenderSet
 from opengl_helper.render_utility import (OGLRenderFunction,
                                           generate_render_function)
 from opengl_helper.shader import ShaderSetting
+from opengl_helper.shader_handler import RenderShaderHandler
 from opengl_helper.vertex_data_handler import VertexDataHandler
 from processing.node_processing import NodeProcessor
 from rendering.renderer import Renderer
@@ -70,10 +71,8 @@ class NodeRenderer(Renderer):
         far: float = 0.0
         if set_name == 'node_transparent_sphere':
             near, far = self.grid.get_near_far_from_view(cam.view)
-        current_set.set_uniform_data([('projection', cam.projection, 'mat4'),
-                                      ('view', cam.view, 'mat4'),
-                                      ('scale', cam.object_scale, 'float'),
-                                      ('farthest_point_view_z', far, 'float'),
+        RenderShaderHandler().set_camera(cam)
+        current_set.set_uniform_data([('farthest_point_view_z', far, 'float'),
                                       ('nearest_point_view_z', near, 'float'),
                                       ('show_class', show_class, 'int')])
         current_set.set_uniform_labeled_data(config)
@@ -6,9 +6,12 @@ layout (location=1) in int density;
 out float vs_density;
 flat out float vs_discard;
 
-uniform mat4 projection;
-uniform mat4 view;
-uniform float scale;
+layout(std140) uniform camera_parameter
+{
+    mat4 projection;
+    mat4 view;
+    float scale;
+};
 
 void main()
 {
@@ -6,9 +6,12 @@ layout(location = 0) in vec4 position;
 flat out float vs_discard;
 flat out float vs_size;
 
-uniform mat4 projection;
-uniform mat4 view;
-uniform float scale;
+layout(std140) uniform camera_parameter
+{
+    mat4 projection;
+    mat4 view;
+    float scale;
+};
 
 void main()
 {
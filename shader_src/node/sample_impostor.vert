@@ -9,11 +9,16 @@ out float vs_size;
 out vec4 vs_color;
 out float vs_importance;
 
-uniform mat4 view;
+layout(std140) uniform camera_parameter
+{
+    mat4 projection;
+    mat4 view;
+    float scale;
+};
+
 uniform int show_class = 0;
 uniform float importance_threshold = 0;
 uniform float importance_max = 1.0;
-uniform float scale;
 
 //$$const vec3 color_$r_class_id$ = $r_class_color$;$$
 
@@ -9,7 +9,12 @@ in vec3 gs_cube_hit_position;
 out vec4 frag_color;
 layout (depth_greater) out float gl_FragDepth;
 
-uniform mat4  projection;
+layout(std140) uniform camera_parameter
+{
+    mat4 projection;
+    mat4 view;
+    float scale;
+};
 
 const vec3 light_direction_cam = normalize(vec3(1.0, 1.0, 1.0));
 const vec3 atom_color_diffuse  = vec3(0.8, 0.8, 0.8);
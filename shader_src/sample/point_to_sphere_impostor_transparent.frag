@@ -9,7 +9,13 @@ in vec3 gs_cube_hit_position;
 out vec4 frag_color;
 layout (depth_greater) out float gl_FragDepth;
 
-uniform mat4  projection;
+layout(std140) uniform camera_parameter
+{
+    mat4 projection;
+    mat4 view;
+    float scale;
+};
+
 uniform float farthest_point_view_z;
 uniform float nearest_point_view_z;
 
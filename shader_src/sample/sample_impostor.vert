@@ -1,8 +1,34 @@
-#version 410
+#version 430
+
+struct EdgeData
+{
+    float samples;
+    float layer_id;
+    float layer_edge_id;
+    float importance;
+    float start_node;
+    float end_node;
+    float padding_0;
+    float padding_1;
+};
 
 layout(location = 0) in vec4 position;
 layout(location = 1) in vec4 next_position;
-//$$layout(location = $r_edgebuffer_group_location$) in vec4 edge_data_$r_edgebuffer_group_id$;$$
+
+layout(std430, binding = 2) restrict readonly buffer edge_data
+{
+    EdgeData edge[];
+};
+
+layout(std430, binding = 7) restrict readonly buffer sample_offset_data
+{
+    uint sample_offset[];
+};
+
+layout(std430, binding = 6) restrict readonly buffer node_data
+{
+    float node[];
+};
 
 out vec3  vs_normal;
 out float vs_discard;
@@ -11,20 +37,53 @@ out float vs_importance;
 out vec4 vs_color;
 out float vs_edge;
 
-uniform mat4 view;
-uniform int max_sample_points;
+layout(std140) uniform camera_parameter
+{
+    mat4 projection;
+    mat4 view;
+    float scale;
+};
+
 uniform float importance_threshold = 0;
 uniform float importance_max = 1.0;
 uniform int edge_importance_type = 0;
 uniform int show_class = -1;
-uniform float scale;
 
 //$$const vec3 color_$r_class_id$ = $r_class_color$;$$
 
 
+highp uint edgeIndex(highp uint index)
+{
+    // the offset table is ascending, find the last edge starting at or before the sample
+    highp uint low = 0;
+    highp uint high = uint(sample_offset.length()) - 1;
+    while (high - low > 1) {
+        highp uint middle = (low + high) / 2;
+        if (sample_offset[middle] <= index) {
+            low = middle;
+        } else {
+            high = middle;
+        }
+    }
+    return low;
+}
+
 void main()
 {
-    //$if (position.w == 0.0 || position.w == -1.0 || importance_threshold >= edge_data_$edgebuffer_importance$ * edge_data_$edgebuffer_start_average$) {
+    // every instance is one sample, its edge is found through the sample offsets of the container
+    highp uint edge_index = edgeIndex(uint(gl_InstanceID));
+    EdgeData current_edge = edge[edge_index];
+    float sample_index = float(uint(gl_InstanceID) - sample_offset[edge_index] + 1u);
+
+    // class importance of the edge is read from its start and end node
+    //$highp int start_node = int(current_edge.start_node) * $nodebuffer_object_size$;
+    //$highp int end_node = int(current_edge.end_node) * $nodebuffer_object_size$;
+    //$float start_average = node[start_node + $num_classes$ + 4];
+    //$float end_average = node[end_node + $num_classes$ + 4];
+    //$float start_length = node[start_node + $num_classes$ + 5];
+    //$float end_length = node[end_node + $num_classes$ + 5];
+
+    //$if (position.w == 0.0 || position.w == -1.0 || importance_threshold >= current_edge.importance * start_average) {
         vs_discard = 1.0;
     //$} else {
         vs_discard = 0.0;
@@ -32,7 +91,7 @@ void main()
         vs_edge = 0.0;
         if(next_position.w <= 0.0) vs_edge = 1.0;
         if(position.w > 1.0) vs_edge = 1.0;
-        //$if(mod(gl_InstanceID + 1, max_sample_points) >= edge_data_$edgebuffer_samples$ - 2.0) vs_edge = 1.0;
+        //$if(sample_index >= current_edge.samples - 2.0) vs_edge = 1.0;
 
         vs_next_position = view * vec4(next_position.xyz * scale, 1.0);
         gl_Position = view * vec4(position.xyz * scale, 1.0);
@@ -41,22 +100,22 @@ void main()
 
         //$float importance[$num_classes$];
         if (edge_importance_type == 0) {
-            //$float t = clamp(mod(gl_InstanceID + 1, max_sample_points)/edge_data_$edgebuffer_samples$, 0.0, 1.0);
-            //$$importance[$r_class_id$] = (1.0 - t) * edge_data_$r_edgebuffer_start_class_importance$/(edge_data_$edgebuffer_start_average$ * $num_classes$.0) + t * edge_data_$r_edgebuffer_end_class_importance$/(edge_data_$edgebuffer_end_average$ * $num_classes$.0);$$
-            //$vs_importance =((1.0 - t) * edge_data_$edgebuffer_start_length$ + t * edge_data_$edgebuffer_end_length$) * edge_data_$edgebuffer_importance$;
+            //$float t = clamp(sample_index/current_edge.samples, 0.0, 1.0);
+            //$$importance[$r_class_id$] = (1.0 - t) * node[start_node + 4 + $r_class_id$]/(start_average * $num_classes$.0) + t * node[end_node + 4 + $r_class_id$]/(end_average * $num_classes$.0);$$
+            //$vs_importance =((1.0 - t) * start_length + t * end_length) * current_edge.importance;
         }
         if (edge_importance_type == 1) {
-            //$$importance[$r_class_id$] = edge_data_$r_edgebuffer_start_class_importance$/(edge_data_$edgebuffer_start_average$ * $num_classes$.0);$$
-            //$vs_importance = edge_data_$edgebuffer_start_length$ * edge_data_$edgebuffer_importance$;
+            //$$importance[$r_class_id$] = node[start_node + 4 + $r_class_id$]/(start_average * $num_classes$.0);$$
+            //$vs_importance = start_length * current_edge.importance;
         }
         if (edge_importance_type == 2) {
-            //$highp float divisor = (edge_data_$edgebuffer_start_average$ * $num_classes$.0 + edge_data_$edgebuffer_end_average$ * $num_classes$.0);
-            //$$importance[$r_class_id$] = (edge_data_$r_edgebuffer_start_class_importance$ + edge_data_$r_edgebuffer_end_class_importance$)/divisor;$$
-            //$vs_importance = edge_data_$edgebuffer_start_length$ * edge_data_$edgebuffer_end_length$ * edge_data_$edgebuffer_importance$;
+            //$highp float divisor = (start_average * $num_classes$.0 + end_average * $num_classes$.0);
+            //$$importance[$r_class_id$] = (node[start_node + 4 + $r_class_id$] + node[end_node + 4 + $r_class_id$])/divisor;$$
+            //$vs_importance = start_length * end_length * current_edge.importance;
         }
         if (edge_importance_type == 3) {
-            //$$importance[$r_class_id$] = edge_data_$r_edgebuffer_end_class_importance$/(edge_data_$edgebuffer_end_average$ * $num_classes$.0);$$
-            //$vs_importance = edge_data_$edgebuffer_end_length$ * edge_data_$edgebuffer_importance$;
+            //$$importance[$r_class_id$] = node[end_node + 4 + $r_class_id$]/(end_average * $num_classes$.0);$$
+            //$vs_importance = end_length * current_edge.importance;
         }
 
         //$vec3 color_list[$num_classes$];
@@ -0,0 +1,145 @@
+import logging
+from argparse import ArgumentParser
+from typing import Any, Dict, List
+
+from OpenGL.GL import (GL_MAX_COMPUTE_WORK_GROUP_INVOCATIONS,
+                       GL_MAX_COMPUTE_WORK_GROUP_SIZE, glFinish,
+                       glGetIntegeri_v, glGetIntegerv)
+
+from data.data_handler import ImportanceDataHandler
+from opengl_helper.compute_shader import ComputeShader
+from opengl_helper.compute_shader_handler import ComputeShaderHandler
+from processing.edge_processing import EdgeProcessor, SmoothingKernel
+from processing.grid_processing import GridProcessor
+from processing.network_processing import NetworkProcessor
+from processing.processing_config import ProcessingConfig
+from utility.log_handling import setup_logger
+from utility.window import Window, WindowHandler
+
+# processing options that dispatch shaders of their own, every tunable shader runs in at least one variant
+TIMING_VARIANTS: List[Dict[str, Any]] = [
+    {'parallel_resampling': False, 'sparse_grid': False, 'gather_density': False},
+    {'parallel_resampling': True, 'sparse_grid': True, 'gather_density': False},
+    {'parallel_resampling': False, 'sparse_grid': False, 'gather_density': True}]
+
+
+def run_processing_iteration(network_processor: NetworkProcessor) -> None:
+    # one pass over every processing phase, so each tunable shader is dispatched at least once
+    grid_processor: GridProcessor = network_processor.grid_processor
+    edge_processor: EdgeProcessor = network_processor.edge_processor
+
+    grid_processor.clear_buffer()
+    grid_processor.calculate_node_density(
+        network_processor.node_advection_status)
+    grid_processor.node_advect(network_processor.node_advection_status)
+    network_processor.node_processor.node_noise(
+        network_processor.sample_length, 0.5)
+    network_processor.reset_edges()
+
+    edge_processor.sample_edges()
+    edge_processor.check_limits()
+    for layer in range(len(network_processor.network.layer) - 1):
+        grid_processor.clear_buffer()
+        grid_processor.calculate_edge_density(
+            layer, network_processor.edge_advection_status, True)
+        grid_processor.sample_advect(
+            layer, network_processor.edge_advection_status, True)
+    # every smoothing kernel is timed
+    smoothing_kernel: SmoothingKernel = edge_processor.smoothing_kernel
+    for kernel in SmoothingKernel:
+        edge_processor.smoothing_kernel = kernel
+        edge_processor.sample_smooth(
+            network_processor.edge_advection_status, True)
+    edge_processor.smoothing_kernel = smoothing_kernel
+    edge_processor.sample_noise(3.0)
+    network_processor.update_edge_handler()
+    glFinish()
+
+
+def time_local_size(local_size: int, importance_data: ImportanceDataHandler, processing_config: ProcessingConfig,
+                    iterations: int) -> Dict[str, float]:
+    shader_handler: ComputeShaderHandler = ComputeShaderHandler()
+    shader_names: List[str] = list(shader_handler.compute_config.keys())
+    for shader_name in shader_names:
+        shader_handler.set_local_size(shader_name, local_size)
+
+    elapsed_times: Dict[str, float] = dict()
+    compute_counts: Dict[str, int] = dict()
+    for variant in TIMING_VARIANTS:
+        processing_config.update(variant)
+        network_processor: NetworkProcessor = NetworkProcessor(importance_data.layer_data, processing_config,
+                                                               importance_data=importance_data)
+        # the first iteration includes driver side shader compilation and buffer setup
+        run_processing_iteration(network_processor)
+        for shader_name in shader_names:
+            if shader_name in shader_handler.shader_list.keys():
+                shader_handler.get(shader_name).timed = True
+                shader_handler.get(shader_name).reset_timing()
+
+        for _ in range(iterations):
+            run_processing_iteration(network_processor)
+
+        for shader_name in shader_names:
+            if shader_name in shader_handler.shader_list.keys():
+                shader: ComputeShader = shader_handler.get(shader_name)
+                shader.timed = False
+                if shader.compute_count > 0:
+                    elapsed_times[shader_name] = elapsed_times.get(
+                        shader_name, 0.0) + shader.elapsed_time
+                    compute_counts[shader_name] = compute_counts.get(
+                        shader_name, 0) + shader.compute_count
+        network_processor.delete()
+    return {shader_name: elapsed_times[shader_name] / compute_counts[shader_name] for shader_name in elapsed_times}
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='Tune nn_vis compute shader workgroup sizes')
+    parser.add_argument('importance', type=str,
+                        help='Importance file of the network used for timing, e.g. created by create_synthetic_network.py.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 32, 64, 128, 256],
+                        help='Candidate workgroup sizes, sizes above the device limit are skipped.')
+    parser.add_argument('--iterations', type=int, default=10,
+                        help='Timed processing iterations per workgroup size.')
+    args = parser.parse_args()
+
+    setup_logger('tune_compute_shaders')
+
+    window_handler: WindowHandler = WindowHandler()
+    window: Window = window_handler.create_window(hidden=True)
+    window.activate()
+
+    max_local_size: int = min(glGetIntegeri_v(GL_MAX_COMPUTE_WORK_GROUP_SIZE, 0)[0],
+                              glGetIntegerv(GL_MAX_COMPUTE_WORK_GROUP_INVOCATIONS))
+    local_sizes: List[int] = [
+        size for size in args.sizes if 0 < size <= max_local_size]
+    if len(local_sizes) == 0:
+        raise Exception(
+            f'None of the workgroup sizes {args.sizes} is supported, the device limit is {max_local_size}.')
+
+    data: ImportanceDataHandler = ImportanceDataHandler(args.importance)
+    config: ProcessingConfig = ProcessingConfig()
+
+    handler: ComputeShaderHandler = ComputeShaderHandler()
+    initial_sizes: Dict[str, int] = dict(handler.compute_config)
+    shader_timings: Dict[str, Dict[int, float]] = dict()
+    for size in local_sizes:
+        logging.info(f'Timing compute shaders with workgroup size {size}...')
+        for name, elapsed_time in time_local_size(size, data, config, args.iterations).items():
+            shader_timings.setdefault(name, dict())[size] = elapsed_time
+
+    for name in handler.compute_config.keys():
+        if name in shader_timings.keys():
+            best_size: int = min(
+                shader_timings[name], key=lambda size: shader_timings[name][size])
+            timing_info: str = ', '.join(
+                [f'{size}: {elapsed_time * 1000.0:.3f}ms' for size, elapsed_time in shader_timings[name].items()])
+            logging.info(
+                f'{name} uses workgroup size {best_size} ({timing_info})')
+            handler.compute_config[name] = best_size
+        else:
+            logging.info(
+                f'{name} was not dispatched, keeping workgroup size {initial_sizes[name]}')
+            handler.compute_config[name] = initial_sizes[name]
+    handler.compute_config.store()
+
+    window_handler.destroy()
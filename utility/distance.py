@@ -0,0 +1,84 @@
+from typing import List, Tuple
+
+import numpy as np
+
+DISTANCE_CHUNK_SIZE: int = 1 << 22
+
+
+def max_pair_distance(points_a: np.array, points_b: np.array) -> float:
+    if points_a.shape[0] == 0 or points_b.shape[0] == 0:
+        return 0.0
+    points_a = points_a.astype(np.float64)
+    points_b = points_b.astype(np.float64)
+    chunk_rows: int = max(DISTANCE_CHUNK_SIZE // points_b.shape[0], 1)
+    max_squared_distance: float = 0.0
+    for start in range(0, points_a.shape[0], chunk_rows):
+        difference: np.array = points_a[start:(
+            start + chunk_rows), None, :] - points_b[None, :, :]
+        max_squared_distance = max(max_squared_distance, float(
+            np.max(np.sum(difference * difference, axis=2))))
+    return float(np.sqrt(max_squared_distance))
+
+
+def pair_distance_sum(points: np.array) -> float:
+    points = points.astype(np.float64)
+    chunk_rows: int = max(DISTANCE_CHUNK_SIZE // max(points.shape[0], 1), 1)
+    distance_sum: float = 0.0
+    for start in range(0, points.shape[0], chunk_rows):
+        difference: np.array = points[start:(
+            start + chunk_rows), None, :] - points[None, :, :]
+        distance_sum += float(np.sum(np.sqrt(np.sum(difference * difference, axis=2))))
+    return distance_sum
+
+
+def sampled_distance_mean(distances: np.array, point_count: int) -> Tuple[float, float]:
+    # random ordered pairs include self pairs with distance 0, rescale to the mean over distinct pairs
+    distinct_scale: float = point_count / (point_count - 1.0)
+    return float(np.mean(distances)) * distinct_scale, \
+        float(np.std(distances) / np.sqrt(distances.shape[0])) * distinct_scale
+
+
+def mean_pair_distance(points: np.array, exact_pair_limit: int = 1 << 24, sample_count: int = 1 << 20,
+                       seed: int = 0) -> Tuple[float, float]:
+    point_count: int = points.shape[0]
+    if point_count < 2:
+        return 0.0, 0.0
+    if point_count * point_count <= exact_pair_limit:
+        return pair_distance_sum(points) / (point_count * (point_count - 1.0)), 0.0
+
+    rng: np.random.Generator = np.random.default_rng(seed)
+    points = points.astype(np.float64)
+    difference: np.array = points[rng.integers(0, point_count, sample_count)] - \
+        points[rng.integers(0, point_count, sample_count)]
+    return sampled_distance_mean(np.sqrt(np.sum(difference * difference, axis=1)), point_count)
+
+
+def mean_midpoint_pair_distance(points_a: np.array, points_b: np.array, exact_pair_limit: int = 1 << 24,
+                                sample_count: int = 1 << 20, seed: int = 0) -> Tuple[float, float]:
+    midpoint_count: int = points_a.shape[0] * points_b.shape[0]
+    if midpoint_count < 2:
+        return 0.0, 0.0
+    if midpoint_count * midpoint_count <= exact_pair_limit:
+        midpoints: np.array = (
+            points_a[:, None, :] + points_b[None, :, :]).reshape(-1, points_a.shape[1]) / 2.0
+        return mean_pair_distance(midpoints, exact_pair_limit, sample_count, seed)
+
+    rng: np.random.Generator = np.random.default_rng(seed)
+    points_a = points_a.astype(np.float64)
+    points_b = points_b.astype(np.float64)
+    difference: np.array = (points_a[rng.integers(0, points_a.shape[0], sample_count)]
+                            + points_b[rng.integers(0, points_b.shape[0], sample_count)]
+                            - points_a[rng.integers(0, points_a.shape[0], sample_count)]
+                            - points_b[rng.integers(0, points_b.shape[0], sample_count)]) / 2.0
+    return sampled_distance_mean(np.sqrt(np.sum(difference * difference, axis=1)), midpoint_count)
+
+
+def combine_means(means: List[Tuple[float, float]], weights: List[float]) -> Tuple[float, float]:
+    weight_sum: float = sum(weights)
+    if weight_sum == 0.0:
+        return 0.0, 0.0
+    mean: float = sum([weight * layer_mean for (layer_mean, _),
+                      weight in zip(means, weights)]) / weight_sum
+    error: float = float(np.sqrt(sum([(weight * layer_error / weight_sum) ** 2 for (_, layer_error), weight in
+                                      zip(means, weights)])))
+    return mean, error
@@ -0,0 +1,43 @@
+from typing import List
+
+import numpy as np
+
+
+def select_quantile(values: np.array, quantile: float) -> float:
+    rank: int = min(int(values.shape[0] * quantile), values.shape[0] - 1)
+    return float(np.partition(values, rank)[rank])
+
+
+def stream_quantile(value_chunks: List[np.array], quantile: float, bins: int = 4096,
+                    max_bin_values: int = 1000000) -> float:
+    # histogram pass over all chunks, then an exact selection inside the bin containing the rank
+    value_count: int = sum([chunk.shape[0] for chunk in value_chunks])
+    rank: int = min(int(value_count * quantile), value_count - 1)
+    lowest: float = min([float(np.min(chunk))
+                        for chunk in value_chunks if chunk.shape[0] > 0])
+    highest: float = max([float(np.max(chunk))
+                         for chunk in value_chunks if chunk.shape[0] > 0])
+    if lowest == highest:
+        return lowest
+
+    def bin_index(chunk: np.array) -> np.array:
+        return np.clip(((chunk.astype(np.float64) - lowest) * (bins / (highest - lowest))).astype(np.int64),
+                       0, bins - 1)
+
+    histogram: np.array = np.zeros(bins, dtype=np.int64)
+    for chunk in value_chunks:
+        histogram += np.bincount(bin_index(chunk), minlength=bins)
+    cumulative_histogram: np.array = np.cumsum(histogram)
+    rank_bin: int = int(np.searchsorted(
+        cumulative_histogram, rank, side='right'))
+    bin_rank: int = rank - \
+        (int(cumulative_histogram[rank_bin - 1]) if rank_bin > 0 else 0)
+
+    if histogram[rank_bin] > max_bin_values:
+        # too many values in a single bin, interpolate linearly inside the bin instead
+        bin_width: float = (highest - lowest) / bins
+        return lowest + bin_width * (rank_bin + bin_rank / float(histogram[rank_bin]))
+
+    bin_values: np.array = np.concatenate(
+        [chunk[bin_index(chunk) == rank_bin] for chunk in value_chunks])
+    return float(np.partition(bin_values, bin_rank)[bin_rank])
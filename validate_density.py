@@ -0,0 +1,76 @@
+import logging
+from argparse import ArgumentParser
+
+import numpy as np
+
+from data.data_handler import ImportanceDataHandler
+from processing.grid_processing import GridProcessor
+from processing.network_processing import NetworkProcessor
+from processing.processing_config import ProcessingConfig
+from utility.log_handling import setup_logger
+from utility.window import Window, WindowHandler
+
+
+def calculate_layer_density(grid_processor: GridProcessor, network_processor: NetworkProcessor, layer: int,
+                            gather_density: bool) -> np.array:
+    grid_processor.gather_density = gather_density
+    grid_processor.clear_buffer(layer)
+    grid_processor.calculate_edge_density(
+        layer, network_processor.edge_advection_status, True)
+    return np.frombuffer(grid_processor.get_density_buffer(layer).read(), dtype=np.uint32).astype(np.int64)
+
+
+def validate_density(network_processor: NetworkProcessor, tolerance: float) -> bool:
+    # scatter and gather density of every layer have to match up to rounding of the splat order
+    grid_processor: GridProcessor = network_processor.grid_processor
+    network_processor.edge_processor.sample_edges()
+    network_processor.edge_processor.check_limits()
+
+    valid: bool = True
+    for layer in range(len(network_processor.network.layer) - 1):
+        scatter: np.array = calculate_layer_density(
+            grid_processor, network_processor, layer, False)
+        gather: np.array = calculate_layer_density(
+            grid_processor, network_processor, layer, True)
+        max_difference: int = int(np.max(np.abs(scatter - gather)))
+        max_density: int = max(int(np.max(scatter)), 1)
+        differing_cells: int = int(np.count_nonzero(scatter != gather))
+        logging.info(f'Layer {layer}: max density {max_density}, max difference {max_difference}, '
+                     f'{differing_cells} of {scatter.size} values differ')
+        if max_difference > tolerance * max_density:
+            logging.error(
+                f'Layer {layer}: gather density differs from scatter density')
+            valid = False
+    return valid
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(
+        prog='Validate nn_vis gather density against scatter density')
+    parser.add_argument('importance', type=str,
+                        help='Importance file of the network used for validation, e.g. created by create_synthetic_network.py.')
+    parser.add_argument('--tolerance', type=float, default=0.001,
+                        help='Largest accepted difference relative to the maximal density of a layer.')
+    args = parser.parse_args()
+
+    setup_logger('validate_density')
+
+    window_handler: WindowHandler = WindowHandler()
+    window: Window = window_handler.create_window(hidden=True)
+    window.activate()
+
+    data: ImportanceDataHandler = ImportanceDataHandler(args.importance)
+    config: ProcessingConfig = ProcessingConfig()
+    config['sparse_grid'] = False
+    config['gather_density'] = True
+
+    processor: NetworkProcessor = NetworkProcessor(
+        data.layer_data, config, importance_data=data)
+    densities_match: bool = validate_density(processor, args.tolerance)
+    processor.delete()
+    window_handler.destroy()
+
+    if not densities_match:
+        raise Exception(
+            f'Gather density exceeds the tolerance of {args.tolerance} in at least one layer.')
+    logging.info('Gather density matches scatter density.')
@@ -0,0 +1,114 @@
+import logging
+from argparse import ArgumentParser
+
+import numpy as np
+
+from data.data_handler import ImportanceDataHandler
+from models.grid import Grid
+from opengl_helper.buffer import OverflowingBufferObject
+from processing.grid_processing import GridProcessor
+from processing.network_processing import NetworkProcessor
+from processing.processing_config import ProcessingConfig
+from utility.log_handling import setup_logger
+from utility.window import Window, WindowHandler
+
+
+def read_level_density(grid_processor: GridProcessor, layer: int) -> np.array:
+    # the active level only covers the start of the density buffer
+    level_grid: Grid = grid_processor.get_level_grid()
+    density_buffer: OverflowingBufferObject = grid_processor.get_density_buffer(
+        layer)
+    if len(density_buffer.handle) > 1:
+        raise Exception(
+            'Grid level validation needs a density grid that fits into a single SSBO.')
+    density: np.array = np.frombuffer(density_buffer.read(
+    ), dtype=np.uint32).reshape(-1, density_buffer.object_size)
+    return density[:level_grid.grid_cell_count_overall, 0].astype(np.float64).reshape(
+        (level_grid.grid_cell_count[2], level_grid.grid_cell_count[1], level_grid.grid_cell_count[0]))
+
+
+def calculate_layer_gradient(grid_processor: GridProcessor, network_processor: NetworkProcessor, layer: int,
+                             level: int) -> np.array:
+    grid_processor.set_grid_level(level)
+    grid_processor.clear_buffer(layer)
+    grid_processor.calculate_edge_density(
+        layer, network_processor.edge_advection_status, True)
+    density: np.array = read_level_density(grid_processor, layer)
+    cell_size: np.array = np.array(
+        grid_processor.get_level_grid().grid_cell_size, dtype=np.float64)
+    grid_processor.set_grid_level(0)
+
+    gradient: np.array = np.stack(np.gradient(
+        density, cell_size[2], cell_size[1], cell_size[0]))
+    # the density scale depends on the cell size, only the shape of the gradient field is compared
+    return gradient / max(float(np.linalg.norm(gradient)), 1e-12)
+
+
+def validate_grid_level(network_processor: NetworkProcessor, level: int, tolerance: float) -> bool:
+    # the gradient of a coarse level has to follow the full resolution gradient the advection would use
+    grid_processor: GridProcessor = network_processor.grid_processor
+    if level >= len(grid_processor.grid_levels):
+        raise Exception(
+            f'The grid only has {len(grid_processor.grid_levels)} levels, level {level} can not be validated.')
+    network_processor.edge_processor.sample_edges()
+    network_processor.edge_processor.check_limits()
+    factor: int = 2 ** level
+
+    valid: bool = True
+    for layer in range(len(network_processor.network.layer) - 1):
+        fine: np.array = calculate_layer_gradient(
+            grid_processor, network_processor, layer, 0)
+        coarse: np.array = calculate_layer_gradient(
+            grid_processor, network_processor, layer, level)
+        # every coarse cell covers factor cells of the full grid along each axis
+        coarse = np.repeat(np.repeat(np.repeat(coarse, factor, axis=1), factor, axis=2), factor, axis=3)[
+            :, :fine.shape[1], :fine.shape[2], :fine.shape[3]]
+        gradient_error: float = float(np.linalg.norm(coarse - fine))
+        logging.info(
+            f'Layer {layer}: relative gradient error of level {level} is {gradient_error:.4f}')
+        if gradient_error > tolerance:
+            logging.error(
+                f'Layer {layer}: gradient of level {level} differs from the full resolution gradient')
+            valid = False
+        # after the reset to the full grid the density has to be the same as before the coarse pass
+        if not np.array_equal(calculate_layer_gradient(grid_processor, network_processor, layer, 0), fine):
+            logging.error(
+                f'Layer {layer}: full resolution gradient changed after the coarse pass')
+            valid = False
+    return valid
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(
+        prog='Validate nn_vis coarse grid levels against the full resolution grid')
+    parser.add_argument('importance', type=str,
+                        help='Importance file of the network used for validation, e.g. created by create_synthetic_network.py.')
+    parser.add_argument('--level', type=int, default=1,
+                        help='Coarse grid level that is forced for the comparison.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Largest accepted distance between the normalized gradients of both levels.')
+    args = parser.parse_args()
+
+    setup_logger('validate_grid_levels')
+
+    window_handler: WindowHandler = WindowHandler()
+    window: Window = window_handler.create_window(hidden=True)
+    window.activate()
+
+    data: ImportanceDataHandler = ImportanceDataHandler(args.importance)
+    config: ProcessingConfig = ProcessingConfig()
+    config['sparse_grid'] = False
+    config['gather_density'] = False
+    config['density_pyramid'] = True
+
+    processor: NetworkProcessor = NetworkProcessor(
+        data.layer_data, config, importance_data=data)
+    levels_match: bool = validate_grid_level(
+        processor, args.level, args.tolerance)
+    processor.delete()
+    window_handler.destroy()
+
+    if not levels_match:
+        raise Exception(
+            f'Grid level {args.level} exceeds the tolerance of {args.tolerance} in at least one layer.')
+    logging.info(f'Grid level {args.level} matches the full resolution grid.')